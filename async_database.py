@@ -0,0 +1,80 @@
+"""
+Асинхронный фасад над Database для обработчиков бота.
+
+Вызовы sqlite3 выполняются в отдельных потоках, поэтому медленный запрос
+(например, отчёт за месяц) не блокирует цикл событий python-telegram-bot.
+Чтения идут параллельно в пуле потоков, записи — по очереди в одном
+потоке-писателе.
+"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+    """
+    Обёртка с тем же набором методов, что и Database, но каждый метод
+    возвращает корутину: ``priests = await db.search_priests("Иванов")``.
+    Свойства Database тоже читаются через await, простые атрибуты (db_path,
+    read_only) — напрямую.
+    """
+
+    # Методы, изменяющие данные: выполняются строго последовательно
+    WRITE_METHODS = frozenset({
+        "init_database",
+        "add_priest",
+        "update_priest",
+        "delete_priest",
+        "delete_priests",
+        "bulk_upsert",
+        "update_phones",
+        "save_import_state",
+        "backfill_search_keys",
+        "set_broadcast_optout",
+    })
+
+    def __init__(self, db: Optional[Database] = None, read_workers: int = config.DB_READ_WORKERS):
+        self.db = db if db is not None else Database()
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    def _executor_for(self, name: str) -> ThreadPoolExecutor:
+        return self._writer if name in self.WRITE_METHODS else self._readers
+
+    async def run(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        """Выполнение метода Database с указанным именем в соответствующем потоке"""
+        method = getattr(self.db, name)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor_for(name), functools.partial(method, *args, **kwargs)
+        )
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        # Вызывается только для атрибутов, которых нет у самого AsyncDatabase
+        if name == "db":
+            raise AttributeError(name)
+        if isinstance(getattr(type(self.db), name, None), property):
+            # Свойство может обращаться к базе (fts_available): читается в потоке,
+            # ``available = await db.fts_available``
+            return self._read_property(name)
+        attribute = getattr(self.db, name)
+        if not callable(attribute):
+            return attribute
+        return functools.partial(self.run, name)
+
+    async def _read_property(self, name: str) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, getattr, self.db, name)
+
+    def close(self) -> None:
+        """Остановка рабочих потоков (дожидается уже поставленных задач)"""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        logger.info("Потоки доступа к базе данных остановлены")
@@ -0,0 +1,21 @@
+"""
+Скрипт для пересчёта нормализованных ключей поиска (surname_norm, name_norm,
+fio_norm) у всех записей в базе данных.
+
+Миграция схемы заполняет ключи автоматически; скрипт нужен после изменения
+правил нормализации в utils.normalize_search_key или правки базы вручную.
+
+Использование:
+    python3 backfill_search_keys.py
+"""
+from database import Database
+
+
+def main() -> None:
+    db = Database()
+    count = db.backfill_search_keys()
+    print(f"✅ Ключи поиска пересчитаны для записей: {count}")
+
+
+if __name__ == "__main__":
+    main()
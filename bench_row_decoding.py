@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк преобразования строк priests в объекты Priest.
+
+Сравнивает прежний способ (strptime и row.keys() на каждую строку)
+с PriestRowDecoder на синтетической таблице в памяти.
+
+Использование: python bench_row_decoding.py [количество_строк]
+"""
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import schema
+from models import Priest
+from row_decoder import PriestRowDecoder, parse_iso_date, parse_iso_timestamp
+
+
+def legacy_row_to_priest(row: sqlite3.Row) -> Priest:
+    """Копия прежней реализации Database._row_to_priest"""
+    birth_date = None
+    if row["birth_date"]:
+        birth_date = datetime.strptime(row["birth_date"], "%Y-%m-%d").date()
+
+    ordination_date = None
+    if row["ordination_date"]:
+        ordination_date = datetime.strptime(row["ordination_date"], "%Y-%m-%d").date()
+
+    deacon_ordination_date = None
+    if "deacon_ordination_date" in row.keys() and row["deacon_ordination_date"]:
+        deacon_ordination_date = datetime.strptime(row["deacon_ordination_date"], "%Y-%m-%d").date()
+
+    priest_ordination_date = None
+    if "priest_ordination_date" in row.keys() and row["priest_ordination_date"]:
+        priest_ordination_date = datetime.strptime(row["priest_ordination_date"], "%Y-%m-%d").date()
+
+    created_at = None
+    if row["created_at"]:
+        created_at = datetime.strptime(row["created_at"], "%Y-%m-%d %H:%M:%S")
+
+    updated_at = None
+    if row["updated_at"]:
+        updated_at = datetime.strptime(row["updated_at"], "%Y-%m-%d %H:%M:%S")
+
+    return Priest(
+        id=row["id"],
+        name=row["name"],
+        patronymic=row["patronymic"] or "",
+        surname=row["surname"],
+        birth_date=birth_date,
+        birth_place=row["birth_place"] or "",
+        nationality=row["nationality"] or "" if "nationality" in row.keys() else "",
+        status=row["status"],
+        name_day=row["name_day"] or "" if "name_day" in row.keys() else "",
+        deacon_ordination_date=deacon_ordination_date,
+        priest_ordination_date=priest_ordination_date,
+        ordination_date=ordination_date,
+        service_place=row["service_place"] or "",
+        education=row["education"] or "",
+        secular_education=row["secular_education"] or "" if "secular_education" in row.keys() else "",
+        last_reward=row["last_reward"] or "",
+        phone=row["phone"] or "" if "phone" in row.keys() else "",
+        created_at=created_at,
+        updated_at=updated_at
+    )
+
+
+def build_database(count: int) -> sqlite3.Connection:
+    """Таблица priests в памяти с count случайными записями"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    schema.apply_migrations(conn)
+
+    rng = random.Random(42)
+    start = date(1940, 1, 1)
+
+    def random_date():
+        return (start + timedelta(days=rng.randrange(25000))).isoformat() if rng.random() < 0.9 else None
+
+    rows = []
+    for i in range(count):
+        deacon = random_date()
+        priest = random_date()
+        rows.append((
+            f"Имя{i % 300}", f"Отчество{i % 200}", f"Фамилия{i}", random_date(),
+            "Одесса", "украинец", "священник", "1 января",
+            deacon, priest, priest or deacon,
+            "Храм", "Семинария", "", "", "",
+            f"2024-0{1 + i % 9}-1{i % 10} 12:00:00", f"2024-0{1 + i % 9}-1{i % 10} 12:00:00",
+        ))
+
+    with conn:
+        conn.executemany("""
+            INSERT INTO priests (
+                name, patronymic, surname, birth_date, birth_place, nationality,
+                status, name_day, deacon_ordination_date, priest_ordination_date,
+                ordination_date, service_place, education, secular_education,
+                last_reward, phone, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    return conn
+
+
+def measure(label: str, decode, conn: sqlite3.Connection, repeats: int = 3) -> float:
+    """Лучшее время из нескольких прогонов (выборка + преобразование)"""
+    best = float("inf")
+    for _ in range(repeats):
+        parse_iso_date.cache_clear()
+        parse_iso_timestamp.cache_clear()
+        started = time.perf_counter()
+        cursor = conn.execute("SELECT * FROM priests")
+        result = decode(cursor, cursor.fetchall())
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<22} {best * 1000:8.1f} мс  ({len(result)} записей)")
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    conn = build_database(count)
+
+    # Оба способа должны давать одинаковый результат
+    cursor = conn.execute("SELECT * FROM priests")
+    rows = cursor.fetchall()
+    assert [legacy_row_to_priest(r) for r in rows] == PriestRowDecoder(cursor.description).decode_all(rows)
+
+    legacy = measure("strptime + row.keys()", lambda c, rs: [legacy_row_to_priest(r) for r in rs], conn)
+    fast = measure("PriestRowDecoder", lambda c, rs: PriestRowDecoder(c.description).decode_all(rs), conn)
+    print(f"Ускорение: {legacy / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
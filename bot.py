@@ -10,8 +10,15 @@ from telegram.ext import (
     CallbackQueryHandler,
     filters
 )
+import broadcast
+import celebrations_digest
 import config
 import handlers
+from async_database import AsyncDatabase
+from db_pool import close_all_pools
+from outbox import Outbox
+import render_cache
+import schema
 
 # Настройка логирования
 logging.basicConfig(
@@ -21,6 +28,29 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def on_stop(application: Application) -> None:
+    """Отправка уже поставленных в очередь сообщений перед остановкой бота"""
+    outbox = application.bot_data.get("outbox")
+    if outbox is not None:
+        if not await outbox.drain(config.OUTBOX_DRAIN_TIMEOUT):
+            logger.warning("Очередь отправки не опустела за %s с", config.OUTBOX_DRAIN_TIMEOUT)
+        logger.info("Очередь отправки: %s", outbox.stats())
+
+
+async def on_shutdown(application: Application) -> None:
+    """Освобождение ресурсов при остановке бота"""
+    db = application.bot_data.get("db")
+    if db is not None:
+        logger.info("Кэш запросов: %s", db.db.cache_stats())
+        db.close()
+    digest = application.bot_data.get("celebrations_digest")
+    if digest is not None:
+        logger.info("Отчёты «Именинники»: %s", digest.stats())
+    logger.info("Кэш сообщений: %s", render_cache.stats())
+    close_all_pools()
+    logger.info("Соединения с базой данных закрыты")
+
+
 def main():
     """Главная функция запуска бота"""
     # Проверка токена
@@ -30,7 +60,13 @@ def main():
         return
     
     # Создание приложения
-    application = Application.builder().token(config.BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(config.BOT_TOKEN)
+        .post_stop(on_stop)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
     
     # Регистрация обработчиков команд
     application.add_handler(CommandHandler("start", handlers.start_command))
@@ -39,6 +75,8 @@ def main():
     application.add_handler(CommandHandler("list", handlers.list_command))
     application.add_handler(CommandHandler("status", handlers.status_command))
     application.add_handler(CommandHandler("add", handlers.add_command))
+    application.add_handler(CommandHandler("subscribe", handlers.subscribe_command))
+    application.add_handler(CommandHandler("unsubscribe", handlers.unsubscribe_command))
     
     # Обработчик callback-запросов (для inline-кнопок)
     application.add_handler(CallbackQueryHandler(handlers.callback_handler))
@@ -46,10 +84,20 @@ def main():
     # Обработчик текстовых сообщений (должен быть последним)
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.message_handler))
     
-    # Инициализация базы данных
-    from database import Database
-    db = Database()
-    logger.info("База данных инициализирована")
+    # Инициализация базы данных: миграции схемы применяются один раз при старте,
+    # обработчики получают готовый объект из application.bot_data
+    # (синхронные вызовы sqlite3 выполняются в отдельных потоках)
+    db = AsyncDatabase()
+    application.bot_data["db"] = db
+    logger.info("База данных инициализирована (версия схемы %s)", schema.SCHEMA_VERSION)
+
+    # Многочастные ответы и рассылка отправляются через общую очередь
+    application.bot_data["outbox"] = Outbox()
+
+    # Отчёты «Именинники» строятся заранее: при старте и каждую полночь
+    application.bot_data["celebrations_digest"] = celebrations_digest.CelebrationsDigest()
+    celebrations_digest.schedule(application)
+    broadcast.schedule(application)
     
     # Запуск бота
     logger.info("Бот запущен и готов к работе!")
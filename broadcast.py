@@ -0,0 +1,114 @@
+"""
+Ежедневная рассылка «Именинники» администраторам.
+
+Раз в сутки (BROADCAST_TIME по местному времени) отчёты на сегодня — по
+дате рождения, тезоименитству, хиротонии и юбилеям — берутся из
+CelebrationsDigest (строятся один раз на всех) и отправляются каждому из
+config.ADMIN_IDS, кроме отказавшихся (/unsubscribe).
+
+Сообщения отправляются через очередь Outbox: получателям параллельно,
+с общим ограничением скорости и повтором при flood control (RetryAfter)
+и сетевых ошибках.
+"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime
+from datetime import time as dt_time
+from typing import Any, Dict, List, Tuple
+
+from telegram import Bot
+from telegram.error import Forbidden
+from telegram.ext import Application, ContextTypes
+
+import config
+from celebrations_digest import EMPTY_DAY_TEXT, CelebrationsDigest
+from outbox import Outbox
+
+logger = logging.getLogger(__name__)
+
+# Отчёты на сегодня в порядке отправки: (тип дат, только юбилеи)
+DAILY_REPORTS: Tuple[Tuple[str, bool], ...] = (
+    ("bday", False),
+    ("name", False),
+    ("ord", False),
+    ("bday", True),
+    ("ord", True),
+)
+
+
+async def build_daily_messages(db, digest: CelebrationsDigest) -> List[str]:
+    """Сообщения рассылки на сегодня (пустые отчёты пропускаются)"""
+    messages: List[str] = []
+    for kind, jubilee_only in DAILY_REPORTS:
+        parts = await digest.days_report(db, kind, 0, jubilee_only=jubilee_only)
+        if len(parts) == 1 and parts[0].endswith(EMPTY_DAY_TEXT):
+            continue
+        messages.extend(parts)
+
+    title = f"📬 <b>Памятные даты на {date.today().strftime('%d.%m.%Y')}</b>"
+    if not messages:
+        return [f"{title}\n\nСегодня памятных дат нет."]
+    return [title] + messages
+
+
+async def send_daily_broadcast(bot: Bot, db, digest: CelebrationsDigest, outbox: Outbox) -> Dict[str, Any]:
+    """
+    Рассылка отчётов на сегодня всем подписанным администраторам.
+
+    Отчёты строятся один раз; сообщения каждому получателю ставятся в его
+    очередь Outbox одним пакетом, очереди разных получателей
+    обслуживаются параллельно. Возвращает счётчики рассылки.
+    """
+    started = time.perf_counter()
+    opted_out = await db.get_broadcast_optouts()
+    recipients = [admin_id for admin_id in config.ADMIN_IDS if admin_id not in opted_out]
+    messages = await build_daily_messages(db, digest)
+
+    deliveries = [outbox.send_parts(bot, chat_id, messages) for chat_id in recipients]
+    results = await asyncio.gather(*deliveries, return_exceptions=True)
+    for chat_id, result in zip(recipients, results):
+        if isinstance(result, Forbidden):
+            logger.warning("Рассылка: получатель %s заблокировал бота или не начинал диалог", chat_id)
+
+    failed = sum(isinstance(result, BaseException) for result in results)
+    stats = {
+        "recipients": len(recipients),
+        "opted_out": len(config.ADMIN_IDS) - len(recipients),
+        "sent": len(results) - failed,
+        "failed": failed,
+        "messages": len(messages),
+        "elapsed": round(time.perf_counter() - started, 2),
+    }
+    logger.info("Ежедневная рассылка: %s", stats)
+    return stats
+
+
+async def broadcast_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Задача JobQueue: ежедневная рассылка"""
+    await send_daily_broadcast(
+        context.bot,
+        context.bot_data["db"],
+        context.bot_data["celebrations_digest"],
+        context.bot_data["outbox"],
+    )
+
+
+def _parse_time(value: str) -> dt_time:
+    hours, minutes = value.split(":")
+    return dt_time(int(hours), int(minutes), tzinfo=datetime.now().astimezone().tzinfo)
+
+
+def schedule(application: Application) -> bool:
+    """Регистрация ежедневной рассылки в JobQueue приложения"""
+    if not config.BROADCAST_ENABLED:
+        logger.info("Ежедневная рассылка отключена (BROADCAST_ENABLED)")
+        return False
+    if application.job_queue is None:
+        logger.warning("JobQueue недоступна (нужен python-telegram-bot[job-queue]): рассылка отключена")
+        return False
+
+    send_at = _parse_time(config.BROADCAST_TIME)
+    application.job_queue.run_daily(broadcast_job, time=send_at, name="daily_broadcast")
+    logger.info("Ежедневная рассылка в %s", send_at.strftime("%H:%M"))
+    return True
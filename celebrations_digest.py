@@ -0,0 +1,453 @@
+"""
+Заранее подготовленные отчёты раздела «Именинники».
+
+Отчёт на день зависит только от данных и от текущей даты, поэтому он
+строится один раз в сутки (задача JobQueue в полночь) для ближайших
+CELEBRATIONS_DIGEST_DAYS дней и текущего месяца по всем типам дат, включая
+варианты «только юбилеи». Обработчики кнопок отдают готовые части
+сообщения.
+
+После записи в таблицу priests сбрасываются только отчёты за дни и месяцы,
+затронутые изменёнными записями (их находит сравнение снимков календаря —
+при нажатии кнопки или фоновой проверкой раз в
+CELEBRATIONS_DIGEST_CHECK_INTERVAL секунд); сброшенный отчёт строится
+заново при следующем запросе.
+"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from telegram.ext import Application, ContextTypes
+
+import config
+import utils
+from database import Database
+from models import Priest
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("bday", "name", "ord")
+# Типы дат, для которых есть отчёты «только юбилеи»
+JUBILEE_KINDS = ("bday", "ord")
+
+MONTH_NAMES = [
+    "",
+    "Январь",
+    "Февраль",
+    "Март",
+    "Апрель",
+    "Май",
+    "Июнь",
+    "Июль",
+    "Август",
+    "Сентябрь",
+    "Октябрь",
+    "Ноябрь",
+    "Декабрь",
+]
+
+DAY_HEADERS = {
+    "bday": "🎂 <b>Именинники по дате рождения на {date}</b>\n\n",
+    "name": "🎉 <b>Именинники по тезоименитству на {date}</b>\n\n",
+    "ord": "✝️ <b>Именинники по дате хиротонии на {date}</b>\n\n",
+}
+
+# Текст отчёта на день, в котором никого нет
+EMPTY_DAY_TEXT = "Никто не отмечает в этот день."
+
+MONTH_HEADERS = {
+    "bday": "🎂 <b>Именинники по дате рождения за {month} {year} года</b>\n\n",
+    "name": "🎉 <b>Именинники по тезоименитству за {month} {year} года</b>\n\n",
+    "ord": "✝️ <b>Именинники по дате хиротонии за {month} {year} года</b>\n\n",
+}
+
+
+def filter_jubilees(kind: str, matches: List[Priest], today: date) -> List[Priest]:
+    """Только те, у кого юбилей возраста (bday) или служения в сане (ord)"""
+    filtered = []
+    for p in matches:
+        if kind == "bday":
+            if utils.is_jubilee(utils.calculate_age(p.birth_date, today)):
+                filtered.append(p)
+        elif kind == "ord":
+            years_deacon = utils.years_since(p.deacon_ordination_date, today)
+            years_priest = utils.years_since(p.priest_ordination_date, today)
+            if utils.is_jubilee(years_deacon) or utils.is_jubilee(years_priest):
+                filtered.append(p)
+    return filtered
+
+
+def _fio(p: Priest) -> str:
+    return " ".join([part for part in [p.surname, p.name, p.patronymic] if part])
+
+
+def _detailed_entry(kind: str, idx: int, p: Priest, today: date) -> str:
+    """«Богатый» формат для рождения и хиротонии: возраст, годы в сане, юбилеи"""
+    age = utils.calculate_age(p.birth_date, today)
+    age_str = f"{age} лет" if age is not None else "возраст не указан"
+
+    years_deacon = utils.years_since(p.deacon_ordination_date, today)
+    years_priest = utils.years_since(p.priest_ordination_date, today)
+    deacon_str = f"{years_deacon} лет" if years_deacon is not None else "нет данных"
+    priest_str = f"{years_priest} лет" if years_priest is not None else "нет данных"
+
+    jubilee_marks = []
+    if utils.is_jubilee(age):
+        jubilee_marks.append(f"<b>🎂 ЮБИЛЕЙ возраста: {age} лет</b>")
+    if utils.is_jubilee(years_deacon):
+        jubilee_marks.append(f"<b>✝️ ЮБИЛЕЙ в диаконском сане: {years_deacon} лет</b>")
+    if utils.is_jubilee(years_priest):
+        jubilee_marks.append(f"<b>⛪ ЮБИЛЕЙ в священническом сане: {years_priest} лет</b>")
+
+    birth_line = ""
+    if kind == "bday":
+        birth_line = f"   📅 Дата рождения: {utils.format_date(p.birth_date)}\n"
+    ordinations_line = ""
+    if kind == "ord":
+        ordinations_line = (
+            f"   ✝️ Дата хиротонии в диакона: {utils.format_date(p.deacon_ordination_date)}\n"
+            f"   ⛪ Дата хиротонии в священника: {utils.format_date(p.priest_ordination_date)}\n"
+        )
+
+    entry = (
+        f"{idx}. {_fio(p)}\n"
+        f"   Сан: {p.status}\n"
+        f"{birth_line}"
+        f"{ordinations_line}"
+        f"   🎂 Возраст: {age_str}\n"
+        f"   📍 Место служения: {p.service_place or 'не указано'}\n"
+        f"   ✝️ Лет в диаконском сане: {deacon_str}\n"
+        f"   ⛪ Лет в священническом сане: {priest_str}"
+    )
+    if jubilee_marks:
+        entry += "\n   🔔 " + " | ".join(jubilee_marks)
+    return entry
+
+
+def _name_day_entry(idx: int, p: Priest, name_day_str: str) -> str:
+    return (
+        f"{idx}. {_fio(p)}\n"
+        f"   Сан: {p.status}\n"
+        f"   📅 День тезоименитства: {name_day_str}\n"
+        f"   📍 Место служения: {p.service_place or 'не указано'}"
+    )
+
+
+def build_days_report(
+    kind: str,
+    matches: List[Priest],
+    target_date: date,
+    days_ahead: int,
+    today: date,
+    jubilee_only: bool = False,
+) -> Tuple[str, ...]:
+    """Части сообщения с именинниками на target_date (today + days_ahead)"""
+    if jubilee_only:
+        matches = filter_jubilees(kind, matches, today)
+
+    header = DAY_HEADERS[kind].format(date=target_date.strftime("%d.%m.%Y"))
+    if jubilee_only:
+        header = header.replace("Именинники", "Юбилеи")
+    if not matches:
+        return (header + EMPTY_DAY_TEXT,)
+
+    if days_ahead == 0:
+        angel_text = "🎉 <b>СЕГОДНЯ ДЕНЬ АНГЕЛА!</b>"
+    elif days_ahead == 1:
+        angel_text = "🎉 <b>ДЕНЬ АНГЕЛА ЗАВТРА!</b>"
+    else:
+        angel_text = f"🎉 <b>ДЕНЬ АНГЕЛА ЧЕРЕЗ {days_ahead} ДНЯ(ДНЕЙ)!</b>"
+    target_ddmm = target_date.strftime("%d.%m")
+
+    lines = [header]
+    for idx, p in enumerate(matches, start=1):
+        if kind == "name":
+            entry = _name_day_entry(idx, p, p.name_day or target_ddmm) + f"\n   {angel_text}"
+        else:
+            entry = _detailed_entry(kind, idx, p, today)
+        lines.append(entry)
+        lines.append("")
+    return tuple(utils.split_message("\n".join(lines)))
+
+
+def build_month_report(
+    kind: str,
+    matches: List[Priest],
+    month: int,
+    today: date,
+    jubilee_only: bool = False,
+) -> Tuple[str, ...]:
+    """Части сообщения с именинниками за месяц month текущего года"""
+    if jubilee_only:
+        matches = filter_jubilees(kind, matches, today)
+
+    month_name = MONTH_NAMES[month] if 1 <= month <= 12 else str(month)
+    header = MONTH_HEADERS[kind].format(month=month_name, year=today.year)
+    if jubilee_only:
+        header = header.replace("Именинники", "Юбилеи")
+    if not matches:
+        return (header + "Никто не отмечает в этом месяце.",)
+
+    lines = [header]
+    for idx, p in enumerate(matches, start=1):
+        if kind == "name":
+            entry = _name_day_entry(idx, p, p.name_day or "не указано")
+        else:
+            entry = _detailed_entry(kind, idx, p, today)
+        lines.append(entry)
+        lines.append("")
+    return tuple(utils.split_message("\n".join(lines)))
+
+
+def _celebration_day(kind: str, p: Priest) -> Optional[int]:
+    """День месяца памятной даты — то же значение, что в календарном индексе"""
+    values = utils.calendar_values(
+        p.birth_date, p.name_day, p.deacon_ordination_date, p.priest_ordination_date
+    )
+    return values[Database.CELEBRATION_COLUMNS[kind][1]]
+
+
+def _buckets(snapshot_row: Tuple[Optional[int], ...]) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+    """(месяц, день) памятной даты каждого типа из строки get_calendar_snapshot"""
+    return {
+        kind: (snapshot_row[1 + 2 * i], snapshot_row[2 + 2 * i])
+        for i, kind in enumerate(Database.CELEBRATION_COLUMNS)
+    }
+
+
+class CelebrationsDigest:
+    """
+    Готовые отчёты «Именинники» на текущие сутки.
+
+    Ключи: ("days", kind, days_ahead, jubilee_only) и
+    ("month", kind, month, jubilee_only); значение — части сообщения. При
+    смене даты все отчёты сбрасываются.
+
+    Вместе с отчётами хранится снимок календаря (row_version и месяц/день
+    памятных дат каждой записи). После записи в priests снимок сравнивается
+    с новым, и удаляются только отчёты за дни и месяцы, в которые попадала
+    или попала изменённая запись; они строятся заново при запросе.
+    """
+
+    def __init__(self, days_ahead: int = config.CELEBRATIONS_DIGEST_DAYS):
+        self.days_ahead = days_ahead
+        self._day: Optional[date] = None
+        self._generation: Optional[int] = None
+        self._snapshot: Optional[Dict[int, Tuple[Optional[int], ...]]] = None
+        self._reports: Dict[Hashable, Tuple[str, ...]] = {}
+        self._refresh_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.invalidated = 0
+
+    def _reset_day(self, today: date) -> None:
+        if self._day != today:
+            self._reports = {}
+            self._day = today
+
+    async def refresh(self, db) -> int:
+        """
+        Построение всех отчётов на сегодня; возвращает их количество.
+
+        По каждому типу дат выбираются только нужные месяцы (текущий и, если
+        окно дней переходит через границу, следующий), отчёты на отдельные
+        дни получаются из той же выборки.
+        """
+        async with self._refresh_lock:
+            started = time.perf_counter()
+            today = date.today()
+            # Снимок читается до отчётов: они построены по данным не старее него
+            generation, snapshot = await db.get_calendar_snapshot()
+            window = [today + timedelta(days=offset) for offset in range(self.days_ahead + 1)]
+            months = sorted({today.month} | {target.month for target in window})
+
+            reports: Dict[Hashable, Tuple[str, ...]] = {}
+            for kind in KINDS:
+                by_month = {month: await db.get_celebrations_in_month(kind, month) for month in months}
+                by_day: Dict[date, List[Priest]] = {
+                    target: [p for p in by_month[target.month] if _celebration_day(kind, p) == target.day]
+                    for target in window
+                }
+
+                variants = (False, True) if kind in JUBILEE_KINDS else (False,)
+                for jubilee_only in variants:
+                    reports[("month", kind, today.month, jubilee_only)] = build_month_report(
+                        kind, by_month[today.month], today.month, today, jubilee_only
+                    )
+                    for offset, target in enumerate(window):
+                        reports[("days", kind, offset, jubilee_only)] = build_days_report(
+                            kind, by_day[target], target, offset, today, jubilee_only
+                        )
+
+            # Отчёты за другие месяцы, построенные по запросу, остаются, если они ещё актуальны
+            if self._day == today and self._generation == generation:
+                for key, parts in self._reports.items():
+                    reports.setdefault(key, parts)
+
+            self._day = today
+            self._generation = generation
+            self._snapshot = snapshot
+            self._reports = reports
+            self.refreshes += 1
+            logger.info(
+                "Отчёты «Именинники» на %s построены: %d шт. за %.0f мс (версия данных %s)",
+                today.strftime("%d.%m.%Y"), len(reports), (time.perf_counter() - started) * 1000, generation,
+            )
+            return len(reports)
+
+    def _affected(
+        self, snapshot: Dict[int, Tuple[Optional[int], ...]]
+    ) -> Tuple[set, set]:
+        """(kind, месяц, день) и (kind, месяц), затронутые изменениями с прошлого снимка"""
+        days = set()
+        months = set()
+        previous = self._snapshot or {}
+        for priest_id in previous.keys() | snapshot.keys():
+            old, new = previous.get(priest_id), snapshot.get(priest_id)
+            if old == new:
+                continue
+            for row in (old, new):
+                if row is None:
+                    continue
+                for kind, (month, day) in _buckets(row).items():
+                    if month is not None:
+                        days.add((kind, month, day))
+                        months.add((kind, month))
+        return days, months
+
+    async def sync(self, db) -> int:
+        """
+        Учёт записей в priests с прошлой проверки: удаляются только отчёты,
+        затронутые изменёнными записями. Возвращает число удалённых отчётов.
+        """
+        if self._generation is not None and await db.data_version() == self._generation:
+            return 0
+        async with self._refresh_lock:
+            generation, snapshot = await db.get_calendar_snapshot()
+            if generation == self._generation:
+                return 0
+
+            if self._snapshot is None:
+                stale = list(self._reports)
+            else:
+                days, months = self._affected(snapshot)
+                today = self._day or date.today()
+                stale = []
+                for key in self._reports:
+                    if key[0] == "days":
+                        _, kind, days_ahead, _ = key
+                        target = utils.get_target_date(days_ahead, today)
+                        if (kind, target.month, target.day) in days:
+                            stale.append(key)
+                    elif (key[1], key[2]) in months:
+                        stale.append(key)
+            for key in stale:
+                del self._reports[key]
+
+            self._generation = generation
+            self._snapshot = snapshot
+            self.invalidated += len(stale)
+            if stale:
+                logger.info("Отчёты «Именинники»: после записи в базу сброшено %d шт.", len(stale))
+            return len(stale)
+
+    async def _get(
+        self,
+        db,
+        key: Hashable,
+        build: Callable[[date], Awaitable[Tuple[str, ...]]],
+    ) -> Tuple[str, ...]:
+        today = date.today()
+        self._reset_day(today)
+        await self.sync(db)
+
+        parts = self._reports.get(key)
+        if parts is not None:
+            self.hits += 1
+            return parts
+
+        # Отчёта нет или его затронула запись в базу: строится только этот отчёт
+        self.misses += 1
+        parts = await build(today)
+        if self._day == today:
+            self._reports[key] = parts
+        return parts
+
+    async def days_report(self, db, kind: str, days_ahead: int, jubilee_only: bool = False) -> Tuple[str, ...]:
+        """Части отчёта на today + days_ahead"""
+        async def build(today: date) -> Tuple[str, ...]:
+            target_date = utils.get_target_date(days_ahead, today)
+            matches = await db.get_celebrations_on(kind, target_date.month, target_date.day)
+            return build_days_report(kind, matches, target_date, days_ahead, today, jubilee_only)
+
+        return await self._get(db, ("days", kind, days_ahead, jubilee_only), build)
+
+    async def month_report(self, db, kind: str, month: int, jubilee_only: bool = False) -> Tuple[str, ...]:
+        """Части отчёта за месяц month"""
+        async def build(today: date) -> Tuple[str, ...]:
+            matches = await db.get_celebrations_in_month(kind, month)
+            return build_month_report(kind, matches, month, today, jubilee_only)
+
+        return await self._get(db, ("month", kind, month, jubilee_only), build)
+
+    def stats(self) -> Dict[str, Any]:
+        """Количество готовых отчётов и доля попаданий"""
+        lookups = self.hits + self.misses
+        return {
+            "reports": len(self._reports),
+            "day": self._day.isoformat() if self._day else None,
+            "generation": self._generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "invalidated": self.invalidated,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+async def refresh_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Задача JobQueue: построение отчётов на новые сутки"""
+    digest: CelebrationsDigest = context.bot_data["celebrations_digest"]
+    await digest.refresh(context.bot_data["db"])
+
+
+async def check_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Задача JobQueue: сброс отчётов, затронутых записью в priests (без
+    пересчёта — он выполняется при запросе отчёта).
+    """
+    digest: CelebrationsDigest = context.bot_data["celebrations_digest"]
+    await digest.sync(context.bot_data["db"])
+
+
+def schedule(application: Application) -> bool:
+    """
+    Регистрация задач построения отчётов в JobQueue приложения.
+
+    Без установленного python-telegram-bot[job-queue] (application.job_queue
+    is None) отчёты строятся при первом нажатии и хранятся до конца суток.
+    """
+    job_queue = application.job_queue
+    if job_queue is None:
+        logger.warning(
+            "JobQueue недоступна (нужен python-telegram-bot[job-queue]): "
+            "отчёты «Именинники» будут строиться по запросу"
+        )
+        return False
+
+    # Полночь по местному времени сервера — той же зоне, что и date.today()
+    # в отчётах; при переходе на летнее время сдвиг подхватит check_job
+    local_tz = datetime.now().astimezone().tzinfo
+    job_queue.run_daily(refresh_job, time=dt_time(0, 0, tzinfo=local_tz), name="celebrations_digest")
+    job_queue.run_once(refresh_job, when=0, name="celebrations_digest_startup")
+    job_queue.run_repeating(
+        check_job,
+        interval=config.CELEBRATIONS_DIGEST_CHECK_INTERVAL,
+        first=config.CELEBRATIONS_DIGEST_CHECK_INTERVAL,
+        name="celebrations_digest_check",
+    )
+    return True
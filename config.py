@@ -16,11 +16,55 @@ ADMIN_IDS: List[int] = [
 
 # Настройки базы данных
 DATABASE_PATH = "database.db"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # Максимум свободных соединений в пуле
+DB_POOL_HEALTH_CHECK_INTERVAL = 60  # Через сколько секунд простоя проверять соединение перед выдачей
+DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", "4"))  # Потоков для параллельных чтений в боте
+
+# Настройки соединений SQLite (PRAGMA)
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")  # WAL: чтение не блокируется записью импорта
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")  # В режиме WAL NORMAL безопасен и быстрее FULL
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))  # Кэш страниц на соединение, КБ
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024)))  # Отображение файла в память, байт (0 — выключено)
+DB_TEMP_STORE = os.getenv("DB_TEMP_STORE", "MEMORY")  # Временные таблицы и сортировки в памяти
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))  # Сколько ждать освобождения блокировки, мс
 
 # Настройки бота
 MAX_MESSAGE_LENGTH = 4096  # Максимальная длина сообщения Telegram
 ITEMS_PER_PAGE = 10  # Количество элементов на странице
 
+# Импорт из Excel
+IMPORT_BATCH_SIZE = 2000  # Сколько строк записывать в базу одной транзакцией при потоковом импорте
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "0"))  # Процессов для разбора файлов (0 — по числу ядер)
+IMPORT_CHUNK_SIZE = 500  # Строк в одной части при параллельном разборе большого листа
+
+# Нечёткий поиск по ФИО (при отсутствии точных совпадений)
+FUZZY_SEARCH_LIMIT = 10  # Сколько вариантов предлагать
+FUZZY_MIN_SIMILARITY = 0.5  # Минимальная доля совпавших триграмм запроса
+
+# Кэш частых запросов (карточка по id, поиск по ФИО, выборка по статусу)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))  # Максимум записей, 0 — кэш выключен
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "300"))  # Время жизни записи, секунд
+
+# Кэш готовых сообщений (карточки и страницы /list), байт; 0 — кэш выключен
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Отчёты «Именинники», построенные заранее (задача JobQueue в полночь)
+CELEBRATIONS_DIGEST_DAYS = 7  # На сколько дней вперёд строить отчёты (кнопки «Сегодня» … «+7 дней»)
+CELEBRATIONS_DIGEST_CHECK_INTERVAL = int(os.getenv("CELEBRATIONS_DIGEST_CHECK_INTERVAL", "60"))  # Проверка изменений, секунд
+
+# Ежедневная рассылка «Именинники» администраторам (отказ — командой /unsubscribe)
+BROADCAST_ENABLED = os.getenv("BROADCAST_ENABLED", "1") != "0"
+BROADCAST_TIME = os.getenv("BROADCAST_TIME", "08:00")  # Время отправки (ЧЧ:ММ, местное время сервера)
+
+# Очередь исходящих сообщений (ограничение скорости отправки, см. outbox.py)
+OUTBOX_GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", "25"))  # Сообщений в секунду на всего бота (лимит Telegram — около 30)
+OUTBOX_GLOBAL_BURST = 25  # Сколько сообщений бота можно отправить подряд без ожидания
+OUTBOX_CHAT_RATE = float(os.getenv("OUTBOX_CHAT_RATE", "1"))  # Сообщений в секунду в один чат
+OUTBOX_CHAT_BURST = 5  # Сколько сообщений в один чат можно отправить подряд без ожидания
+OUTBOX_MAX_RETRIES = 3  # Повторов одного сообщения при flood control и сетевых ошибках
+OUTBOX_RETRY_DELAY = 1.0  # Начальная пауза перед повтором при сетевой ошибке, секунд (удваивается)
+OUTBOX_DRAIN_TIMEOUT = 10  # Сколько ждать отправки очереди при остановке бота, секунд
+
 # Статусы священников
 PRIEST_STATUSES = {
     "протоиерей": "Протоиерей",
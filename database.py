@@ -1,318 +1,791 @@
 """
 Модуль для работы с базой данных
 """
+import logging
+import os
+import re
 import sqlite3
-from datetime import date, datetime
-from typing import List, Optional
-from models import Priest
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from models import Priest, PriestSummary
+from db_pool import get_pool, get_writer, open_connection
+from fuzzy_index import get_trigram_index
+from query_cache import get_query_cache
+from row_decoder import PriestRowDecoder
+import schema
+import utils
 import config
 
+logger = logging.getLogger(__name__)
+
 
 class Database:
     """Класс для работы с базой данных SQLite"""
+
+    # Колонки календарного индекса (месяц, день) для каждого типа памятных дат
+    CELEBRATION_COLUMNS = {
+        "bday": ("birth_month", "birth_day"),
+        "name": ("name_day_month", "name_day_day"),
+        "ord": ("ord_month", "ord_day"),
+    }
+
+    # Колонки полнотекстового индекса priests_fts
+    FTS_COLUMNS = schema.FTS_COLUMNS
+    # Колонки, по которым ищет search_priests (только ФИО)
+    FTS_NAME_COLUMNS = ("name", "patronymic", "surname")
+
+    # Колонки для облегчённых записей PriestSummary
+    SUMMARY_SELECT = (
+        "priests.id, priests.name, priests.patronymic, priests.surname, "
+        "priests.status, priests.service_place"
+    )
+
+    # Результаты bulk_upsert для каждой записи
+    UPSERT_INSERTED = "inserted"
+    UPSERT_UPDATED = "updated"
+    UPSERT_SKIPPED = "skipped"
     
-    def __init__(self, db_path: str = config.DATABASE_PATH):
+    def __init__(self, db_path: str = config.DATABASE_PATH, read_only: bool = False):
+        """
+        read_only — только чтение (пробный импорт): миграции схемы не
+        выполняются, а любая запись завершается ошибкой.
+        """
         self.db_path = db_path
-        self.init_database()
+        self.read_only = read_only
+        # Чтения идут через пул соединений только для чтения, записи — через
+        # единственное соединение-писатель
+        self._pool = get_pool(db_path)
+        self._writer = get_writer(db_path)
+        if read_only:
+            if not os.path.exists(db_path):
+                raise FileNotFoundError(f"База данных не найдена: {db_path}")
+            with self._pool.connection() as conn:
+                schema.check_schema(db_path, conn)
+        else:
+            # Схема проверяется один раз на процесс, а не при каждом создании объекта
+            schema.ensure_schema(db_path, self._writer.connection)
+        self._fts_available: Optional[bool] = None
+        self._trigram_index = get_trigram_index(db_path)
+        # (версия данных, количество записей) для get_total_count
+        self._count_cache: Optional[Tuple[int, int]] = None
+        # Кэш частых чтений; сбрасывается сменой версии данных (table_versions)
+        self._query_cache = get_query_cache(db_path, config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
     
+    @property
+    def fts_available(self) -> bool:
+        """Есть ли в базе полнотекстовый индекс (SQLite собран с FTS5)"""
+        if self._fts_available is None:
+            with self._pool.connection() as conn:
+                row = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'priests_fts'"
+                ).fetchone()
+            self._fts_available = row is not None
+        return self._fts_available
+
     def get_connection(self) -> sqlite3.Connection:
-        """Получение соединения с базой данных"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Получение отдельного (не из пула) соединения с базой данных"""
+        return open_connection(self.db_path)
+
+    @contextmanager
+    def _write_transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Транзакция записи: BEGIN IMMEDIATE сразу берёт блокировку записи,
+        поэтому прочитанная внутри версия данных согласована с изменениями.
+        """
+        if self.read_only:
+            raise RuntimeError(f"База {self.db_path} открыта только для чтения")
+        with self._writer.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    @staticmethod
+    def _data_version(conn: sqlite3.Connection) -> int:
+        """Счётчик изменений таблицы priests (увеличивается триггерами)"""
+        return conn.execute(
+            "SELECT version FROM table_versions WHERE name = 'priests'"
+        ).fetchone()[0]
+
+    def data_version(self) -> int:
+        """Текущая версия данных таблицы priests (меняется при любой записи)"""
+        with self._pool.connection() as conn:
+            return self._data_version(conn)
+
+    def pool_stats(self) -> dict:
+        """Счётчики попаданий/промахов пула соединений и число записей"""
+        return {**self._pool.stats(), **self._writer.stats()}
     
     def init_database(self):
-        """Инициализация базы данных и создание таблиц"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Базовое создание таблицы (при первом запуске)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS priests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                patronymic TEXT,
-                surname TEXT NOT NULL,
-                birth_date DATE,
-                birth_place TEXT,
-                nationality TEXT,
-                status TEXT NOT NULL,
-                name_day TEXT,
-                deacon_ordination_date DATE,
-                priest_ordination_date DATE,
-                ordination_date DATE,
-                service_place TEXT,
-                education TEXT,
-                secular_education TEXT,
-                last_reward TEXT,
-                phone TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Миграции для уже существующих баз данных (добавление недостающих колонок)
-        cursor.execute("PRAGMA table_info(priests)")
-        existing_columns = {row["name"] for row in cursor.fetchall()}
-
-        migrations = [
-            ("patronymic", "TEXT"),
-            ("nationality", "TEXT"),
-            ("name_day", "TEXT"),
-            ("deacon_ordination_date", "DATE"),
-            ("priest_ordination_date", "DATE"),
-            ("secular_education", "TEXT"),
-            ("phone", "TEXT"),
-        ]
-
-        for column_name, column_type in migrations:
-            if column_name not in existing_columns:
-                cursor.execute(
-                    f"ALTER TABLE priests ADD COLUMN {column_name} {column_type}"
-                )
-        
-        conn.commit()
-        conn.close()
+        """Инициализация базы данных: применение недостающих миграций схемы"""
+        if self.read_only:
+            raise RuntimeError(f"База {self.db_path} открыта только для чтения")
+        with self._writer.connection() as conn:
+            schema.apply_migrations(conn)
     
+    def _priest_values(self, priest: Priest) -> Dict[str, Any]:
+        """Значения колонок таблицы priests для записи объекта Priest"""
+        values = {
+            "name": priest.name,
+            "patronymic": priest.patronymic,
+            "surname": priest.surname,
+            "birth_date": priest.birth_date.isoformat() if priest.birth_date else None,
+            "birth_place": priest.birth_place,
+            "nationality": priest.nationality,
+            "status": priest.status,
+            "name_day": priest.name_day,
+            "deacon_ordination_date": priest.deacon_ordination_date.isoformat() if priest.deacon_ordination_date else None,
+            "priest_ordination_date": priest.priest_ordination_date.isoformat() if priest.priest_ordination_date else None,
+            "ordination_date": priest.ordination_date.isoformat() if priest.ordination_date else None,
+            "service_place": priest.service_place,
+            "education": priest.education,
+            "secular_education": priest.secular_education,
+            "last_reward": priest.last_reward,
+            "phone": priest.phone,
+        }
+        # Календарный индекс (месяц/день памятных дат) обновляется вместе с записью
+        values.update(utils.calendar_values(
+            priest.birth_date,
+            priest.name_day,
+            priest.deacon_ordination_date,
+            priest.priest_ordination_date,
+        ))
+        # Нормализованные ключи для индексного поиска по ФИО
+        values["surname_norm"] = utils.normalize_search_key(priest.surname)
+        values["name_norm"] = utils.normalize_search_key(priest.name)
+        values["fio_norm"] = utils.fio_search_key(priest.surname, priest.name, priest.patronymic)
+        return values
+
     def add_priest(self, priest: Priest) -> int:
         """Добавление нового священника"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO priests (
-                name,
-                patronymic,
-                surname,
-                birth_date,
-                birth_place,
-                nationality,
-                status,
-                name_day,
-                deacon_ordination_date,
-                priest_ordination_date,
-                ordination_date,
-                service_place,
-                education,
-                secular_education,
-                last_reward,
-                phone
+        values = self._priest_values(priest)
+        columns = ", ".join(values)
+        placeholders = ", ".join(f":{column}" for column in values)
+
+        with self._write_transaction() as conn:
+            version_before = self._data_version(conn)
+            cursor = conn.execute(
+                f"INSERT INTO priests ({columns}) VALUES ({placeholders})",
+                values,
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            priest.name,
-            priest.patronymic,
-            priest.surname,
-            priest.birth_date.isoformat() if priest.birth_date else None,
-            priest.birth_place,
-            priest.nationality,
-            priest.status,
-            priest.name_day,
-            priest.deacon_ordination_date.isoformat() if priest.deacon_ordination_date else None,
-            priest.priest_ordination_date.isoformat() if priest.priest_ordination_date else None,
-            priest.ordination_date.isoformat() if priest.ordination_date else None,
-            priest.service_place,
-            priest.education,
-            priest.secular_education,
-            priest.last_reward,
-            priest.phone
-        ))
-        
-        priest_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            priest_id = cursor.lastrowid
+            version_after = self._data_version(conn)
+
+        self._trigram_index.apply([(priest_id, values["fio_norm"])], version_before, version_after)
         return priest_id
     
+    def _cached(self, key: Tuple, loader: Callable[[], Any]) -> Any:
+        """Чтение через кэш запросов с проверкой текущей версии данных"""
+        if not self._query_cache.enabled:
+            return loader()
+        with self._pool.connection() as conn:
+            generation = self._data_version(conn)
+        return self._query_cache.get_or_load(key, generation, loader)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Статистика кэша запросов (размер, попадания, промахи, hit_rate)"""
+        return self._query_cache.stats()
+
     def get_priest_by_id(self, priest_id: int) -> Optional[Priest]:
         """Получение священника по ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        return self._cached(("id", priest_id), lambda: self._load_priest_by_id(priest_id))
+
+    def _load_priest_by_id(self, priest_id: int) -> Optional[Priest]:
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM priests WHERE id = ?", (priest_id,))
-        row = cursor.fetchone()
-        conn.close()
+            cursor.execute("SELECT * FROM priests WHERE id = ?", (priest_id,))
+            row = cursor.fetchone()
         
         if row:
-            return self._row_to_priest(row)
+            return PriestRowDecoder(cursor.description).decode(row)
         return None
     
-    def search_priests(self, query: str) -> List[Priest]:
-        """Поиск священников по имени, фамилии или полному ФИО"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        search_term = f"%{query.lower()}%"
-        cursor.execute("""
-            SELECT * FROM priests 
-            WHERE LOWER(name) LIKE ?
-               OR LOWER(surname) LIKE ?
-               OR LOWER(surname || ' ' || name || ' ' || COALESCE(patronymic, '')) LIKE ?
-            ORDER BY surname, name
-        """, (search_term, search_term, search_term))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [self._row_to_priest(row) for row in rows]
+    def search_priests(self, query: str, summary: bool = False) -> List[Priest]:
+        """
+        Поиск священников по имени, фамилии или полному ФИО.
+
+        При summary=True возвращаются облегчённые записи PriestSummary.
+        Результаты кэшируются по запросу без учёта регистра и лишних пробелов.
+        """
+        key = ("search", " ".join(query.casefold().split()), summary)
+        return self._cached(key, lambda: self._search_priests(query, summary))
+
+    def _search_priests(self, query: str, summary: bool) -> List[Priest]:
+        if self.fts_available:
+            # Индекс хранит нормализованный текст и находит всё, что нашёл бы
+            # префиксный поиск по ключам ФИО, поэтому второй запрос не нужен
+            try:
+                return self.search_priests_fts(query, columns=self.FTS_NAME_COLUMNS, summary=summary)
+            except sqlite3.OperationalError as e:
+                logger.warning("Ошибка полнотекстового поиска по запросу %r: %s", query, e)
+
+        # Префиксный поиск по нормализованным ключам (учитывает і/и, ё/е и т.п.)
+        return self.search_priests_normalized(query, summary=summary)
+
+    def search_priest_summaries(self, query: str) -> List[PriestSummary]:
+        """Поиск по ФИО с краткими записями (для списков результатов)"""
+        return self.search_priests(query, summary=True)
+
+    @staticmethod
+    def _prefix_bounds(prefix: str) -> Tuple[str, str]:
+        """Границы диапазона [prefix, upper) для префиксного поиска по B-tree индексу"""
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    def search_priests_normalized(self, query: str, summary: bool = False) -> List[Priest]:
+        """
+        Префиксный поиск по колонкам surname_norm, name_norm и fio_norm.
+
+        Условие записано диапазоном (col >= prefix AND col < upper), поэтому
+        каждая ветка OR использует свой индекс, без полного сканирования.
+        """
+        key = utils.normalize_search_key(query)
+        if not key:
+            return []
+        low, high = self._prefix_bounds(key)
+        select = self._select_columns(summary)
+
+        with self._pool.connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT {select} FROM priests
+                WHERE (surname_norm >= :low AND surname_norm < :high)
+                   OR (name_norm >= :low AND name_norm < :high)
+                   OR (fio_norm >= :low AND fio_norm < :high)
+                ORDER BY surname, name
+            """, {"low": low, "high": high})
+            rows = cursor.fetchall()
+
+        return self._decode(cursor, rows, summary)
+
+    def backfill_search_keys(self) -> int:
+        """Пересчёт нормализованных ключей поиска для всех записей"""
+        with self._write_transaction() as conn:
+            return schema.backfill_search_keys(conn.cursor())
+
+    def fuzzy_search(
+        self,
+        query: str,
+        limit: int = config.FUZZY_SEARCH_LIMIT,
+        summary: bool = False,
+    ) -> List[Priest]:
+        """
+        Нечёткий поиск по ФИО (устойчив к опечаткам).
+
+        Использует триграммный индекс в памяти (fuzzy_index.TrigramIndex),
+        который перестраивается, только если таблицу priests изменили в
+        обход этого процесса. Записи упорядочены по доле совпавших триграмм
+        запроса, затем по сходству Жаккара; отсекаются записи с долей ниже
+        config.FUZZY_MIN_SIMILARITY.
+        """
+        key = utils.normalize_search_key(query)
+        if not key:
+            return []
+
+        with self._pool.connection() as conn:
+            version = self._data_version(conn)
+            if self._trigram_index.version != version:
+                rows = conn.execute("SELECT id, fio_norm FROM priests").fetchall()
+                self._trigram_index.rebuild(((row["id"], row["fio_norm"]) for row in rows), version)
+
+            matches = self._trigram_index.search(key, limit, config.FUZZY_MIN_SIMILARITY)
+            if not matches:
+                return []
+
+            ids = [priest_id for priest_id, _, _ in matches]
+            placeholders = ", ".join("?" for _ in ids)
+            cursor = conn.execute(
+                f"SELECT {self._select_columns(summary)} FROM priests WHERE id IN ({placeholders})", ids
+            )
+            rows = cursor.fetchall()
+
+        rows_by_id = {row["id"]: row for row in rows}
+        return self._decode(cursor, [rows_by_id[i] for i in ids if i in rows_by_id], summary)
+
+    @staticmethod
+    def _fts_match_expression(query: str, columns: Optional[Tuple[str, ...]] = None) -> str:
+        """
+        Построение выражения MATCH для FTS5.
+
+        Запрос нормализуется так же, как текст индекса (normalize_search_key),
+        каждое слово становится префиксным термом ("иван"*), все термы должны
+        присутствовать в записи. Разбиение на слова совпадает с токенизатором
+        unicode61 (разделитель — всё, кроме букв и цифр).
+        """
+        tokens = re.findall(r"[^\W_]+", utils.normalize_search_key(query))
+        if not tokens:
+            return ""
+        terms = " ".join(f'"{token}"*' for token in tokens)
+        if columns:
+            return f"{{{' '.join(columns)}}} : ({terms})"
+        return terms
+
+    def search_priests_fts(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        columns: Optional[Tuple[str, ...]] = None,
+        summary: bool = False,
+    ) -> List[Priest]:
+        """
+        Полнотекстовый поиск с префиксным совпадением и ранжированием (bm25).
+
+        По умолчанию ищет по всем колонкам индекса (ФИО, место служения,
+        сан); columns ограничивает поиск частью из FTS_COLUMNS.
+        """
+        match = self._fts_match_expression(query, columns)
+        if not match:
+            return []
+        select = self._select_columns(summary)
+
+        with self._pool.connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT {select} FROM priests_fts
+                JOIN priests ON priests.id = priests_fts.rowid
+                WHERE priests_fts MATCH ?
+                ORDER BY priests_fts.rank, priests.surname, priests.name
+                LIMIT ?
+            """, (match, limit if limit else -1))
+            rows = cursor.fetchall()
+
+        return self._decode(cursor, rows, summary)
     
     def get_all_priests(self, limit: Optional[int] = None, offset: int = 0) -> List[Priest]:
         """Получение всех священников с пагинацией"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
         
-        if limit:
-            cursor.execute("""
-                SELECT * FROM priests 
-                ORDER BY surname, name
-                LIMIT ? OFFSET ?
-            """, (limit, offset))
-        else:
-            cursor.execute("""
-                SELECT * FROM priests 
-                ORDER BY surname, name
-            """)
+            if limit:
+                cursor.execute("""
+                    SELECT * FROM priests 
+                    ORDER BY surname, name, id
+                    LIMIT ? OFFSET ?
+                """, (limit, offset))
+            else:
+                cursor.execute("""
+                    SELECT * FROM priests 
+                    ORDER BY surname, name, id
+                """)
         
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
         
-        return [self._row_to_priest(row) for row in rows]
+        return self._decode(cursor, rows)
     
-    def get_priests_by_status(self, status: str) -> List[Priest]:
-        """Получение священников по статусу"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def get_priests_page(
+        self,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = config.ITEMS_PER_PAGE,
+    ) -> Tuple[List[Priest], bool]:
+        """
+        Страница списка в порядке (фамилия, имя, id) по ключу (keyset).
+
+        after_id — следующая страница после записи с этим id, before_id —
+        предыдущая страница перед ней; без параметров — первая страница.
+        Возвращает (записи, есть_ли_ещё_записи_в_этом_направлении). Если
+        опорная запись уже удалена, возвращается пустой список.
+        """
+        if after_id is not None:
+            where = "WHERE (surname, name, id) > (SELECT surname, name, id FROM priests WHERE id = :anchor)"
+            order = "surname, name, id"
+        elif before_id is not None:
+            where = "WHERE (surname, name, id) < (SELECT surname, name, id FROM priests WHERE id = :anchor)"
+            order = "surname DESC, name DESC, id DESC"
+        else:
+            where = ""
+            order = "surname, name, id"
+
+        with self._pool.connection() as conn:
+            # Лишняя запись показывает, есть ли продолжение
+            cursor = conn.execute(
+                f"SELECT * FROM priests {where} ORDER BY {order} LIMIT :limit",
+                {"anchor": after_id if after_id is not None else before_id, "limit": limit + 1},
+            )
+            rows = cursor.fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before_id is not None:
+            rows.reverse()
+        return self._decode(cursor, rows), has_more
+
+    def get_page_anchor(self, page: int, limit: int = config.ITEMS_PER_PAGE) -> Optional[int]:
+        """
+        id последней записи перед страницей page (для перехода к ней через
+        get_priests_page(after_id=...)); None — если такой страницы нет.
+
+        Записи перед страницей пропускаются только по индексу
+        (фамилия, имя, id), без чтения и разбора самих строк.
+        """
+        if page <= 0:
+            return None
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                """
+                SELECT id FROM priests INDEXED BY idx_priests_surname_name_id
+                ORDER BY surname, name, id
+                LIMIT 1 OFFSET ?
+                """,
+                (page * limit - 1,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_priests_by_status(self, status: str, summary: bool = False) -> List[Priest]:
+        """Получение священников по статусу (через кэш запросов)"""
+        key = ("status", status, summary)
+        return self._cached(key, lambda: self._load_priests_by_status(status, summary))
+
+    def _load_priests_by_status(self, status: str, summary: bool) -> List[Priest]:
+        select = self._select_columns(summary)
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT * FROM priests 
-            WHERE LOWER(status) = LOWER(?)
-            ORDER BY surname, name
-        """, (status,))
+            cursor.execute(f"""
+                SELECT {select} FROM priests 
+                WHERE LOWER(status) = LOWER(?)
+                ORDER BY surname, name
+            """, (status,))
         
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
         
-        return [self._row_to_priest(row) for row in rows]
+        return self._decode(cursor, rows, summary)
+
+    def get_priest_summaries_by_status(self, status: str) -> List[PriestSummary]:
+        """Краткие записи священников с указанным статусом"""
+        return self.get_priests_by_status(status, summary=True)
     
+    def get_celebrations_on(self, kind: str, month: int, day: int) -> List[Priest]:
+        """Священники, у которых памятная дата типа kind приходится на day.month"""
+        month_column, day_column = self.CELEBRATION_COLUMNS[kind]
+        with self._pool.connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT * FROM priests
+                WHERE {month_column} = ? AND {day_column} = ?
+                ORDER BY surname, name
+            """, (month, day))
+            rows = cursor.fetchall()
+
+        return self._decode(cursor, rows)
+
+    def get_celebrations_in_month(self, kind: str, month: int) -> List[Priest]:
+        """Священники, у которых памятная дата типа kind приходится на месяц month"""
+        month_column, _ = self.CELEBRATION_COLUMNS[kind]
+        with self._pool.connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT * FROM priests
+                WHERE {month_column} = ?
+                ORDER BY surname, name
+            """, (month,))
+            rows = cursor.fetchall()
+
+        return self._decode(cursor, rows)
+
+    def get_calendar_snapshot(self) -> Tuple[int, Dict[int, Tuple[Optional[int], ...]]]:
+        """
+        Версия данных и для каждой записи (row_version, затем месяц и день
+        по каждому типу дат в порядке CELEBRATION_COLUMNS), прочитанные в
+        одной транзакции — для точечной инвалидации отчётов «Именинники».
+        """
+        columns = ", ".join(
+            f"{month_column}, {day_column}" for month_column, day_column in self.CELEBRATION_COLUMNS.values()
+        )
+        with self._pool.connection() as conn:
+            # Версия и строки — из одного снимка базы
+            conn.execute("BEGIN")
+            version = self._data_version(conn)
+            rows = conn.execute(f"SELECT id, row_version, {columns} FROM priests").fetchall()
+            conn.rollback()
+        return version, {row[0]: tuple(row[1:]) for row in rows}
+
     def update_priest(self, priest: Priest) -> bool:
         """Обновление информации о священнике"""
         if not priest.id:
             return False
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE priests 
-            SET 
-                name = ?,
-                patronymic = ?,
-                surname = ?,
-                birth_date = ?,
-                birth_place = ?,
-                nationality = ?,
-                status = ?,
-                name_day = ?,
-                deacon_ordination_date = ?,
-                priest_ordination_date = ?,
-                ordination_date = ?,
-                service_place = ?,
-                education = ?,
-                secular_education = ?,
-                last_reward = ?,
-                phone = ?,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (
-            priest.name,
-            priest.patronymic,
-            priest.surname,
-            priest.birth_date.isoformat() if priest.birth_date else None,
-            priest.birth_place,
-            priest.nationality,
-            priest.status,
-            priest.name_day,
-            priest.deacon_ordination_date.isoformat() if priest.deacon_ordination_date else None,
-            priest.priest_ordination_date.isoformat() if priest.priest_ordination_date else None,
-            priest.ordination_date.isoformat() if priest.ordination_date else None,
-            priest.service_place,
-            priest.education,
-            priest.secular_education,
-            priest.last_reward,
-            priest.phone,
-            priest.id
-        ))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
+        values = self._priest_values(priest)
+        assignments = ", ".join(f"{column} = :{column}" for column in values)
+        values["id"] = priest.id
+
+        with self._write_transaction() as conn:
+            version_before = self._data_version(conn)
+            cursor = conn.execute(
+                f"UPDATE priests SET {assignments}, updated_at = CURRENT_TIMESTAMP, "
+                "row_version = row_version + 1 WHERE id = :id",
+                values,
+            )
+            success = cursor.rowcount > 0
+            version_after = self._data_version(conn)
+
+        if success:
+            self._trigram_index.apply([(priest.id, values["fio_norm"])], version_before, version_after)
         return success
     
     def delete_priest(self, priest_id: int) -> bool:
         """Удаление священника"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM priests WHERE id = ?", (priest_id,))
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
+        with self._write_transaction() as conn:
+            version_before = self._data_version(conn)
+            cursor = conn.execute("DELETE FROM priests WHERE id = ?", (priest_id,))
+            success = cursor.rowcount > 0
+            version_after = self._data_version(conn)
+
+        if success:
+            self._trigram_index.apply([(priest_id, None)], version_before, version_after)
         return success
-    
+
+    @staticmethod
+    def _existing_ids(conn: sqlite3.Connection, column: str, values: List[Any]) -> Dict[Any, int]:
+        """Отображение значение колонки -> id для уже существующих записей"""
+        found: Dict[Any, int] = {}
+        unique_values = list(dict.fromkeys(values))
+        # Ограничение SQLite на число параметров в одном запросе
+        for start in range(0, len(unique_values), 500):
+            chunk = unique_values[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            for priest_id, value in conn.execute(
+                f"SELECT id, {column} FROM priests WHERE {column} IN ({placeholders})", chunk
+            ):
+                found[value] = priest_id
+        return found
+
+    def update_phones(self, phones: List[Tuple[int, str]]) -> int:
+        """
+        Пакетное обновление телефонов одной транзакцией.
+
+        phones — пары (id, телефон). Возвращает число обновлённых записей.
+        """
+        if not phones:
+            return 0
+
+        with self._write_transaction() as conn:
+            version_before = self._data_version(conn)
+            cursor = conn.executemany(
+                "UPDATE priests SET phone = ?, updated_at = CURRENT_TIMESTAMP, "
+                "row_version = row_version + 1 WHERE id = ?",
+                [(phone, priest_id) for priest_id, phone in phones],
+            )
+            updated = cursor.rowcount
+            version_after = self._data_version(conn)
+
+        # ФИО не менялись: индексу достаточно узнать новую версию данных
+        self._trigram_index.apply([], version_before, version_after)
+        return updated
+
+    def get_identity_names(self) -> List[Tuple[int, str, str, str]]:
+        """(id, фамилия, имя, отчество) всех записей по возрастанию id — для индекса личностей при импорте"""
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT id, surname, name, patronymic FROM priests ORDER BY id"
+            ).fetchall()
+        return [(row[0], row[1], row[2], row[3] or "") for row in rows]
+
+    def delete_priests(self, priest_ids: List[int]) -> int:
+        """Пакетное удаление записей одной транзакцией. Возвращает число удалённых"""
+        if not priest_ids:
+            return 0
+
+        with self._write_transaction() as conn:
+            version_before = self._data_version(conn)
+            cursor = conn.executemany("DELETE FROM priests WHERE id = ?", [(i,) for i in priest_ids])
+            deleted = cursor.rowcount
+            version_after = self._data_version(conn)
+
+        self._trigram_index.apply([(i, None) for i in priest_ids], version_before, version_after)
+        return deleted
+
+    def get_import_state(self, source: str) -> Dict[str, Tuple[str, Optional[int]]]:
+        """Состояние инкрементального импорта файла: ключ строки -> (хэш, id записи)"""
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT row_key, content_hash, priest_id FROM import_state WHERE source = ?",
+                (source,),
+            ).fetchall()
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def save_import_state(
+        self,
+        source: str,
+        entries: List[Tuple[str, str, Optional[int]]],
+        removed_keys: List[str] = (),
+    ) -> None:
+        """
+        Сохранение состояния импорта файла одной транзакцией.
+
+        entries — тройки (ключ строки, хэш, id записи); removed_keys —
+        ключи строк, исчезнувших из файла.
+        """
+        if not entries and not removed_keys:
+            return
+
+        with self._write_transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO import_state (source, row_key, content_hash, priest_id)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(source, row_key) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    priest_id = excluded.priest_id,
+                    imported_at = CURRENT_TIMESTAMP
+                """,
+                [(source, row_key, content_hash, priest_id) for row_key, content_hash, priest_id in entries],
+            )
+            conn.executemany(
+                "DELETE FROM import_state WHERE source = ? AND row_key = ?",
+                [(source, row_key) for row_key in removed_keys],
+            )
+
+    def get_broadcast_optouts(self) -> Set[int]:
+        """ID администраторов, отказавшихся от ежедневной рассылки"""
+        with self._pool.connection() as conn:
+            rows = conn.execute("SELECT user_id FROM broadcast_optout").fetchall()
+        return {row[0] for row in rows}
+
+    def set_broadcast_optout(self, user_id: int, opted_out: bool) -> None:
+        """Отказ от ежедневной рассылки (opted_out=True) или возобновление подписки"""
+        with self._write_transaction() as conn:
+            if opted_out:
+                conn.execute(
+                    "INSERT OR IGNORE INTO broadcast_optout (user_id) VALUES (?)", (user_id,)
+                )
+            else:
+                conn.execute("DELETE FROM broadcast_optout WHERE user_id = ?", (user_id,))
+
+    def bulk_upsert(
+        self,
+        priests: List[Priest],
+        key: str = "fio",
+        update_existing: bool = True,
+    ) -> List[str]:
+        """
+        Массовая вставка/обновление в одной транзакции (для импорта).
+
+        key="fio" — запись ищется по нормализованному ФИО (identity_key),
+        key="id" — по priest.id. Существующие записи обновляются, если
+        update_existing, иначе пропускаются.
+
+        Пустая ячейка импорта поле не очищает: при обновлении пустые значения
+        (None или "") не затирают сохранённые — файл, в котором нет колонки
+        телефона, не стирает телефоны. Очистить поле можно только через
+        update_priest. Запись, в которой после этого ничего не меняется, не
+        перезаписывается (не меняются updated_at и row_version).
+
+        Возвращает для каждого переданного объекта UPSERT_INSERTED,
+        UPSERT_UPDATED или UPSERT_SKIPPED; у объектов заполняется priest.id.
+        """
+        if key not in ("fio", "id"):
+            raise ValueError(f"Неизвестный ключ bulk_upsert: {key}")
+        if not priests:
+            return []
+
+        rows = [self._priest_values(priest) for priest in priests]
+        if key == "fio":
+            conflict_column = "identity_key"
+            for row in rows:
+                row["identity_key"] = row["fio_norm"]
+        else:
+            conflict_column = "id"
+            for row, priest in zip(rows, priests):
+                if not priest.id:
+                    raise ValueError("bulk_upsert(key='id'): у записи не задан id")
+                row["id"] = priest.id
+
+        columns = list(rows[0])
+        placeholders = ", ".join(f":{column}" for column in columns)
+        if update_existing:
+            # Обновляются только те колонки, которые строка импорта заполняет,
+            # и только если хотя бы одна из них действительно меняется
+            new_values = {
+                column: f"COALESCE(NULLIF(excluded.{column}, ''), {column})"
+                for column in columns
+                if column not in ("id", "identity_key")
+            }
+            assignments = ", ".join(f"{column} = {value}" for column, value in new_values.items())
+            changed = " OR ".join(f"{column} IS NOT {value}" for column, value in new_values.items())
+            on_conflict = (
+                f"DO UPDATE SET {assignments}, updated_at = CURRENT_TIMESTAMP, "
+                f"row_version = row_version + 1 WHERE {changed}"
+            )
+        else:
+            on_conflict = "DO NOTHING"
+        sql = (
+            f"INSERT INTO priests ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT({conflict_column}) {on_conflict}"
+        )
+
+        keys = [row[conflict_column] for row in rows]
+        with self._write_transaction() as conn:
+            version_before = self._data_version(conn)
+            existing = self._existing_ids(conn, conflict_column, keys)
+
+            # Повтор ключа внутри пакета тоже считается существующей записью
+            outcomes = []
+            seen = set(existing)
+            for row_key in keys:
+                if row_key in seen:
+                    outcomes.append(self.UPSERT_UPDATED if update_existing else self.UPSERT_SKIPPED)
+                else:
+                    outcomes.append(self.UPSERT_INSERTED)
+                    seen.add(row_key)
+
+            conn.executemany(sql, rows)
+            ids = self._existing_ids(conn, conflict_column, keys)
+            version_after = self._data_version(conn)
+
+        changes = []
+        for priest, row, row_key, outcome in zip(priests, rows, keys, outcomes):
+            priest.id = ids.get(row_key, priest.id)
+            if outcome != self.UPSERT_SKIPPED:
+                changes.append((priest.id, row["fio_norm"]))
+        self._trigram_index.apply(changes, version_before, version_after)
+
+        logger.info(
+            "bulk_upsert: %s записей, добавлено %s, обновлено %s, пропущено %s",
+            len(outcomes),
+            outcomes.count(self.UPSERT_INSERTED),
+            outcomes.count(self.UPSERT_UPDATED),
+            outcomes.count(self.UPSERT_SKIPPED),
+        )
+        return outcomes
+
     def get_total_count(self) -> int:
-        """Получение общего количества священников"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) as count FROM priests")
-        count = cursor.fetchone()["count"]
-        conn.close()
+        """
+        Получение общего количества священников.
+
+        Результат кэшируется до следующего изменения таблицы (по счётчику
+        table_versions), так что COUNT(*) выполняется только после записи.
+        """
+        with self._pool.connection() as conn:
+            version = self._data_version(conn)
+            cached = self._count_cache
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) as count FROM priests")
+            count = cursor.fetchone()["count"]
         
+        self._count_cache = (version, count)
         return count
     
-    def _row_to_priest(self, row: sqlite3.Row) -> Priest:
-        """Преобразование строки из БД в объект Priest"""
-        birth_date = None
-        if row["birth_date"]:
-            birth_date = datetime.strptime(row["birth_date"], "%Y-%m-%d").date()
-        
-        ordination_date = None
-        if row["ordination_date"]:
-            ordination_date = datetime.strptime(row["ordination_date"], "%Y-%m-%d").date()
+    def _select_columns(self, summary: bool) -> str:
+        """Список колонок SELECT для полной или краткой записи"""
+        return self.SUMMARY_SELECT if summary else "priests.*"
 
-        deacon_ordination_date = None
-        if "deacon_ordination_date" in row.keys() and row["deacon_ordination_date"]:
-            deacon_ordination_date = datetime.strptime(row["deacon_ordination_date"], "%Y-%m-%d").date()
+    def _decode(self, cursor: sqlite3.Cursor, rows: List[sqlite3.Row], summary: bool = False) -> list:
+        """Преобразование строк выборки в Priest (или PriestSummary при summary=True)"""
+        if summary:
+            return [self._row_to_summary(row) for row in rows]
+        return PriestRowDecoder(cursor.description).decode_all(rows)
 
-        priest_ordination_date = None
-        if "priest_ordination_date" in row.keys() and row["priest_ordination_date"]:
-            priest_ordination_date = datetime.strptime(row["priest_ordination_date"], "%Y-%m-%d").date()
-        
-        created_at = None
-        if row["created_at"]:
-            created_at = datetime.strptime(row["created_at"], "%Y-%m-%d %H:%M:%S")
-        
-        updated_at = None
-        if row["updated_at"]:
-            updated_at = datetime.strptime(row["updated_at"], "%Y-%m-%d %H:%M:%S")
-        
-        return Priest(
+    @staticmethod
+    def _row_to_summary(row: sqlite3.Row) -> PriestSummary:
+        """Преобразование строки из БД в краткую запись (без разбора дат)"""
+        return PriestSummary(
             id=row["id"],
             name=row["name"],
             patronymic=row["patronymic"] or "",
             surname=row["surname"],
-            birth_date=birth_date,
-            birth_place=row["birth_place"] or "",
-            nationality=row["nationality"] or "" if "nationality" in row.keys() else "",
             status=row["status"],
-            name_day=row["name_day"] or "" if "name_day" in row.keys() else "",
-            deacon_ordination_date=deacon_ordination_date,
-            priest_ordination_date=priest_ordination_date,
-            ordination_date=ordination_date,
             service_place=row["service_place"] or "",
-            education=row["education"] or "",
-            secular_education=row["secular_education"] or "" if "secular_education" in row.keys() else "",
-            last_reward=row["last_reward"] or "",
-            phone=row["phone"] or "" if "phone" in row.keys() else "",
-            created_at=created_at,
-            updated_at=updated_at
         )
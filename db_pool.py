@@ -0,0 +1,263 @@
+"""
+Соединения SQLite для Database: пул соединений только для чтения и одно
+соединение-писатель.
+
+В режиме WAL читатели не блокируются записью, поэтому бот продолжает
+отвечать на поиск, пока скрипт импорта записывает данные.
+"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def configure_connection(conn: sqlite3.Connection, read_only: bool = False) -> None:
+    """
+    Применение настроек соединения из config.
+
+    journal_mode сохраняется в самом файле базы, поэтому включается только
+    на соединениях с правом записи; для читателей включается query_only.
+    """
+    conn.execute(f"PRAGMA busy_timeout = {int(config.DB_BUSY_TIMEOUT_MS)}")
+    if not read_only and config.DB_JOURNAL_MODE:
+        conn.execute(f"PRAGMA journal_mode = {config.DB_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {config.DB_SYNCHRONOUS}")
+    # Отрицательное значение cache_size задаётся в килобайтах
+    conn.execute(f"PRAGMA cache_size = -{int(config.DB_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size = {int(config.DB_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA temp_store = {config.DB_TEMP_STORE}")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+
+
+def open_connection(db_path: str, read_only: bool = False) -> sqlite3.Connection:
+    """Открытие настроенного соединения (может использоваться из любого потока)"""
+    conn = sqlite3.connect(
+        db_path,
+        check_same_thread=False,
+        timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+    )
+    conn.row_factory = sqlite3.Row
+    configure_connection(conn, read_only=read_only)
+    return conn
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений с одной базой данных"""
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = config.DB_POOL_SIZE,
+        health_check_interval: float = config.DB_POOL_HEALTH_CHECK_INTERVAL,
+        read_only: bool = False,
+    ):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.size = size
+        self.health_check_interval = health_check_interval
+        # Свободные соединения вместе со временем их возврата в пул
+        self._idle: "queue.LifoQueue[Tuple[sqlite3.Connection, float]]" = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """Открытие нового соединения"""
+        return open_connection(self.db_path, read_only=self.read_only)
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        """Проверка, что соединение ещё пригодно для работы"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        """Получение соединения из пула (или открытие нового)"""
+        if self._closed:
+            raise RuntimeError(f"Пул соединений для {self.db_path} уже закрыт")
+
+        while True:
+            try:
+                conn, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    self.misses += 1
+                return self._create_connection()
+
+            # Соединения, простоявшие дольше интервала, проверяем перед выдачей
+            stale = time.monotonic() - released_at >= self.health_check_interval
+            if stale and not self._is_healthy(conn):
+                logger.warning("Соединение с %s не прошло проверку и будет закрыто", self.db_path)
+                with self._lock:
+                    self.discarded += 1
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+                continue
+
+            with self._lock:
+                self.hits += 1
+            return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Возврат соединения в пул"""
+        try:
+            # Незавершённая транзакция не должна достаться следующему вызову
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+
+        if self._closed:
+            conn.close()
+            return
+
+        try:
+            self._idle.put_nowait((conn, time.monotonic()))
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Контекстный менеджер: соединение возвращается в пул после использования"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики попаданий/промахов пула"""
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": self._idle.qsize(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "discarded": self.discarded,
+            }
+
+    def close(self) -> None:
+        """Закрытие всех свободных соединений; новые выдаваться не будут"""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+class WriterConnection:
+    """
+    Единственное соединение с правом записи.
+
+    SQLite допускает только одного писателя, поэтому записи из разных
+    потоков процесса выполняются по очереди под блокировкой, а не
+    ожидают друг друга через busy_timeout.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._closed = False
+        self.writes = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Монопольный доступ к соединению-писателю"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Соединение-писатель для {self.db_path} уже закрыто")
+            if self._conn is None:
+                self._conn = open_connection(self.db_path)
+            try:
+                yield self._conn
+            finally:
+                self.writes += 1
+                # Незавершённая транзакция не должна достаться следующему вызову
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+
+    def stats(self) -> Dict[str, int]:
+        """Количество выданных доступов к писателю"""
+        return {"writes": self.writes}
+
+    def close(self) -> None:
+        """Закрытие соединения; новые записи выполняться не будут"""
+        with self._lock:
+            self._closed = True
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error:
+                    pass
+                self._conn = None
+
+
+# Пулы общие для всего процесса: один пул читателей и один писатель на файл базы данных
+_pools: Dict[str, ConnectionPool] = {}
+_writers: Dict[str, WriterConnection] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Получение (или создание) пула соединений для чтения из указанной базы данных"""
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(db_path, read_only=True)
+            _pools[db_path] = pool
+        return pool
+
+
+def get_writer(db_path: str) -> WriterConnection:
+    """Получение (или создание) соединения-писателя для указанной базы данных"""
+    with _pools_lock:
+        writer = _writers.get(db_path)
+        if writer is None or writer._closed:
+            writer = WriterConnection(db_path)
+            _writers[db_path] = writer
+        return writer
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Статистика по всем открытым пулам"""
+    with _pools_lock:
+        stats = {path: pool.stats() for path, pool in _pools.items()}
+        for path, writer in _writers.items():
+            stats.setdefault(path, {}).update(writer.stats())
+        return stats
+
+
+def close_all_pools() -> None:
+    """Закрытие всех пулов и писателей (вызывается при остановке бота)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        writers = list(_writers.values())
+        _pools.clear()
+        _writers.clear()
+    for pool in pools:
+        logger.info("Закрытие пула соединений %s: %s", pool.db_path, pool.stats())
+        pool.close()
+    for writer in writers:
+        writer.close()
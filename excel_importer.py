@@ -1,12 +1,17 @@
 """
 Модуль для импорта данных о священниках из Excel файлов
 """
+import os
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Iterator, Tuple, Optional, Union
+from openpyxl import load_workbook
 from models import Priest
 from database import Database
+from identity_index import MATCH_AMBIGUOUS, FioIdentityIndex, ambiguous_error
+from import_diff import ImportDiff, duplicate_error, split_duplicates
 import utils
+import config
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,9 +36,17 @@ class ExcelImporter:
                              'last_reward', 'награда', 'reward']
     }
     
-    def __init__(self, db: Optional[Database] = None):
-        """Инициализация импортера"""
+    def __init__(self, db: Optional[Database] = None, identity_index: Optional[FioIdentityIndex] = None):
+        """
+        Инициализация импортера
+        
+        identity_index — общий индекс ФИО (если не передан, загружается из базы
+        в начале каждого импорта)
+        """
         self.db = db or Database()
+        self.identity_index = identity_index
+        # Стандартное название колонки -> индекс в строке (для строк-кортежей)
+        self.column_index: Dict[str, int] = {}
         self.errors: List[Dict] = []
         self.success_count = 0
         self.total_count = 0
@@ -68,30 +81,76 @@ class ExcelImporter:
             logger.error(f"Ошибка при чтении Excel файла: {e}")
             raise
     
-    def validate_row(self, row: pd.Series, row_number: int) -> Tuple[bool, List[str]]:
+    def resolve_header(self, header: Tuple[Any, ...]) -> Dict[str, int]:
+        """Сопоставление колонок заголовка со стандартными названиями (один раз на файл)"""
+        column_index = {}
+        for index, title in enumerate(header):
+            if title is None:
+                continue
+            normalized = self.normalize_column_name(str(title))
+            if normalized and normalized not in column_index:
+                column_index[normalized] = index
+        return column_index
+    
+    def iter_rows(self, file_path: str) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        """
+        Потоковое чтение первого листа: (номер строки в Excel, кортеж значений).
+        
+        Книга открывается в режиме read_only, поэтому в памяти находится только
+        текущая строка, независимо от размера файла. Заголовок разбирается один
+        раз и сохраняется в self.column_index; пустые строки пропускаются.
+        """
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            self.column_index = self.resolve_header(header or ())
+            for row_number, values in enumerate(rows, start=2):
+                if all(value is None or (isinstance(value, str) and not value.strip()) for value in values):
+                    continue
+                yield row_number, values
+        finally:
+            wb.close()
+    
+    def _get(self, row: Union[pd.Series, Tuple[Any, ...]], field: str, default: Any = None) -> Any:
+        """Значение колонки field из строки DataFrame или кортежа iter_rows"""
+        if isinstance(row, tuple):
+            index = self.column_index.get(field)
+            if index is None or index >= len(row) or row[index] is None:
+                return default
+            return row[index]
+        return row.get(field, default)
+    
+    def _row_data(self, row: Union[pd.Series, Tuple[Any, ...]]) -> Dict:
+        """Содержимое строки для отчёта об ошибках"""
+        if isinstance(row, tuple):
+            return {field: self._get(row, field) for field in self.column_index}
+        return row.to_dict()
+    
+    def validate_row(self, row: Union[pd.Series, Tuple[Any, ...]], row_number: int) -> Tuple[bool, List[str]]:
         """Валидация строки данных"""
         errors = []
         
         # Проверка обязательных полей
-        if pd.isna(row.get('имя')) or str(row.get('имя', '')).strip() == '':
+        if pd.isna(self._get(row, 'имя')) or str(self._get(row, 'имя', '')).strip() == '':
             errors.append("Отсутствует имя")
         
-        if pd.isna(row.get('фамилия')) or str(row.get('фамилия', '')).strip() == '':
+        if pd.isna(self._get(row, 'фамилия')) or str(self._get(row, 'фамилия', '')).strip() == '':
             errors.append("Отсутствует фамилия")
         
-        if pd.isna(row.get('статус')) or str(row.get('статус', '')).strip() == '':
+        if pd.isna(self._get(row, 'статус')) or str(self._get(row, 'статус', '')).strip() == '':
             errors.append("Отсутствует статус")
         else:
             # Валидация статуса
-            status = str(row.get('статус', '')).strip()
+            status = str(self._get(row, 'статус', '')).strip()
             normalized_status = utils.validate_status(status)
             if not normalized_status:
                 errors.append(f"Неверный статус: {status}")
         
         # Валидация дат
         for date_field in ['дата рождения', 'дата рукоположения']:
-            if date_field in row and not pd.isna(row.get(date_field)):
-                date_value = row.get(date_field)
+            if not pd.isna(self._get(row, date_field)):
+                date_value = self._get(row, date_field)
                 if isinstance(date_value, str):
                     parsed_date = utils.parse_date(date_value)
                     if not parsed_date:
@@ -108,20 +167,20 @@ class ExcelImporter:
         
         return len(errors) == 0, errors
     
-    def row_to_priest(self, row: pd.Series) -> Optional[Priest]:
-        """Преобразование строки DataFrame в объект Priest"""
+    def row_to_priest(self, row: Union[pd.Series, Tuple[Any, ...]]) -> Optional[Priest]:
+        """Преобразование строки DataFrame (или кортежа iter_rows) в объект Priest"""
         try:
             # Имя и фамилия
-            name = str(row.get('имя', '')).strip()
-            surname = str(row.get('фамилия', '')).strip()
+            name = str(self._get(row, 'имя', '')).strip()
+            surname = str(self._get(row, 'фамилия', '')).strip()
             
             if not name or not surname:
                 return None
             
             # Дата рождения
             birth_date = None
-            if 'дата рождения' in row and pd.notna(row.get('дата рождения')):
-                birth_value = row.get('дата рождения')
+            if pd.notna(self._get(row, 'дата рождения')):
+                birth_value = self._get(row, 'дата рождения')
                 if isinstance(birth_value, datetime):
                     birth_date = birth_value.date()
                 elif isinstance(birth_value, str):
@@ -133,18 +192,18 @@ class ExcelImporter:
                         pass
             
             # Место рождения
-            birth_place = str(row.get('место рождения', '')).strip() if pd.notna(row.get('место рождения')) else ''
+            birth_place = str(self._get(row, 'место рождения', '')).strip() if pd.notna(self._get(row, 'место рождения')) else ''
             
             # Статус
-            status = str(row.get('статус', '')).strip()
+            status = str(self._get(row, 'статус', '')).strip()
             normalized_status = utils.validate_status(status)
             if not normalized_status:
                 normalized_status = status  # Оставляем как есть, если не удалось нормализовать
             
             # Дата рукоположения
             ordination_date = None
-            if 'дата рукоположения' in row and pd.notna(row.get('дата рукоположения')):
-                ord_value = row.get('дата рукоположения')
+            if pd.notna(self._get(row, 'дата рукоположения')):
+                ord_value = self._get(row, 'дата рукоположения')
                 if isinstance(ord_value, datetime):
                     ordination_date = ord_value.date()
                 elif isinstance(ord_value, str):
@@ -156,9 +215,9 @@ class ExcelImporter:
                         pass
             
             # Остальные поля
-            service_place = str(row.get('место служения', '')).strip() if pd.notna(row.get('место служения')) else ''
-            education = str(row.get('образование', '')).strip() if pd.notna(row.get('образование')) else ''
-            last_reward = str(row.get('последняя награда', '')).strip() if pd.notna(row.get('последняя награда')) else ''
+            service_place = str(self._get(row, 'место служения', '')).strip() if pd.notna(self._get(row, 'место служения')) else ''
+            education = str(self._get(row, 'образование', '')).strip() if pd.notna(self._get(row, 'образование')) else ''
+            last_reward = str(self._get(row, 'последняя награда', '')).strip() if pd.notna(self._get(row, 'последняя награда')) else ''
             
             return Priest(
                 name=name,
@@ -175,6 +234,49 @@ class ExcelImporter:
             logger.error(f"Ошибка при преобразовании строки в Priest: {e}")
             return None
     
+    def _parse_row(self, row_number: int, row: Tuple[Any, ...]) -> Tuple[Optional[Priest], Optional[Dict]]:
+        """Валидация и преобразование строки: (priest, None) или (None, ошибка)"""
+        is_valid, validation_errors = self.validate_row(row, row_number)
+        if not is_valid:
+            return None, {
+                'row': row_number,
+                'errors': validation_errors,
+                'data': self._row_data(row)
+            }
+        
+        priest = self.row_to_priest(row)
+        if not priest:
+            return None, {
+                'row': row_number,
+                'errors': ['Не удалось преобразовать данные'],
+                'data': self._row_data(row)
+            }
+        return priest, None
+    
+    def diff_file(self, file_path: str) -> ImportDiff:
+        """
+        Пробный прогон: сравнение файла с текущей базой без записи.
+        
+        Содержимое базы читается одним запросом; результат описывает
+        состояние после импорта с update_existing=True.
+        """
+        identity_index = self.identity_index or FioIdentityIndex.load(self.db)
+        parsed: List[Tuple[int, Priest, Dict]] = []
+        errors: List[Dict] = []
+        for row_number, row in self.iter_rows(file_path):
+            priest, error = self._parse_row(row_number, row)
+            if error:
+                errors.append(error)
+                continue
+            # Как при импорте: строка без отчества — по фамилии и имени,
+            # неоднозначные совпадения пропускаются
+            match = identity_index.resolve(priest)
+            if match.kind == MATCH_AMBIGUOUS:
+                errors.append(ambiguous_error(row_number, priest, match, self._row_data(row)))
+                continue
+            parsed.append((row_number, priest, self._row_data(row)))
+        return ImportDiff.compute(os.path.basename(file_path), parsed, self.db.get_all_priests(), errors)
+    
     def import_from_file(self, file_path: str, update_existing: bool = False) -> Dict:
         """
         Импорт данных из Excel файла
@@ -191,84 +293,54 @@ class ExcelImporter:
         self.total_count = 0
         
         try:
-            # Чтение Excel файла
-            df = self.read_excel(file_path)
-            self.total_count = len(df)
+            logger.info(f"Начало импорта из файла {file_path}")
             
-            logger.info(f"Начало импорта из файла {file_path}. Всего строк: {self.total_count}")
+            # Существующие ФИО загружаются один раз, дальше проверка — поиск в словаре
+            identity_index = self.identity_index
+            if identity_index is None:
+                identity_index = FioIdentityIndex.load(self.db)
             
-            # Обработка каждой строки
-            for idx, row in df.iterrows():
-                row_number = idx + 2  # +2 потому что Excel нумерует с 1 и есть заголовок
-                
-                # Валидация
-                is_valid, validation_errors = self.validate_row(row, row_number)
+            # Корректные строки копятся и записываются в базу пакетами по
+            # config.IMPORT_BATCH_SIZE, чтобы память не росла с размером файла
+            pending: List[Tuple[int, Priest, Dict]] = []
+            # ФИО -> первая строка: при повторе в файле действует первая
+            first_rows: Dict[str, int] = {}
+            
+            # Обработка каждой строки (файл читается потоково, без DataFrame)
+            for row_number, row in self.iter_rows(file_path):
+                self.total_count += 1
                 
-                if not is_valid:
-                    self.errors.append({
-                        'row': row_number,
-                        'errors': validation_errors,
-                        'data': row.to_dict()
-                    })
+                priest, error = self._parse_row(row_number, row)
+                if error:
+                    self.errors.append(error)
                     continue
                 
-                # Преобразование в объект Priest
-                priest = self.row_to_priest(row)
-                
-                if not priest:
+                # Проверка на дубликаты (если не обновление)
+                # Строки шаблона без отчества сопоставляются по фамилии и имени
+                match = identity_index.resolve(priest)
+                _, duplicates = split_duplicates([(row_number, priest, None)], first_rows)
+                if duplicates:
+                    self.errors.append(duplicate_error(row_number, priest, duplicates[0][3], self._row_data(row)))
+                    continue
+                if match.kind == MATCH_AMBIGUOUS:
+                    # Тёзки: какую из записей обновлять, неизвестно
+                    self.errors.append(ambiguous_error(row_number, priest, match, self._row_data(row)))
+                    continue
+                if match.priest_id and not update_existing:
                     self.errors.append({
                         'row': row_number,
-                        'errors': ['Не удалось преобразовать данные'],
-                        'data': row.to_dict()
+                        'errors': [f'Священник {priest.name} {priest.surname} уже существует'],
+                        'data': self._row_data(row)
                     })
                     continue
                 
-                # Проверка на дубликаты (если не обновление)
-                if not update_existing:
-                    existing = self.db.search_priests(f"{priest.name} {priest.surname}")
-                    # Проверяем точное совпадение
-                    exact_match = any(
-                        p.name.lower() == priest.name.lower() and 
-                        p.surname.lower() == priest.surname.lower()
-                        for p in existing
-                    )
-                    if exact_match:
-                        self.errors.append({
-                            'row': row_number,
-                            'errors': [f'Священник {priest.name} {priest.surname} уже существует'],
-                            'data': row.to_dict()
-                        })
-                        continue
-                
-                # Добавление в базу данных
-                try:
-                    if update_existing:
-                        # Поиск существующего священника
-                        existing = self.db.search_priests(f"{priest.name} {priest.surname}")
-                        exact_match = None
-                        for p in existing:
-                            if (p.name.lower() == priest.name.lower() and 
-                                p.surname.lower() == priest.surname.lower()):
-                                exact_match = p
-                                break
-                        
-                        if exact_match:
-                            priest.id = exact_match.id
-                            self.db.update_priest(priest)
-                        else:
-                            self.db.add_priest(priest)
-                    else:
-                        self.db.add_priest(priest)
-                    
-                    self.success_count += 1
-                    logger.info(f"Успешно импортирован: {priest.name} {priest.surname}")
-                except Exception as e:
-                    logger.error(f"Ошибка при добавлении в БД (строка {row_number}): {e}")
-                    self.errors.append({
-                        'row': row_number,
-                        'errors': [f'Ошибка БД: {str(e)}'],
-                        'data': row.to_dict()
-                    })
+                pending.append((row_number, priest, self._row_data(row)))
+                if len(pending) >= config.IMPORT_BATCH_SIZE:
+                    self._save_pending(pending, update_existing, identity_index)
+                    pending = []
+            
+            # Остаток (повторы внутри пакета отсеивает bulk_upsert)
+            self._save_pending(pending, update_existing, identity_index)
             
             # Формирование результата
             result = {
@@ -285,6 +357,41 @@ class ExcelImporter:
             logger.error(f"Критическая ошибка при импорте: {e}")
             raise
     
+    def _save_pending(
+        self,
+        pending: List[Tuple[int, Priest, Dict]],
+        update_existing: bool,
+        identity_index: FioIdentityIndex,
+    ) -> None:
+        """Запись накопленных строк через Database.bulk_upsert с учётом результатов"""
+        if not pending:
+            return
+        try:
+            outcomes = self.db.bulk_upsert(
+                [priest for _, priest, _ in pending],
+                update_existing=update_existing,
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при записи в БД: {e}")
+            for row_number, _, data in pending:
+                self.errors.append({
+                    'row': row_number,
+                    'errors': [f'Ошибка БД: {str(e)}'],
+                    'data': data
+                })
+            return
+        
+        for (row_number, priest, data), outcome in zip(pending, outcomes):
+            if outcome == Database.UPSERT_SKIPPED:
+                self.errors.append({
+                    'row': row_number,
+                    'errors': [f'Священник {priest.name} {priest.surname} уже существует'],
+                    'data': data
+                })
+            else:
+                identity_index.add(priest)
+                self.success_count += 1
+    
     def get_error_report(self) -> str:
         """Получение отчета об ошибках в текстовом виде"""
         if not self.errors:
@@ -0,0 +1,132 @@
+"""
+Триграммный индекс ФИО в памяти для нечёткого поиска (с опечатками)
+"""
+import heapq
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import utils
+
+
+class TrigramIndex:
+    """
+    Инвертированный индекс «триграмма → id священников».
+
+    Индекс строится из колонки fio_norm и помнит версию данных
+    (table_versions), которой он соответствует. Собственные изменения
+    Database применяются к индексу точечно; если таблицу изменил кто-то
+    ещё, версия не совпадёт и индекс будет перестроен при следующем поиске.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._trigrams: Dict[int, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._trigrams)
+
+    def rebuild(self, rows: Iterable[Tuple[int, str]], version: int) -> None:
+        """Полное построение индекса по парам (id, fio_norm)"""
+        postings: Dict[str, Set[int]] = defaultdict(set)
+        trigrams_by_id: Dict[int, FrozenSet[str]] = {}
+        for priest_id, fio_norm in rows:
+            trigrams = frozenset(utils.search_trigrams(fio_norm or ""))
+            trigrams_by_id[priest_id] = trigrams
+            for trigram in trigrams:
+                postings[trigram].add(priest_id)
+
+        with self._lock:
+            self._postings = postings
+            self._trigrams = trigrams_by_id
+            self.version = version
+
+    def _remove_locked(self, priest_id: int) -> None:
+        for trigram in self._trigrams.pop(priest_id, ()):
+            ids = self._postings.get(trigram)
+            if ids is not None:
+                ids.discard(priest_id)
+                if not ids:
+                    del self._postings[trigram]
+
+    def apply(
+        self,
+        changes: Iterable[Tuple[int, Optional[str]]],
+        version_before: int,
+        version_after: int,
+    ) -> None:
+        """
+        Точечное обновление после собственной записи в базу.
+
+        changes — пары (id, fio_norm); fio_norm=None означает удаление.
+        Если индекс не соответствовал version_before (его уже обошли чужие
+        изменения), он просто остаётся устаревшим до перестроения.
+        """
+        with self._lock:
+            if self.version != version_before:
+                return
+            for priest_id, fio_norm in changes:
+                self._remove_locked(priest_id)
+                if fio_norm is None:
+                    continue
+                trigrams = frozenset(utils.search_trigrams(fio_norm))
+                self._trigrams[priest_id] = trigrams
+                for trigram in trigrams:
+                    self._postings[trigram].add(priest_id)
+            self.version = version_after
+
+    def search(
+        self,
+        query_key: str,
+        limit: int,
+        min_similarity: float,
+    ) -> List[Tuple[int, float, float]]:
+        """
+        Поиск по нормализованному запросу.
+
+        Возвращает до limit кортежей (id, доля триграмм запроса, сходство
+        по Жаккару), лучшие первыми. Кандидаты берутся только из самых
+        редких триграмм запроса: при пороге min_shared любая подходящая
+        запись обязана содержать хотя бы одну из (n - min_shared + 1)
+        редчайших, поэтому частые триграммы вроде «ич » не перебираются.
+        """
+        query_trigrams = utils.search_trigrams(query_key)
+        n = len(query_trigrams)
+        if not n:
+            return []
+        min_shared = max(1, math.ceil(min_similarity * n))
+
+        with self._lock:
+            by_rarity = sorted(query_trigrams, key=lambda t: len(self._postings.get(t, ())))
+            candidates: Set[int] = set()
+            for trigram in by_rarity[:n - min_shared + 1]:
+                candidates.update(self._postings.get(trigram, ()))
+
+            scored = []
+            for priest_id in candidates:
+                trigrams = self._trigrams[priest_id]
+                shared = len(query_trigrams & trigrams)
+                if shared < min_shared:
+                    continue
+                union = n + len(trigrams) - shared
+                scored.append((priest_id, shared / n, shared / union))
+
+        return heapq.nlargest(limit, scored, key=lambda item: (item[1], item[2]))
+
+
+# Индексы общие для всего процесса: один индекс на файл базы данных
+_indexes: Dict[str, TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_trigram_index(db_path: str) -> TrigramIndex:
+    """Получение (или создание) индекса для указанной базы данных"""
+    with _indexes_lock:
+        index = _indexes.get(db_path)
+        if index is None:
+            index = TrigramIndex()
+            _indexes[db_path] = index
+        return index
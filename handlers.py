@@ -2,7 +2,7 @@
 Обработчики команд и сообщений для Telegram-бота
 """
 import asyncio
-from datetime import datetime, date
+import html
 from telegram import (
     Update,
     InlineKeyboardButton,
@@ -12,12 +12,55 @@ from telegram import (
 )
 from telegram.ext import ContextTypes
 from typing import List
-import database
+from async_database import AsyncDatabase
+from celebrations_digest import CelebrationsDigest
+from outbox import Outbox
+from render_cache import render_card, render_page
 import models
 import utils
 import config
 
 
+def _get_db(context: ContextTypes.DEFAULT_TYPE) -> AsyncDatabase:
+    """Общий объект AsyncDatabase из контекста приложения (создаётся в bot.main)"""
+    db = context.bot_data.get("db")
+    if db is None:
+        db = AsyncDatabase()
+        context.bot_data["db"] = db
+    return db
+
+
+def _get_digest(context: ContextTypes.DEFAULT_TYPE) -> CelebrationsDigest:
+    """Готовые отчёты «Именинники» из контекста приложения (создаются в bot.main)"""
+    digest = context.bot_data.get("celebrations_digest")
+    if digest is None:
+        digest = CelebrationsDigest()
+        context.bot_data["celebrations_digest"] = digest
+    return digest
+
+
+def _get_outbox(context: ContextTypes.DEFAULT_TYPE) -> Outbox:
+    """Очередь исходящих сообщений из контекста приложения (создаётся в bot.main)"""
+    outbox = context.bot_data.get("outbox")
+    if outbox is None:
+        outbox = Outbox()
+        context.bot_data["outbox"] = outbox
+    return outbox
+
+
+def _format_fuzzy_suggestions(query: str, priests: List[models.PriestSummary]) -> str:
+    """Список вариантов нечёткого поиска, когда точных совпадений нет"""
+    message = (
+        f"❌ Точных совпадений по запросу '{html.escape(query)}' нет.\n"
+        f"🔎 <b>Возможно, вы искали:</b>\n\n"
+    )
+    for i, priest in enumerate(priests, 1):
+        # Ответ уходит с parse_mode="HTML": поля записи экранируются, как и запрос
+        fio = " ".join(html.escape(part) for part in [priest.surname, priest.name, priest.patronymic] if part)
+        message += f"{i}. {fio} - {html.escape(priest.status or '')}\n"
+    return message
+
+
 async def _handle_unauthorized_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Обработка сообщений от неадминистраторов:
@@ -103,6 +146,10 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 📋 Список — список всех священников с постраничной навигацией  
 🎉 Именинники — просмотр священников по дате рождения, тезоименитства и хиротонии  
 ❓ Помощь — это сообщение
+
+<b>Ежедневная рассылка памятных дат:</b>
+/unsubscribe — отключить  
+/subscribe — включить снова
     """
     
     await update.message.reply_text(
@@ -127,10 +174,19 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     query = " ".join(context.args)
-    db = database.Database()
-    priests = db.search_priests(query)
+    db = _get_db(context)
+    # Для списка результатов достаточно кратких записей, полная карточка — по id
+    priests = await db.search_priest_summaries(query)
     
     if not priests:
+        # Запасной вариант — нечёткий поиск (опечатки в фамилии)
+        suggestions = await db.fuzzy_search(query, summary=True)
+        if suggestions:
+            await update.message.reply_text(
+                _format_fuzzy_suggestions(query, suggestions),
+                parse_mode="HTML"
+            )
+            return
         await update.message.reply_text(
             f"❌ Священники по запросу '{query}' не найдены."
         )
@@ -138,8 +194,13 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if len(priests) == 1:
         # Если найден один священник, показываем полную информацию
+        priest = await db.get_priest_by_id(priests[0].id)
+        if priest is None:
+            # Запись удалили между поиском и чтением карточки
+            await update.message.reply_text("❌ Священник не найден.")
+            return
         await update.message.reply_text(
-            priests[0].format_message(),
+            render_card(priest),
             parse_mode="HTML"
         )
     else:
@@ -157,65 +218,115 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
-async def list_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработчик команды /list"""
-    user = update.effective_user
-    if not user or not utils.is_admin(user.id):
-        await _handle_unauthorized_message(update, context)
-        return
-    db = database.Database()
-    page = int(context.args[0]) if context.args and context.args[0].isdigit() else 0
-    
+async def _load_list_page(db: AsyncDatabase, page: int, direction: str = "", anchor_id: int = 0):
+    """
+    Загрузка страницы списка священников.
+
+    direction "n"/"p" — переход вперёд/назад от записи anchor_id (keyset);
+    без направления (команда /list N) опорная запись страницы page
+    находится по индексу (фамилия, имя, id).
+    Возвращает (page, priests, has_prev, has_next).
+    """
+    if direction == "n":
+        priests, has_next = await db.get_priests_page(after_id=anchor_id)
+        has_prev = page > 0
+    elif direction == "p":
+        priests, has_prev = await db.get_priests_page(before_id=anchor_id)
+        has_prev = has_prev and page > 0
+        has_next = True
+    elif page > 0:
+        anchor_id = await db.get_page_anchor(page)
+        if anchor_id is None:
+            priests, has_next = [], False
+        else:
+            priests, has_next = await db.get_priests_page(after_id=anchor_id)
+        has_prev = True
+    else:
+        priests, has_next = await db.get_priests_page()
+        has_prev = False
+
+    if not priests and direction:
+        # Опорная запись удалена — начинаем с первой страницы
+        page = 0
+        priests, has_next = await db.get_priests_page()
+        has_prev = False
+
+    return page, priests, has_prev, has_next
+
+
+def _build_list_page(page: int, total_pages: int, priests) -> tuple:
+    """Части сообщения страницы списка (после split_message)"""
     offset = page * config.ITEMS_PER_PAGE
-    priests = db.get_all_priests(limit=config.ITEMS_PER_PAGE, offset=offset)
-    total = db.get_total_count()
-    
-    if not priests:
-        await update.message.reply_text(
-            "📋 Список священников пуст."
-        )
-        return
-    
     header = (
         f"📋 <b>Список священников</b>\n"
-        f"Страница {page + 1} из {(total - 1) // config.ITEMS_PER_PAGE + 1}\n\n"
+        f"Страница {page + 1} из {total_pages}\n\n"
     )
 
     lines = [header]
     for i, priest in enumerate(priests, 1):
         index = offset + i
         # Полная информация по священнику
-        block = f"{index}. {priest.format_message()}"
+        block = f"{index}. {render_card(priest)}"
         lines.append(block)
         lines.append("")  # пустая строка между записями
 
-    message = "\n".join(lines)
+    # Сообщение может быть длинным, поэтому разбиваем на части
+    return tuple(utils.split_message("\n".join(lines)))
+
 
-    # Создаем кнопки навигации
+async def _render_list_page(db: AsyncDatabase, page: int, priests, has_prev: bool, has_next: bool):
+    """Части сообщения страницы списка и клавиатура навигации (возвращает (parts, reply_markup))"""
+    total = await db.get_total_count()
+    total_pages = (total - 1) // config.ITEMS_PER_PAGE + 1
+
+    # Страница собирается заново, только если изменился её состав, какая-то
+    # из записей (row_version) или общее число страниц
+    key = (page, total_pages, tuple((priest.id, priest.row_version) for priest in priests))
+    parts = render_page(key, lambda: _build_list_page(page, total_pages, priests))
+
+    # Кнопки навигации: в callback_data передаётся id крайней записи страницы
+    # (list_<направление>_<страница>_<id>), это укладывается в лимит 64 байта
     keyboard = []
-    if page > 0:
-        keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data=f"list_{page - 1}")])
-    if offset + len(priests) < total:
-        keyboard.append([InlineKeyboardButton("Вперёд ▶️", callback_data=f"list_{page + 1}")])
-    
+    if has_prev:
+        keyboard.append([InlineKeyboardButton(
+            "◀️ Назад", callback_data=f"list_p_{page - 1}_{priests[0].id}"
+        )])
+    if has_next:
+        keyboard.append([InlineKeyboardButton(
+            "Вперёд ▶️", callback_data=f"list_n_{page + 1}_{priests[-1].id}"
+        )])
+
     reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
+    return parts, reply_markup
+
+
+async def list_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /list"""
+    user = update.effective_user
+    if not user or not utils.is_admin(user.id):
+        await _handle_unauthorized_message(update, context)
+        return
+    db = _get_db(context)
+    page = int(context.args[0]) if context.args and context.args[0].isdigit() else 0
     
-    # Сообщение может быть длинным, поэтому разбиваем на части
-    parts = utils.split_message(message)
-    first = True
-    for part in parts:
-        if first:
-            await update.message.reply_text(
-                part,
-                parse_mode="HTML",
-                reply_markup=reply_markup,
-            )
-            first = False
-        else:
-            await update.message.reply_text(
-                part,
-                parse_mode="HTML",
-            )
+    page, priests, has_prev, has_next = await _load_list_page(db, page)
+    
+    if not priests:
+        await update.message.reply_text(
+            "📋 Список священников пуст."
+        )
+        return
+    
+    parts, reply_markup = await _render_list_page(db, page, priests, has_prev, has_next)
+    
+    # Части страницы уходят через очередь отправки (по порядку, с ограничением скорости)
+    _get_outbox(context).send_parts(
+        context.bot,
+        update.effective_chat.id,
+        parts,
+        first=update.message.reply_text,
+        reply_markup=reply_markup,
+    )
 
 
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -245,8 +356,8 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    db = database.Database()
-    priests = db.get_priests_by_status(normalized_status)
+    db = _get_db(context)
+    priests = await db.get_priest_summaries_by_status(normalized_status)
     
     if not priests:
         await update.message.reply_text(
@@ -267,11 +378,12 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Разбиваем длинное сообщение на части
     parts = utils.split_message(message)
-    for part in parts:
-        await update.message.reply_text(
-            part,
-            parse_mode="HTML"
-        )
+    _get_outbox(context).send_parts(
+        context.bot,
+        update.effective_chat.id,
+        parts,
+        first=update.message.reply_text,
+    )
 
 
 async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -299,6 +411,34 @@ async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /subscribe: возобновление ежедневной рассылки"""
+    user = update.effective_user
+    if not user or not utils.is_admin(user.id):
+        await _handle_unauthorized_message(update, context)
+        return
+
+    await _get_db(context).set_broadcast_optout(user.id, False)
+    await update.message.reply_text(
+        f"📬 Ежедневная рассылка памятных дат включена (в {config.BROADCAST_TIME}).\n"
+        "Отключить: /unsubscribe",
+    )
+
+
+async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /unsubscribe: отказ от ежедневной рассылки"""
+    user = update.effective_user
+    if not user or not utils.is_admin(user.id):
+        await _handle_unauthorized_message(update, context)
+        return
+
+    await _get_db(context).set_broadcast_optout(user.id, True)
+    await update.message.reply_text(
+        "🔕 Ежедневная рассылка памятных дат отключена.\n"
+        "Включить снова: /subscribe",
+    )
+
+
 async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик callback-запросов от inline-кнопок"""
     query = update.callback_query
@@ -316,51 +456,27 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Пагинация списка священников
     if data.startswith("list_"):
-        page = int(data.split("_")[1])
-        db = database.Database()
-        offset = page * config.ITEMS_PER_PAGE
-        priests = db.get_all_priests(limit=config.ITEMS_PER_PAGE, offset=offset)
-        total = db.get_total_count()
-
-        header = (
-            f"📋 <b>Список священников</b>\n"
-            f"Страница {page + 1} из {(total - 1) // config.ITEMS_PER_PAGE + 1}\n\n"
-        )
+        fields = data.split("_")
+        db = _get_db(context)
+        if len(fields) == 4:
+            # list_<n|p>_<страница>_<id опорной записи>
+            _, direction, page_str, anchor_str = fields
+            page, priests, has_prev, has_next = await _load_list_page(
+                db, int(page_str), direction, int(anchor_str)
+            )
+        else:
+            # Старый формат кнопок: list_<страница>
+            page, priests, has_prev, has_next = await _load_list_page(db, int(fields[1]))
+
+        parts, reply_markup = await _render_list_page(db, page, priests, has_prev, has_next)
 
-        lines = [header]
-        for i, priest in enumerate(priests, 1):
-            index = offset + i
-            block = f"{index}. {priest.format_message()}"
-            lines.append(block)
-            lines.append("")
-
-        message = "\n".join(lines)
-
-        keyboard = []
-        if page > 0:
-            keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data=f"list_{page - 1}")])
-        if offset + len(priests) < total:
-            keyboard.append([InlineKeyboardButton("Вперёд ▶️", callback_data=f"list_{page + 1}")])
-
-        reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
-
-        parts = utils.split_message(message)
-        chat_id = query.message.chat_id
-        first = True
-        for part in parts:
-            if first:
-                await query.edit_message_text(
-                    part,
-                    parse_mode="HTML",
-                    reply_markup=reply_markup,
-                )
-                first = False
-            else:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=part,
-                    parse_mode="HTML",
-                )
+        _get_outbox(context).send_parts(
+            context.bot,
+            query.message.chat_id,
+            parts,
+            first=query.edit_message_text,
+            reply_markup=reply_markup,
+        )
         return
 
     # Главное меню (из inline-подменю)
@@ -699,6 +815,19 @@ async def show_month_menu_with_prefix(query, prefix: str, back_callback: str, ti
     )
 
 
+def _send_report_parts(query, context: ContextTypes.DEFAULT_TYPE, parts) -> None:
+    """
+    Первая часть отчёта заменяет меню, остальные отправляются отдельными
+    сообщениями — через очередь отправки, без ожидания доставки.
+    """
+    _get_outbox(context).send_parts(
+        context.bot,
+        query.message.chat_id,
+        parts,
+        first=query.edit_message_text,
+    )
+
+
 async def send_celebration_days_report(
     query,
     context: ContextTypes.DEFAULT_TYPE,
@@ -706,180 +835,12 @@ async def send_celebration_days_report(
     days_ahead: int,
     jubilee_only: bool = False,
 ):
-    """Формирует отчёт об именинниках на указанный день для выбранного типа дат."""
-    target_date = utils.get_target_date(days_ahead)
-    target_ddmm = target_date.strftime("%d.%m")
-
-    db = database.Database()
-    priests = db.get_all_priests()
-
-    def match(p: models.Priest) -> bool:
-        if kind == "bday":
-            if not p.birth_date:
-                return False
-            return (
-                p.birth_date.day == target_date.day
-                and p.birth_date.month == target_date.month
-            )
-        if kind == "name":
-            return (p.name_day or "") == target_ddmm
-        if kind == "ord":
-            ord_date = p.priest_ordination_date or p.deacon_ordination_date
-            if not ord_date:
-                return False
-            return ord_date.day == target_date.day and ord_date.month == target_date.month
-        return False
-
-    matches = [p for p in priests if match(p)]
-
-    if jubilee_only:
-        filtered = []
-        today = date.today()
-        for p in matches:
-            if kind == "bday":
-                age = utils.calculate_age(p.birth_date, today)
-                if utils.is_jubilee(age):
-                    filtered.append(p)
-            elif kind == "ord":
-                years_deacon = utils.years_since(p.deacon_ordination_date, today)
-                years_priest = utils.years_since(p.priest_ordination_date, today)
-                if utils.is_jubilee(years_deacon) or utils.is_jubilee(years_priest):
-                    filtered.append(p)
-        matches = filtered
-
-    # Заголовки по типам
-    headers = {
-        "bday": "🎂 <b>Именинники по дате рождения на {date}</b>\n\n",
-        "name": "🎉 <b>Именинники по тезоименитству на {date}</b>\n\n",
-        "ord": "✝️ <b>Именинники по дате хиротонии на {date}</b>\n\n",
-    }
-    header = headers[kind].format(date=target_date.strftime("%d.%m.%Y"))
-    if jubilee_only:
-        header = header.replace("Именинники", "Юбилеи")
-
-    if not matches:
-        await query.edit_message_text(
-            header + "Никто не отмечает в этот день.",
-            parse_mode="HTML",
-        )
-        return
-
-    lines = [header]
-    today = date.today()
-
-    for idx, p in enumerate(matches, start=1):
-        fio = " ".join([part for part in [p.surname, p.name, p.patronymic] if part])
-
-        # Специализированный формат для тезоименитств (kind == "name")
-        if kind == "name":
-            # p.name_day в формате DD.MM
-            name_day_str = p.name_day or target_ddmm
-
-            # Текст про день Ангела
-            if days_ahead == 0:
-                angel_text = "🎉 <b>СЕГОДНЯ ДЕНЬ АНГЕЛА!</b>"
-            elif days_ahead == 1:
-                angel_text = "🎉 <b>ДЕНЬ АНГЕЛА ЗАВТРА!</b>"
-            else:
-                angel_text = f"🎉 <b>ДЕНЬ АНГЕЛА ЧЕРЕЗ {days_ahead} ДНЯ(ДНЕЙ)!</b>"
-
-            base_line = (
-                f"{idx}. {fio}\n"
-                f"   Сан: {p.status}\n"
-                f"   📅 День тезоименитства: {name_day_str}\n"
-                f"   📍 Место служения: {p.service_place or 'не указано'}\n"
-                f"   {angel_text}"
-            )
-        else:
-            # Универсальный «богатый» формат для рождения и хиротонии
-            age = utils.calculate_age(p.birth_date, today)
-            age_str = f"{age} лет" if age is not None else "возраст не указан"
-            age_jubilee = utils.is_jubilee(age)
-
-            years_deacon = utils.years_since(p.deacon_ordination_date, today)
-            years_priest = utils.years_since(p.priest_ordination_date, today)
-
-            deacon_str = (
-                f"{years_deacon} лет" if years_deacon is not None else "нет данных"
-            )
-            priest_str = (
-                f"{years_priest} лет" if years_priest is not None else "нет данных"
-            )
-
-            jubilee_marks = []
-            if age_jubilee:
-                jubilee_marks.append(f"<b>🎂 ЮБИЛЕЙ возраста: {age} лет</b>")
-            if utils.is_jubilee(years_deacon):
-                jubilee_marks.append(
-                    f"<b>✝️ ЮБИЛЕЙ в диаконском сане: {years_deacon} лет</b>"
-                )
-            if utils.is_jubilee(years_priest):
-                jubilee_marks.append(
-                    f"<b>⛪ ЮБИЛЕЙ в священническом сане: {years_priest} лет</b>"
-                )
-
-            birth_line = ""
-            if kind == "bday":
-                birth_line = f"   📅 Дата рождения: {utils.format_date(p.birth_date)}\n"
-            ordinations_line = ""
-            if kind == "ord":
-                deacon_date_str = utils.format_date(p.deacon_ordination_date)
-                priest_date_str = utils.format_date(p.priest_ordination_date)
-                ordinations_line = (
-                    f"   ✝️ Дата хиротонии в диакона: {deacon_date_str}\n"
-                    f"   ⛪ Дата хиротонии в священника: {priest_date_str}\n"
-                )
-            ordinations_line = ""
-            if kind == "ord":
-                deacon_date_str = utils.format_date(p.deacon_ordination_date)
-                priest_date_str = utils.format_date(p.priest_ordination_date)
-                ordinations_line = (
-                    f"   ✝️ Дата хиротонии в диакона: {deacon_date_str}\n"
-                    f"   ⛪ Дата хиротонии в священника: {priest_date_str}\n"
-                )
-            ordinations_line = ""
-            if kind == "ord":
-                deacon_date_str = utils.format_date(p.deacon_ordination_date)
-                priest_date_str = utils.format_date(p.priest_ordination_date)
-                ordinations_line = (
-                    f"   ✝️ Дата хиротонии в диакона: {deacon_date_str}\n"
-                    f"   ⛪ Дата хиротонии в священника: {priest_date_str}\n"
-                )
-
-            base_line = (
-                f"{idx}. {fio}\n"
-                f"   Сан: {p.status}\n"
-                f"{birth_line}"
-                f"{ordinations_line}"
-                f"   🎂 Возраст: {age_str}\n"
-                f"   📍 Место служения: {p.service_place or 'не указано'}\n"
-                f"   ✝️ Лет в диаконском сане: {deacon_str}\n"
-                f"   ⛪ Лет в священническом сане: {priest_str}"
-            )
-
-            if jubilee_marks:
-                base_line += "\n   🔔 " + " | ".join(jubilee_marks)
-
-        lines.append(base_line)
-        lines.append("")
-
-    message = "\n".join(lines)
-    parts = utils.split_message(message)
-    chat_id = query.message.chat_id
-    first = True
-    for part in parts:
-        if first:
-            await query.edit_message_text(
-                part,
-                parse_mode="HTML",
-            )
-            first = False
-        else:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=part,
-                parse_mode="HTML",
-            )
+    """Отправляет отчёт об именинниках на указанный день для выбранного типа дат."""
+    # Отчёт берётся готовым из CelebrationsDigest (строится в полночь)
+    parts = await _get_digest(context).days_report(
+        _get_db(context), kind, days_ahead, jubilee_only=jubilee_only
+    )
+    _send_report_parts(query, context, parts)
 
 
 async def send_celebration_month_report(
@@ -889,171 +850,11 @@ async def send_celebration_month_report(
     month: int,
     jubilee_only: bool = False,
 ):
-    """Формирует отчёт об именинниках за указанный месяц для выбранного типа дат."""
-    month_names = [
-        "",
-        "Январь",
-        "Февраль",
-        "Март",
-        "Апрель",
-        "Май",
-        "Июнь",
-        "Июль",
-        "Август",
-        "Сентябрь",
-        "Октябрь",
-        "Ноябрь",
-        "Декабрь",
-    ]
-
-    today = date.today()
-    year = today.year
-    month_name = month_names[month] if 1 <= month <= 12 else str(month)
-
-    db = database.Database()
-    priests = db.get_all_priests()
-
-    def match(p: models.Priest) -> bool:
-        if kind == "bday":
-            if not p.birth_date:
-                return False
-            return p.birth_date.month == month
-        if kind == "name":
-            if not p.name_day:
-                return False
-            try:
-                d = datetime.strptime(p.name_day, "%d.%m")
-                return d.month == month
-            except Exception:
-                return False
-        if kind == "ord":
-            ord_date = p.priest_ordination_date or p.deacon_ordination_date
-            if not ord_date:
-                return False
-            return ord_date.month == month
-        return False
-
-    matches = [p for p in priests if match(p)]
-
-    if jubilee_only:
-        filtered = []
-        today = date.today()
-        for p in matches:
-            if kind == "bday":
-                age = utils.calculate_age(p.birth_date, today)
-                if utils.is_jubilee(age):
-                    filtered.append(p)
-            elif kind == "ord":
-                years_deacon = utils.years_since(p.deacon_ordination_date, today)
-                years_priest = utils.years_since(p.priest_ordination_date, today)
-                if utils.is_jubilee(years_deacon) or utils.is_jubilee(years_priest):
-                    filtered.append(p)
-        matches = filtered
-
-    headers = {
-        "bday": "🎂 <b>Именинники по дате рождения за {month} {year} года</b>\n\n",
-        "name": "🎉 <b>Именинники по тезоименитству за {month} {year} года</b>\n\n",
-        "ord": "✝️ <b>Именинники по дате хиротонии за {month} {year} года</b>\n\n",
-    }
-    header = headers[kind].format(month=month_name, year=year)
-    if jubilee_only:
-        header = header.replace("Именинники", "Юбилеи")
-
-    if not matches:
-        await query.edit_message_text(
-            header + "Никто не отмечает в этом месяце.",
-            parse_mode="HTML",
-        )
-        return
-
-    lines = [header]
-
-    for idx, p in enumerate(matches, start=1):
-        fio = " ".join([part for part in [p.surname, p.name, p.patronymic] if part])
-
-        if kind == "name":
-            # Специализированный формат: только день тезоименитства и место служения
-            name_day_str = p.name_day or "не указано"
-            base_line = (
-                f"{idx}. {fio}\n"
-                f"   Сан: {p.status}\n"
-                f"   📅 День тезоименитства: {name_day_str}\n"
-                f"   📍 Место служения: {p.service_place or 'не указано'}"
-            )
-        else:
-            # Универсальный «богатый» формат для рождения и хиротонии
-            age = utils.calculate_age(p.birth_date, today)
-            age_str = f"{age} лет" if age is not None else "возраст не указан"
-            age_jubilee = utils.is_jubilee(age)
-
-            years_deacon = utils.years_since(p.deacon_ordination_date, today)
-            years_priest = utils.years_since(p.priest_ordination_date, today)
-
-            deacon_str = (
-                f"{years_deacon} лет" if years_deacon is not None else "нет данных"
-            )
-            priest_str = (
-                f"{years_priest} лет" if years_priest is not None else "нет данных"
-            )
-
-            jubilee_marks = []
-            if age_jubilee:
-                jubilee_marks.append(f"<b>🎂 ЮБИЛЕЙ возраста: {age} лет</b>")
-            if utils.is_jubilee(years_deacon):
-                jubilee_marks.append(
-                    f"<b>✝️ ЮБИЛЕЙ в диаконском сане: {years_deacon} лет</b>"
-                )
-            if utils.is_jubilee(years_priest):
-                jubilee_marks.append(
-                    f"<b>⛪ ЮБИЛЕЙ в священническом сане: {years_priest} лет</b>"
-                )
-
-            birth_line = ""
-            if kind == "bday":
-                birth_line = f"   📅 Дата рождения: {utils.format_date(p.birth_date)}\n"
-            ordinations_line = ""
-            if kind == "ord":
-                deacon_date_str = utils.format_date(p.deacon_ordination_date)
-                priest_date_str = utils.format_date(p.priest_ordination_date)
-                ordinations_line = (
-                    f"   ✝️ Дата хиротонии в диакона: {deacon_date_str}\n"
-                    f"   ⛪ Дата хиротонии в священника: {priest_date_str}\n"
-                )
-
-            base_line = (
-                f"{idx}. {fio}\n"
-                f"   Сан: {p.status}\n"
-                f"{birth_line}"
-                f"{ordinations_line}"
-                f"   🎂 Возраст: {age_str}\n"
-                f"   📍 Место служения: {p.service_place or 'не указано'}\n"
-                f"   ✝️ Лет в диаконском сане: {deacon_str}\n"
-                f"   ⛪ Лет в священническом сане: {priest_str}"
-            )
-
-            if jubilee_marks:
-                base_line += "\n   🔔 " + " | ".join(jubilee_marks)
-
-        lines.append(base_line)
-        lines.append("")
-
-    message = "\n".join(lines)
-    parts = utils.split_message(message)
-    chat_id = query.message.chat_id
-    first = True
-    for part in parts:
-        if first:
-            await query.edit_message_text(
-                part,
-                parse_mode="HTML",
-            )
-            first = False
-        else:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=part,
-                parse_mode="HTML",
-            )
+    """Отправляет отчёт об именинниках за указанный месяц для выбранного типа дат."""
+    parts = await _get_digest(context).month_report(
+        _get_db(context), kind, month, jubilee_only=jubilee_only
+    )
+    _send_report_parts(query, context, parts)
 
 
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1115,10 +916,18 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Простой поиск по любому другому тексту
-    db = database.Database()
-    priests = db.search_priests(text)
+    db = _get_db(context)
+    priests = await db.search_priest_summaries(text)
     
     if not priests:
+        # Запасной вариант — нечёткий поиск (опечатки в фамилии)
+        suggestions = await db.fuzzy_search(text, summary=True)
+        if suggestions:
+            await update.message.reply_text(
+                _format_fuzzy_suggestions(text, suggestions),
+                parse_mode="HTML"
+            )
+            return
         await update.message.reply_text(
             f"❌ По запросу '{text}' ничего не найдено.\n\n"
             f"Используйте команду /search для поиска или /help для справки."
@@ -1126,8 +935,13 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     if len(priests) == 1:
+        priest = await db.get_priest_by_id(priests[0].id)
+        if priest is None:
+            # Запись удалили между поиском и чтением карточки
+            await update.message.reply_text("❌ Священник не найден.")
+            return
         await update.message.reply_text(
-            priests[0].format_message(),
+            render_card(priest),
             parse_mode="HTML"
         )
     else:
@@ -0,0 +1,158 @@
+"""
+Индекс личностей «нормализованное ФИО → id» для проверки дубликатов при импорте
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import utils
+from models import Priest
+
+logger = logging.getLogger(__name__)
+
+
+MATCH_EXACT = "exact"  # совпали фамилия, имя и отчество
+MATCH_NAME = "name"  # совпали фамилия и имя, и такая запись одна
+MATCH_AMBIGUOUS = "ambiguous"  # подходит несколько записей
+MATCH_NONE = "none"
+
+
+class IdentityMatch(NamedTuple):
+    """Результат поиска ФИО в индексе"""
+    kind: str  # MATCH_EXACT, MATCH_NAME, MATCH_AMBIGUOUS или MATCH_NONE
+    priest_ids: Tuple[int, ...]
+
+    @property
+    def priest_id(self) -> Optional[int]:
+        """id найденной записи (только для однозначного совпадения)"""
+        return self.priest_ids[0] if len(self.priest_ids) == 1 else None
+
+
+NO_MATCH = IdentityMatch(MATCH_NONE, ())
+
+
+class FioIdentityIndex:
+    """
+    Словари нормализованных ФИО существующих записей.
+
+    Загружается из базы одним запросом в начале импорта, после чего
+    проверка «есть ли уже такой священник» — обращение к словарю вместо
+    поиска по таблице. Ключ полного ФИО совпадает с identity_key, по
+    которому Database.bulk_upsert определяет конфликт. Записи раскладываются
+    по двум словарям: полное ФИО и пара (фамилия, имя); если ключу
+    соответствует несколько записей (тёзки), совпадение неоднозначно и
+    вызывающий код его не применяет. Один экземпляр можно передавать
+    нескольким импортёрам подряд (Excel-импортёры, телефоны kliriki).
+    """
+
+    def __init__(self, names: Iterable[Tuple[int, str, str, str]] = ()):
+        self._by_fio: Dict[str, List[int]] = defaultdict(list)
+        self._by_name: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        self._patronymics: Dict[int, str] = {}
+        for priest_id, surname, name, patronymic in names:
+            self._add(priest_id, surname, name, patronymic)
+
+    @classmethod
+    def load(cls, db) -> "FioIdentityIndex":
+        """Построение индекса по текущему содержимому базы"""
+        index = cls(db.get_identity_names())
+        logger.info("Индекс личностей загружен: %s записей", len(index))
+        return index
+
+    @classmethod
+    def from_priests(cls, priests: Iterable[Priest]) -> "FioIdentityIndex":
+        """Построение индекса по уже загруженным записям"""
+        return cls((priest.id, priest.surname, priest.name, priest.patronymic) for priest in priests)
+
+    @staticmethod
+    def key(surname: Optional[str], name: Optional[str], patronymic: Optional[str]) -> str:
+        """Нормализованный ключ ФИО (как identity_key в таблице priests)"""
+        return utils.fio_search_key(surname, name, patronymic)
+
+    @staticmethod
+    def name_key(surname: Optional[str], name: Optional[str]) -> Tuple[str, str]:
+        """Нормализованные (фамилия, имя) для сопоставления без отчества"""
+        return utils.normalize_search_key(surname), utils.normalize_search_key(name)
+
+    def __len__(self) -> int:
+        return len(self._patronymics)
+
+    def _add(self, priest_id: int, surname: str, name: str, patronymic: Optional[str]) -> None:
+        if priest_id in self._patronymics:
+            return
+        self._patronymics[priest_id] = patronymic or ""
+        self._by_fio[self.key(surname, name, patronymic)].append(priest_id)
+        self._by_name[self.name_key(surname, name)].append(priest_id)
+
+    def match(
+        self,
+        surname: Optional[str],
+        name: Optional[str],
+        patronymic: Optional[str],
+        by_name: bool = True,
+    ) -> IdentityMatch:
+        """
+        Поиск записи по ФИО: сначала полное совпадение, затем (при by_name)
+        совпадение фамилии и имени.
+        """
+        fio_key = self.key(surname, name, patronymic)
+        if not fio_key:
+            return NO_MATCH
+
+        ids = self._by_fio.get(fio_key)
+        if ids:
+            return IdentityMatch(MATCH_EXACT if len(ids) == 1 else MATCH_AMBIGUOUS, tuple(ids))
+
+        if by_name:
+            ids = self._by_name.get(self.name_key(surname, name))
+            if ids:
+                return IdentityMatch(MATCH_NAME if len(ids) == 1 else MATCH_AMBIGUOUS, tuple(ids))
+
+        return NO_MATCH
+
+    def find(self, surname: Optional[str], name: Optional[str], patronymic: Optional[str]) -> Optional[int]:
+        """id единственной записи с таким ФИО или None"""
+        return self.match(surname, name, patronymic, by_name=False).priest_id
+
+    def match_priest(self, priest: Priest) -> IdentityMatch:
+        """
+        Поиск существующей записи для строки импорта.
+
+        По фамилии и имени ищутся только строки без отчества (в файлах по
+        шаблону нет такой колонки): строка с другим отчеством — другой
+        человек.
+        """
+        return self.match(priest.surname, priest.name, priest.patronymic, by_name=not priest.patronymic)
+
+    def find_priest(self, priest: Priest) -> Optional[int]:
+        """id однозначно найденной записи для строки импорта или None"""
+        return self.match_priest(priest).priest_id
+
+    def resolve(self, priest: Priest) -> IdentityMatch:
+        """
+        Как match_priest, но строке без отчества, найденной по фамилии и
+        имени, подставляется отчество существующей записи — тогда
+        Database.bulk_upsert обновит эту запись, а не добавит новую.
+        """
+        match = self.match_priest(priest)
+        if match.kind == MATCH_NAME:
+            priest.patronymic = self._patronymics[match.priest_id]
+        return match
+
+    def add(self, priest: Priest) -> None:
+        """Учёт записи, добавленной в базу (priest.id должен быть заполнен)"""
+        if priest.id:
+            self._add(priest.id, priest.surname, priest.name, priest.patronymic)
+
+
+def ambiguous_error(row_number: int, priest: Priest, match: IdentityMatch, data: Dict) -> Dict:
+    """Запись об ошибке импорта для строки, ФИО которой совпало с несколькими записями"""
+    ids = ", ".join(str(priest_id) for priest_id in match.priest_ids)
+    return {
+        "row": row_number,
+        "errors": [
+            f"Священник {priest.surname} {priest.name} {priest.patronymic} совпадает "
+            f"с несколькими записями (id {ids}), строка пропущена"
+        ],
+        "data": data,
+    }
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Пробный прогон импорта (dry-run): что изменится в базе, без записи.
+
+Разобранные строки файла сравниваются с содержимым таблицы priests,
+прочитанным одним запросом. Каждая строка попадает в одну из групп:
+новая, изменённая (с перечнем изменившихся полей), без изменений; записи
+базы, которых нет в файле, — в группу отсутствующих. Отчёт сохраняется в
+JSON или Excel.
+
+Использование:
+    python3 import_diff.py data/priests_odess.xlsx                    # формат A–K
+    python3 import_diff.py priests.xlsx --format standard --report diff.xlsx
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from identity_index import FioIdentityIndex
+from models import Priest
+
+logger = logging.getLogger(__name__)
+
+# Поля, которые импорт записывает в базу (см. Database._priest_values)
+DIFF_FIELDS: Dict[str, str] = {
+    "surname": "Фамилия",
+    "name": "Имя",
+    "patronymic": "Отчество",
+    "status": "Статус",
+    "nationality": "Национальность",
+    "birth_date": "Дата рождения",
+    "name_day": "День тезоименитства",
+    "birth_place": "Место рождения",
+    "deacon_ordination_date": "Рукоположение в диакона",
+    "priest_ordination_date": "Рукоположение в священника",
+    "ordination_date": "Дата рукоположения",
+    "service_place": "Место служения",
+    "education": "Духовное образование",
+    "secular_education": "Светское образование",
+    "last_reward": "Последняя награда",
+    "phone": "Телефон",
+}
+
+
+def _plain(value: Any) -> Any:
+    """Значение поля в виде для сравнения и отчёта (дата — ISO, пусто — "")"""
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def field_changes(current: Priest, incoming: Priest) -> Dict[str, Dict[str, Any]]:
+    """
+    Поля, которые изменит импорт строки incoming в запись current.
+
+    Пустые значения строки не учитываются: bulk_upsert не затирает ими
+    сохранённые (например, телефоны, которых нет в файле).
+    """
+    changes = {}
+    for field in DIFF_FIELDS:
+        old, new = _plain(getattr(current, field)), _plain(getattr(incoming, field))
+        if new != "" and old != new:
+            changes[field] = {"old": old, "new": new}
+    return changes
+
+
+def split_duplicates(
+    parsed: Iterable[Tuple[int, Priest, Dict]],
+    seen: Optional[Dict[str, int]] = None,
+) -> Tuple[List[Tuple[int, Priest, Dict]], List[Tuple[int, Priest, Dict, int]]]:
+    """
+    Повторы ФИО в файле: действует первая строка, остальные отбрасываются.
+
+    Правило общее для всех режимов импорта (bulk_upsert без обновления
+    тоже оставляет первую строку) и для пробного прогона. Возвращает
+    (строки к записи, повторы с номером первой строки). seen — ФИО ->
+    номер первой строки из предыдущих пакетов того же файла (дополняется).
+    """
+    if seen is None:
+        seen = {}
+    unique: List[Tuple[int, Priest, Dict]] = []
+    duplicates: List[Tuple[int, Priest, Dict, int]] = []
+    for row_number, priest, data in parsed:
+        key = FioIdentityIndex.key(priest.surname, priest.name, priest.patronymic)
+        first_row = seen.setdefault(key, row_number)
+        if first_row == row_number:
+            unique.append((row_number, priest, data))
+        else:
+            duplicates.append((row_number, priest, data, first_row))
+    return unique, duplicates
+
+
+def duplicate_error(row_number: int, priest: Priest, first_row: int, data: Dict) -> Dict:
+    """Запись об ошибке импорта для строки, повторяющей ФИО более ранней строки"""
+    return {
+        "row": row_number,
+        "errors": [
+            f"Священник {priest.surname} {priest.name} {priest.patronymic} "
+            f"уже был в строке {first_row}, строка пропущена"
+        ],
+        "data": data,
+    }
+
+
+def _fio(priest: Priest) -> str:
+    return " ".join(part for part in (priest.surname, priest.name, priest.patronymic) if part)
+
+
+class ImportDiff:
+    """Результат сравнения файла с базой"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.new: List[Dict] = []
+        self.changed: List[Dict] = []
+        self.unchanged: List[Dict] = []
+        self.missing: List[Dict] = []
+        # Строки с тем же ФИО, что у более ранней строки файла (в базу попадёт первая)
+        self.duplicates: List[Dict] = []
+        self.errors: List[Dict] = []
+        self.elapsed: float = 0.0
+        # Таблица очищается перед импортом: missing — все записи базы
+        self.replace = False
+
+    @classmethod
+    def compute(
+        cls,
+        source: str,
+        parsed: Iterable[Tuple[int, Priest, Dict]],
+        existing: Iterable[Priest],
+        errors: Iterable[Dict] = (),
+        replace: bool = False,
+    ) -> "ImportDiff":
+        """
+        Сравнение разобранных строк (номер строки, Priest, данные) с записями базы.
+
+        Записи сопоставляются по нормализованному ФИО — так же, как
+        Database.bulk_upsert находит существующую запись. При replace
+        таблица перед импортом очищается: все записи базы попадают в
+        missing, все строки файла — в new.
+        """
+        started = time.perf_counter()
+        diff = cls(source)
+        diff.replace = replace
+        diff.errors = [{"row": error["row"], "errors": list(error["errors"])} for error in errors]
+
+        existing = sorted(existing, key=lambda p: p.id)
+        # У тёзок в базе совпадает с файлом запись с меньшим id (как identity_key)
+        by_key: Dict[str, Priest] = {}
+        if not replace:
+            for priest in existing:
+                by_key.setdefault(FioIdentityIndex.key(priest.surname, priest.name, priest.patronymic), priest)
+
+        # При повторе ФИО действует первая строка, как при импорте
+        unique, duplicates = split_duplicates(parsed)
+        diff.duplicates = [
+            {"row": row_number, "fio": _fio(priest), "kept_row": first_row}
+            for row_number, priest, _, first_row in duplicates
+        ]
+
+        matched_ids = set()
+        for row_number, priest, _ in unique:
+            current = by_key.get(FioIdentityIndex.key(priest.surname, priest.name, priest.patronymic))
+            if current is None:
+                diff.new.append({
+                    "row": row_number,
+                    "fio": _fio(priest),
+                    "values": {field: _plain(getattr(priest, field)) for field in DIFF_FIELDS},
+                })
+                continue
+
+            matched_ids.add(current.id)
+            changes = field_changes(current, priest)
+            entry = {"row": row_number, "id": current.id, "fio": _fio(priest)}
+            if changes:
+                entry["changes"] = changes
+                diff.changed.append(entry)
+            else:
+                diff.unchanged.append(entry)
+
+        diff.missing = [
+            {"id": priest.id, "fio": _fio(priest)}
+            for priest in (existing if replace else by_key.values())
+            if priest.id not in matched_ids
+        ]
+        diff.missing.sort(key=lambda entry: entry["fio"])
+        diff.duplicates.sort(key=lambda entry: entry["row"])
+        diff.elapsed = time.perf_counter() - started
+        return diff
+
+    def summary(self) -> Dict[str, int]:
+        """Количество строк в каждой группе"""
+        return {
+            "new": len(self.new),
+            "changed": len(self.changed),
+            "unchanged": len(self.unchanged),
+            "missing": len(self.missing),
+            "duplicates": len(self.duplicates),
+            "errors": len(self.errors),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "replace": self.replace,
+            "summary": self.summary(),
+            "new": self.new,
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+            "missing": self.missing,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+        }
+
+    def to_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def to_excel(self, path: str) -> None:
+        """Отчёт Excel: сводка и по листу на каждую группу"""
+        wb = Workbook(write_only=True)
+        bold = Font(bold=True)
+
+        def sheet(title: str, header: List[str], rows: Iterable[List[Any]]) -> None:
+            ws = wb.create_sheet(title)
+            header_cells = []
+            for value in header:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.font = bold
+                header_cells.append(cell)
+            ws.append(header_cells)
+            for row in rows:
+                ws.append(row)
+
+        titles = {
+            "new": "Новые", "changed": "Изменённые", "unchanged": "Без изменений",
+            "missing": "Нет в файле", "duplicates": "Повторы", "errors": "Ошибки",
+        }
+        sheet("Сводка", ["Группа", "Количество"], [[titles[k], v] for k, v in self.summary().items()])
+        sheet(
+            titles["new"],
+            ["Строка"] + list(DIFF_FIELDS.values()),
+            ([entry["row"]] + [entry["values"][field] for field in DIFF_FIELDS] for entry in self.new),
+        )
+        sheet(
+            titles["changed"],
+            ["Строка", "id", "ФИО", "Поле", "Было", "Станет"],
+            (
+                [entry["row"], entry["id"], entry["fio"], DIFF_FIELDS[field], delta["old"], delta["new"]]
+                for entry in self.changed
+                for field, delta in entry["changes"].items()
+            ),
+        )
+        sheet(titles["unchanged"], ["Строка", "id", "ФИО"],
+              ([entry["row"], entry["id"], entry["fio"]] for entry in self.unchanged))
+        sheet(titles["missing"], ["id", "ФИО"], ([entry["id"], entry["fio"]] for entry in self.missing))
+        sheet(titles["duplicates"], ["Строка", "ФИО", "Используется строка"],
+              ([entry["row"], entry["fio"], entry["kept_row"]] for entry in self.duplicates))
+        sheet(titles["errors"], ["Строка", "Ошибки"],
+              ([entry["row"], "; ".join(entry["errors"])] for entry in self.errors))
+        wb.save(path)
+
+    def save(self, path: str) -> None:
+        """Сохранение отчёта; формат по расширению (.json или .xlsx)"""
+        if path.lower().endswith(".xlsx"):
+            self.to_excel(path)
+        elif path.lower().endswith(".json"):
+            self.to_json(path)
+        else:
+            raise ValueError(f"Неизвестный формат отчёта: {path} (ожидается .json или .xlsx)")
+
+    def format_summary(self) -> str:
+        """Краткая сводка для вывода в консоль"""
+        counts = self.summary()
+        missing = "Будут удалены при очистке таблицы" if self.replace else "Есть в базе, нет в файле"
+        return (
+            f"Новых: {counts['new']}\n"
+            f"Изменённых: {counts['changed']}\n"
+            f"Без изменений: {counts['unchanged']}\n"
+            f"{missing}: {counts['missing']}\n"
+            f"Повторов ФИО в файле: {counts['duplicates']}\n"
+            f"Ошибок разбора: {counts['errors']}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Пробный прогон импорта: отчёт об изменениях без записи в базу")
+    parser.add_argument("file", help="Excel-файл для импорта")
+    parser.add_argument(
+        "--format", choices=("legacy", "standard"), default="legacy",
+        help="legacy — формат A–K (priests_odess.xlsx), standard — файл по шаблону с заголовками",
+    )
+    parser.add_argument("--report", help="путь к отчёту (.json или .xlsx)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(asctime)s - %(levelname)s - %(message)s", level=logging.WARNING)
+
+    if not os.path.exists(args.file):
+        print(f"❌ Файл не найден: {args.file}")
+        return 1
+
+    # Пробный прогон не должен менять базу — даже применять миграции схемы
+    from database import Database
+    try:
+        db = Database(read_only=True)
+    except (FileNotFoundError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.format == "legacy":
+        from legacy_excel_importer import LegacyExcelImporter
+        diff = LegacyExcelImporter(db).diff_file(args.file)
+    else:
+        from excel_importer import ExcelImporter
+        diff = ExcelImporter(db).diff_file(args.file)
+
+    print(f"=== ПРОБНЫЙ ИМПОРТ: {args.file} ===")
+    print(diff.format_summary())
+    for entry in diff.changed[:20]:
+        fields = ", ".join(DIFF_FIELDS[field] for field in entry["changes"])
+        print(f"  ~ Строка {entry['row']}: {entry['fio']} ({fields})")
+    if len(diff.changed) > 20:
+        print(f"  ... и ещё {len(diff.changed) - 20} изменённых")
+    print(f"Сравнение: {diff.elapsed * 1000:.0f} мс")
+
+    if args.report:
+        diff.save(args.report)
+        print(f"📄 Отчёт сохранён: {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Параллельный импорт нескольких файлов в базу данных.
+
+Заменяет последовательный запуск offline_import_legacy.py / import_diakons.py /
+import_phones_from_kliriki.py. Разбор Excel (openpyxl и регулярные выражения
+в LegacyExcelImporter) выполняется в пуле процессов: файлы читаются
+параллельно, большие листы делятся на части по строкам. Запись в базу
+выполняет только главный процесс — по порядку файлов, через bulk_upsert.
+
+Использование:
+    python3 import_pipeline.py                         # priests_odess.xlsx, diakons.xlsx, kliriki.xlsx из data/
+    python3 import_pipeline.py data/a.xlsx data/b.xlsx --phones data/kliriki.xlsx
+    python3 import_pipeline.py --update-existing --workers 4 --chunk-size 200
+    python3 import_pipeline.py --incremental --delete-missing   # только изменения с прошлого импорта
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from database import Database
+from kliriki_parser import KlirikiParser
+from legacy_excel_importer import LegacyExcelImporter
+from models import Priest
+from phone_matcher import PhoneMatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILES = [
+    os.path.join("data", "priests_odess.xlsx"),
+    os.path.join("data", "diakons.xlsx"),
+]
+DEFAULT_PHONES_FILE = os.path.join("data", "kliriki.xlsx")
+
+Rows = List[Tuple[int, Tuple[Any, ...]]]
+
+
+# ===== Задачи для процессов пула (не обращаются к базе данных) =====
+
+def _read_rows(file_path: str) -> Rows:
+    """Чтение строк данных файла формата A–K"""
+    return list(LegacyExcelImporter.read_rows(file_path))
+
+
+def _parse_chunk(rows: Rows) -> Tuple[List[Tuple[int, Priest, Dict]], List[Dict]]:
+    """Разбор части строк в объекты Priest"""
+    return LegacyExcelImporter().parse_rows(rows)
+
+
+def _parse_kliriki(file_path: str) -> List[dict]:
+    """Извлечение ФИО и телефонов из kliriki.xlsx"""
+    return KlirikiParser(file_path).extract_all_entries()
+
+
+class ImportPipeline:
+    """Оркестратор импорта: параллельный разбор, последовательная запись"""
+
+    def __init__(
+        self,
+        db: Optional[Database] = None,
+        workers: int = config.IMPORT_WORKERS,
+        chunk_size: int = config.IMPORT_CHUNK_SIZE,
+    ):
+        self.db = db or Database()
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def run(
+        self,
+        files: List[str],
+        phones_file: Optional[str] = None,
+        update_existing: bool = False,
+        incremental: bool = False,
+        delete_missing: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Импорт файлов формата A–K и (необязательно) телефонов из kliriki.xlsx.
+
+        incremental/delete_missing — как у LegacyExcelImporter.import_from_file.
+        Возвращает словарь со статистикой по каждому файлу (ключи как у
+        LegacyExcelImporter.import_from_file) и по телефонам.
+        """
+        started = time.perf_counter()
+        # Один импортёр на весь прогон: общий индекс ФИО, дубликаты между файлами
+        # определяются так же, как при последовательном импорте
+        writer = LegacyExcelImporter(self.db)
+        results: Dict[str, Any] = {"files": {}}
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            read_futures = {path: pool.submit(_read_rows, path) for path in files}
+            kliriki_future = pool.submit(_parse_kliriki, phones_file) if phones_file else None
+
+            # Как только файл прочитан, его строки делятся на части для разбора
+            chunk_futures: Dict[str, List[Future]] = {}
+            totals: Dict[str, int] = {}
+            identities: Dict[str, Dict[int, Tuple[str, str]]] = {}
+            for path in files:
+                rows = read_futures[path].result()
+                totals[path] = rows[-1][0] if rows else 0
+                if incremental:
+                    identities[path] = {
+                        row_number: LegacyExcelImporter.row_identity(values) for row_number, values in rows
+                    }
+                chunk_futures[path] = [
+                    pool.submit(_parse_chunk, rows[start:start + self.chunk_size])
+                    for start in range(0, len(rows), self.chunk_size)
+                ]
+                logger.info("%s: %s строк, частей для разбора: %s", path, len(rows), len(chunk_futures[path]))
+
+            # Запись — только в этом процессе и строго в порядке файлов
+            for path in files:
+                writer.errors = []
+                writer.success_count = 0
+                parsed: List[Tuple[int, Priest, Dict]] = []
+                for future in chunk_futures[path]:
+                    chunk_parsed, chunk_errors = future.result()
+                    parsed.extend(chunk_parsed)
+                    writer.errors.extend(chunk_errors)
+                counts: Dict[str, int] = {}
+                if incremental:
+                    counts = writer.sync_parsed(os.path.basename(path), parsed, identities[path], delete_missing)
+                else:
+                    writer.save_parsed(parsed, update_existing)
+                writer.errors.sort(key=lambda error: error["row"])
+
+                results["files"][path] = {
+                    "total": totals[path],
+                    "success": writer.success_count,
+                    "errors": len(writer.errors),
+                    "error_details": writer.errors,
+                    **counts,
+                }
+
+            if kliriki_future is not None:
+                entries = kliriki_future.result()
+                # Телефоны сопоставляются по тому же индексу ФИО, что и строки файлов
+                plan = PhoneMatcher(self.db.get_all_priests(), writer.identity_index).plan(entries)
+                results["phones"] = {
+                    "total": len(entries),
+                    "matched": plan.matched,
+                    "updated": self.db.update_phones(list(plan.new_phones.items())),
+                    "ambiguous": plan.ambiguous,
+                    "not_matched": plan.not_matched,
+                }
+
+        results["elapsed"] = time.perf_counter() - started
+        return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Параллельный импорт Excel-файлов в базу данных")
+    parser.add_argument(
+        "files", nargs="*",
+        help="файлы формата A–K (по умолчанию data/priests_odess.xlsx и data/diakons.xlsx)",
+    )
+    parser.add_argument("--phones", help="файл kliriki.xlsx с телефонами (по умолчанию data/kliriki.xlsx, если есть)")
+    parser.add_argument("--no-phones", action="store_true", help="не импортировать телефоны")
+    parser.add_argument("--update-existing", action="store_true", help="обновлять уже существующие записи")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="записывать только новые и изменившиеся с прошлого импорта строки",
+    )
+    parser.add_argument(
+        "--delete-missing", action="store_true",
+        help="вместе с --incremental: удалять записи, строки которых исчезли из файла",
+    )
+    parser.add_argument("--workers", type=int, default=config.IMPORT_WORKERS, help="число процессов для разбора")
+    parser.add_argument("--chunk-size", type=int, default=config.IMPORT_CHUNK_SIZE, help="строк в одной части")
+    args = parser.parse_args(argv)
+    if args.delete_missing and not args.incremental:
+        parser.error("--delete-missing используется только вместе с --incremental")
+
+    logging.basicConfig(format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+    files = args.files or DEFAULT_FILES
+    phones_file = None
+    if not args.no_phones:
+        phones_file = args.phones or (DEFAULT_PHONES_FILE if os.path.exists(DEFAULT_PHONES_FILE) else None)
+
+    missing = [path for path in files + ([phones_file] if phones_file else []) if not os.path.exists(path)]
+    if missing:
+        for path in missing:
+            print(f"❌ Файл не найден: {path}")
+        return 1
+
+    pipeline = ImportPipeline(workers=args.workers, chunk_size=args.chunk_size)
+    results = pipeline.run(
+        files,
+        phones_file=phones_file,
+        update_existing=args.update_existing,
+        incremental=args.incremental,
+        delete_missing=args.delete_missing,
+    )
+
+    print("\n=== РЕЗУЛЬТАТ ИМПОРТА ===")
+    for path, result in results["files"].items():
+        print(f"\n📄 {path}")
+        print(f"Всего строк в файле: {result['total']}")
+        print(f"Успешно импортировано: {result['success']}")
+        if "unchanged" in result:
+            print(
+                f"Без изменений: {result['unchanged']}, обновлено: {result['updated']}, "
+                f"добавлено: {result['inserted']}, удалено: {result['removed']}"
+            )
+        print(f"Ошибок: {result['errors']}")
+        for error in result["error_details"][:20]:
+            print(f"  - Строка {error['row']}: {'; '.join(error['errors'])}")
+        if result["errors"] > 20:
+            print(f"  ... и ещё {result['errors'] - 20} ошибок")
+
+    phones = results.get("phones")
+    if phones:
+        print(f"\n📞 {phones_file}")
+        print(f"Всего записей: {phones['total']}")
+        print(f"Найдено совпадений с БД: {phones['matched']}")
+        print(f"Обновлено телефонов: {phones['updated']}")
+        print(f"Неоднозначных совпадений: {len(phones['ambiguous'])}")
+        print(f"Не найдено совпадений: {len(phones['not_matched'])}")
+
+    print(f"\n⏱  Время: {results['elapsed']:.1f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,8 +8,9 @@
 """
 
 import re
-from typing import Optional, Tuple
-import pandas as pd
+from typing import Any, Iterator, Optional, Tuple
+
+from openpyxl import load_workbook
 
 
 class KlirikiParser:
@@ -32,10 +33,18 @@ class KlirikiParser:
         "протод",
     ]
 
+    # Все саны одним выражением: сан как отдельное слово (с точкой или без).
+    # Длинные варианты стоят первыми, чтобы «протодиакон» не разбирался
+    # как «прот» + остаток.
+    RANKS_RE = re.compile(
+        r"\b(?:"
+        + "|".join(re.escape(rank) for rank in sorted(KNOWN_RANKS, key=len, reverse=True))
+        + r")\.?\b",
+        re.IGNORECASE,
+    )
+
     def __init__(self, file_path: str):
         self.file_path = file_path
-        # Читаем Excel с помощью pandas
-        self.df = pd.read_excel(file_path, engine='openpyxl', header=None)
 
     def _clean_lines(self, cell_value) -> list:
         """Разбивает значение ячейки по строкам и очищает."""
@@ -59,18 +68,8 @@ class KlirikiParser:
 
     def _remove_ranks(self, text: str) -> str:
         """Удаляет саны и должности из текста."""
-        text_clean = text
-        for rank in self.KNOWN_RANKS:
-            # Удаляем сан как отдельное слово (с точкой или без)
-            text_clean = re.sub(
-                rf"\b{re.escape(rank)}\.?\b",
-                "",
-                text_clean,
-                flags=re.IGNORECASE,
-            )
-        # Убираем лишние пробелы
-        text_clean = " ".join(text_clean.split())
-        return text_clean.strip()
+        # Один проход по строке; лишние пробелы убираются split/join
+        return " ".join(self.RANKS_RE.sub("", text).split())
 
     def parse_fio_from_column_d(self, cell_value) -> Tuple[str, str, str]:
         """
@@ -126,6 +125,24 @@ class KlirikiParser:
         
         return phone
 
+    def iter_rows(self) -> Iterator[Tuple[int, Any, Any]]:
+        """
+        Потоковое чтение листа: (номер строки, колонка D, колонка E).
+
+        Строки, в которых пусты обе колонки, пропускаются.
+        """
+        wb = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            for row_number, values in enumerate(
+                wb.active.iter_rows(min_col=4, max_col=5, values_only=True), start=1
+            ):
+                col_d, col_e = (tuple(values) + (None, None))[:2]
+                if col_d is None and col_e is None:
+                    continue
+                yield row_number, col_d, col_e
+        finally:
+            wb.close()
+
     def extract_all_entries(self) -> list:
         """
         Извлекает все записи (ФИО + телефон) из файла.
@@ -138,24 +155,14 @@ class KlirikiParser:
         """
         entries = []
         
-        # Проходим по всем строкам DataFrame
-        for idx, row in self.df.iterrows():
-            # Колонка D - это индекс 3 (0-based)
-            # Колонка E - это индекс 4
-            col_d = row[3] if len(row) > 3 else None
-            col_e = row[4] if len(row) > 4 else None
-            
-            # Пропускаем пустые строки
-            if pd.isna(col_d) and pd.isna(col_e):
-                continue
-            
+        for row_number, col_d, col_e in self.iter_rows():
             name, patronymic, surname = self.parse_fio_from_column_d(col_d)
             phone = self.parse_phone_from_column_e(col_e)
             
             # Если есть хотя бы фамилия или имя
             if surname or name:
                 entries.append({
-                    "row": idx + 1,  # 1-based row number
+                    "row": row_number,  # 1-based row number
                     "name": name,
                     "patronymic": patronymic,
                     "surname": surname,
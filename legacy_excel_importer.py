@@ -21,381 +21,22 @@
  K - текущая награда
 """
 
-import logging
-from datetime import datetime, date
-from typing import Dict, List, Optional, Tuple
-
-import pandas as pd
-
-from database import Database
-from models import Priest
-
-logger = logging.getLogger(__name__)
-
-
-class LegacyExcelImporter:
-    """Импортёр для специфического файла Одесской Епархии (A–K)."""
-
-    STATUS_MAP: Dict[str, str] = {
-        # Священники
-        "свящ": "Иерей",
-        "прот": "Протоиерей",
-        # Дьяконы
-        "диак": "Диакон",
-        "дьяк": "Диакон",
-        "протод": "Протодиакон",
-        "протодиак": "Протодиакон",
-        "протодиакон": "Протодиакон",
-    }
-
-    NATIONALITY_MAP: Dict[str, str] = {
-        "укр": "Украинец",
-        "рус": "Русский",
-        "молд": "Молдованин",
-    }
-
-    def __init__(self, db: Optional[Database] = None) -> None:
-        self.db = db or Database()
-        self.errors: List[Dict] = []
-        self.success_count: int = 0
-        self.total_count: int = 0
-
-    # ---------- Вспомогательные парсеры ----------
-
-    @staticmethod
-    def _clean_lines(cell_value) -> List[str]:
-        """Разбивает значение ячейки по строкам и очищает точки/пробелы."""
-        if cell_value is None or (isinstance(cell_value, float) and pd.isna(cell_value)):
-            return []
-
-        s = str(cell_value).replace("\r", "\n")
-        parts = []
-        for raw in s.split("\n"):
-            line = raw.strip()
-            if not line:
-                continue
-            # убираем лишние точки в конце
-            line = line.strip().strip(".")
-            if line:
-                parts.append(line)
-        return parts
-
-    @staticmethod
-    def _parse_ddmm_with_year(ddmm: str, year: str) -> Optional[date]:
-        """Парсит строку вида '05.09' и год '1930' в дату 05.09.1930."""
-        ddmm = ddmm.strip().strip(".")
-        year = year.strip()
-        try:
-            return datetime.strptime(f"{ddmm}.{year}", "%d.%m.%Y").date()
-        except Exception:
-            return None
-
-    @staticmethod
-    def _format_ddmm(ddmm: str) -> str:
-        """Нормализует день тезоименитства в формат DD.MM (строка)."""
-        ddmm = ddmm.strip().strip(".")
-        try:
-            d = datetime.strptime(ddmm, "%d.%m")
-            return d.strftime("%d.%m")
-        except Exception:
-            # Если не получилось распарсить, возвращаем как есть
-            return ddmm
-
-    def _parse_birth_and_name_day(self, cell_value) -> Tuple[Optional[date], str]:
-        """
-        Парсит колонку E: год рождения, дата рождения, день тезоименитства.
-
-        Возвращает (birth_date, name_day_str).
-        """
-        lines = self._clean_lines(cell_value)
-        if not lines:
-            return None, ""
-
-        # Вариант 1: год + дата рождения
-        if len(lines) == 2:
-            year, birth_dm = lines
-            birth_date = self._parse_ddmm_with_year(birth_dm, year)
-            return birth_date, ""
-
-        # Вариант 2: год + дата рождения + день тезоименитства
-        if len(lines) >= 3:
-            year = lines[0]
-            birth_dm = lines[1]
-            name_dm = lines[2]
-            birth_date = self._parse_ddmm_with_year(birth_dm, year)
-            name_day = self._format_ddmm(name_dm)
-            return birth_date, name_day
-
-        # Нестандартный случай
-        return None, ""
-
-    def _parse_ordinations(self, cell_value) -> Tuple[Optional[date], Optional[date]]:
-        """
-        Парсит колонку F: даты рукоположения.
-
-        Возвращает (deacon_date, priest_date).
-        """
-        lines = self._clean_lines(cell_value)
-        if not lines:
-            return None, None
-
-        # Вариант 1: год + d/m диакон + d/m священник
-        if len(lines) == 3:
-            year, d1, d2 = lines
-            deacon = self._parse_ddmm_with_year(d1, year)
-            priest = self._parse_ddmm_with_year(d2, year)
-            return deacon, priest
-
-        # Вариант 2: год1 + d/m диакон + год2 + d/m священник
-        if len(lines) >= 4:
-            year1, d1, year2, d2 = lines[0], lines[1], lines[2], lines[3]
-            deacon = self._parse_ddmm_with_year(d1, year1)
-            priest = self._parse_ddmm_with_year(d2, year2)
-            return deacon, priest
-
-        return None, None
-
-    def _split_full_name(self, full_name: str) -> Tuple[str, str, str]:
-        """
-        Разбивает 'Фамилия Имя Отчество' на (name, patronymic, surname).
-        Если формат неожиданный, старается вернуть максимально разумные значения.
-        """
-        parts = [p for p in str(full_name).strip().split() if p]
-        if len(parts) >= 3:
-            surname = parts[0]
-            name = parts[1]
-            patronymic = " ".join(parts[2:])
-        elif len(parts) == 2:
-            surname, name = parts
-            patronymic = ""
-        elif len(parts) == 1:
-            surname = parts[0]
-            name = ""
-            patronymic = ""
-        else:
-            return "", "", ""
-        return name, patronymic, surname
-
-    def _map_status(self, raw_status: str) -> str:
-        s = raw_status.lower().strip()
-        for key, value in self.STATUS_MAP.items():
-            if key in s:
-                return value
-        # Если не нашли по кодам, возвращаем как есть
-        return raw_status.strip()
-
-    def _map_nationality(self, raw_nat: str) -> str:
-        if not raw_nat:
-            return ""
-        s = raw_nat.lower().strip().strip(".")
-        for key, value in self.NATIONALITY_MAP.items():
-            if s.startswith(key):
-                return value
-        return raw_nat.strip()
-
-    # ---------- Основная логика ----------
-
-    def import_from_file(self, file_path: str, update_existing: bool = False) -> Dict:
-        """
-        Импорт из файла формата A–K.
-
-        Колонки (индексы):
-         0:A, 1:B, 2:C, 3:D, 4:E, 5:F, 6:G, 7:H, 8:I, 9:J, 10:K
-        """
-        self.errors = []
-        self.success_count = 0
-        self.total_count = 0
-
-        # Читаем без заголовков, чтобы точно работать по индексам
-        df = pd.read_excel(file_path, sheet_name=0, header=None, engine="openpyxl")
-        self.total_count = len(df)
-        logger.info("Legacy import: всего строк в файле: %s", self.total_count)
-
-        for idx, row in df.iterrows():
-            excel_row_num = idx + 1  # нумерация строк в Excel
-
-            try:
-                # Пропустим полностью пустые строки
-                if row.isna().all():
-                    continue
-
-                # Попробуем пропустить строку-заголовок, если есть
-                index_val = row.get(0)
-                if isinstance(index_val, str) and not index_val.strip().isdigit():
-                    # предполагаем, что это заголовок
-                    continue
-
-                full_name = row.get(1)
-                if not isinstance(full_name, str) or not full_name.strip():
-                    self.errors.append(
-                        {
-                            "row": excel_row_num,
-                            "errors": ["Пустое ФИО в колонке B"],
-                            "data": row.to_dict(),
-                        }
-                    )
-                    continue
-
-                name, patronymic, surname = self._split_full_name(full_name)
-                if not surname:
-                    self.errors.append(
-                        {
-                            "row": excel_row_num,
-                            "errors": ["Не удалось распарсить ФИО"],
-                            "data": row.to_dict(),
-                        }
-                    )
-                    continue
-
-                # Статус (сан)
-                raw_status = str(row.get(2) or "").strip()
-                if not raw_status:
-                    self.errors.append(
-                        {
-                            "row": excel_row_num,
-                            "errors": ["Пустой сан в колонке C"],
-                            "data": row.to_dict(),
-                        }
-                    )
-                    continue
-                status = self._map_status(raw_status)
-
-                # Национальность
-                nationality = self._map_nationality(str(row.get(3) or ""))
-
-                # Дата рождения и день тезоименитства
-                birth_date, name_day = self._parse_birth_and_name_day(row.get(4))
-
-                # Даты рукоположения
-                deacon_date, priest_date = self._parse_ordinations(row.get(5))
-
-                # Остальные поля
-                birth_place = str(row.get(6) or "").strip()
-                spiritual_education = str(row.get(7) or "").strip()
-                secular_education = str(row.get(8) or "").strip()
-                service_place = str(row.get(9) or "").strip()
-                last_reward = str(row.get(10) or "").strip()
-
-                priest = Priest(
-                    name=name or "",
-                    patronymic=patronymic or "",
-                    surname=surname or "",
-                    birth_date=birth_date,
-                    birth_place=birth_place,
-                    nationality=nationality,
-                    status=status,
-                    name_day=name_day,
-                    deacon_ordination_date=deacon_date,
-                    priest_ordination_date=priest_date,
-                    service_place=service_place,
-                    education=spiritual_education,
-                    secular_education=secular_education,
-                    last_reward=last_reward,
-                )
-
-                # Проверка дубликатов по ФИО (имя+фамилия+отчество)
-                search_query = f"{priest.name} {priest.surname}"
-                existing = self.db.search_priests(search_query)
-                exact_match = any(
-                    p.name.lower() == priest.name.lower()
-                    and p.surname.lower() == priest.surname.lower()
-                    and (p.patronymic or "").lower()
-                    == (priest.patronymic or "").lower()
-                    for p in existing
-                )
-
-                if exact_match and not update_existing:
-                    self.errors.append(
-                        {
-                            "row": excel_row_num,
-                            "errors": [
-                                f"Священник {priest.surname} {priest.name} {priest.patronymic} уже существует"
-                            ],
-                            "data": row.to_dict(),
-                        }
-                    )
-                    continue
-
-                if exact_match and update_existing:
-                    # Обновляем первую найденную запись
-                    target = next(
-                        p
-                        for p in existing
-                        if p.name.lower() == priest.name.lower()
-                        and p.surname.lower() == priest.surname.lower()
-                    )
-                    priest.id = target.id
-                    self.db.update_priest(priest)
-                else:
-                    self.db.add_priest(priest)
-
-                self.success_count += 1
-
-            except Exception as e:
-                logger.exception("Ошибка при обработке строки %s: %s", excel_row_num, e)
-                self.errors.append(
-                    {
-                        "row": excel_row_num,
-                        "errors": [f"Исключение при обработке строки: {e}"],
-                        "data": row.to_dict(),
-                    }
-                )
-
-        result = {
-            "total": self.total_count,
-            "success": self.success_count,
-            "errors": len(self.errors),
-            "error_details": self.errors,
-        }
-        logger.info(
-            "Legacy import завершен. Успешно: %s, Ошибок: %s",
-            self.success_count,
-            len(self.errors),
-        )
-        return result
-
-    def get_error_report(self) -> str:
-        """Формирует человекочитаемый отчёт об ошибках."""
-        if not self.errors:
-            return "Ошибок не обнаружено."
-
-        report = f"Обнаружено ошибок: {len(self.errors)}\n\n"
-        for error in self.errors[:20]:
-            report += f"Строка {error['row']}:\n"
-            for msg in error["errors"]:
-                report += f"  - {msg}\n"
-            report += "\n"
-
-        if len(self.errors) > 20:
-            report += f"... и ещё {len(self.errors) - 20} ошибок\n"
-        return report
-
-"""
-Специальный импортёр для Excel-файла формата A–K:
-
-A – порядковый номер
-B – Фамилия Имя Отчество
-C – сан (свящ., прот. и т.п.)
-D – национальность (укр., рус., молд.)
-E – год рождения и день тезоименитства (1 или 2 даты в ячейке)
-F – даты рукоположения в диакона и священника
-G – место рождения
-H – духовное образование
-I – светское образование
-J – место служения
-K – текущая награда
-"""
-
 from dataclasses import dataclass
 from datetime import date
-from typing import List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Iterable, Iterator, Optional, Tuple
+import hashlib
 import logging
+import os
 import re
 
+import numpy as np
+import pandas as pd
 from openpyxl import load_workbook
 
 from models import Priest
 from database import Database
+from identity_index import MATCH_AMBIGUOUS, FioIdentityIndex, ambiguous_error
+from import_diff import ImportDiff, duplicate_error, field_changes, split_duplicates
 import utils
 
 logger = logging.getLogger(__name__)
@@ -412,12 +53,31 @@ class ParsedDates:
 class LegacyExcelImporter:
     """Импортёр под специальный формат A–K."""
 
-    def __init__(self, db: Optional[Database] = None):
-        self.db = db or Database()
+    # Подготовка ячеек E/F к разбору: \r — перевод строки, пробелы удаляются
+    _DATE_TEXT_TABLE = str.maketrans({"\r": "\n", " ": None})
+    # Строка ячейки: год или день.месяц с точкой в конце или без.
+    # То же, что проверяет _extract_years_and_dm, но для всех строк ячейки сразу.
+    DATE_LINE_PATTERN = r"(?m)^[^\S\n]*(?:(?P<year>\d{4})|(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.?)[^\S\n]*$"
+
+    def __init__(
+        self,
+        db: Optional[Database] = None,
+        identity_index: Optional[FioIdentityIndex] = None,
+    ):
+        self._db = db
+        # Общий индекс ФИО; если не передан, загружается при первой записи
+        self.identity_index = identity_index
         self.errors: List[Dict] = []
         self.success_count: int = 0
         self.total_count: int = 0
 
+    @property
+    def db(self) -> Database:
+        """База данных открывается только при записи (разбор строк обходится без неё)."""
+        if self._db is None:
+            self._db = Database()
+        return self._db
+
     # ===== Парсинг вспомогательных полей =====
 
     @staticmethod
@@ -559,181 +219,516 @@ class LegacyExcelImporter:
 
         return result
 
-    # ===== Основной импорт =====
+    # ===== Пакетный разбор дат (колонки E и F целиком) =====
 
-    def import_from_file(self, file_path: str, update_existing: bool = False) -> Dict:
+    @classmethod
+    def _extract_date_parts(cls, cells: pd.Series) -> Dict[str, np.ndarray]:
         """
-        Импорт из Excel файла формата A–K.
+        Годы и пары (день, месяц) для всех ячеек столбца одним вызовом str.extractall.
 
-        Args:
-            file_path: путь к Excel файлу
-            update_existing: обновлять существующие записи (по ФИО)
+        Возвращает массивы длины len(cells): year0/year1, day0/month0,
+        day1/month1 (первые два найденных значения, NaN если нет) и
+        years/dms (сколько всего найдено).
         """
-        self.errors = []
-        self.success_count = 0
-        self.total_count = 0
+        text = cells.str.translate(cls._DATE_TEXT_TABLE)
+        found = text.str.extractall(cls.DATE_LINE_PATTERN)
+        # Номер ячейки для каждого совпадения; совпадения упорядочены по ячейкам
+        rows = found.index.get_level_values(0).to_numpy(dtype=np.int64)
+
+        parts: Dict[str, np.ndarray] = {}
+        for kind, columns in (("year", ["year"]), ("dm", ["day", "month"])):
+            present = found[columns[0]].notna().to_numpy()
+            kind_rows = rows[present]
+            values = found.loc[present, columns].astype(int).to_numpy()
+            # Порядковый номер значения внутри своей ячейки
+            order = np.arange(len(kind_rows)) - np.searchsorted(kind_rows, kind_rows)
+
+            parts[f"{kind}s"] = np.bincount(kind_rows, minlength=len(cells))
+            for n in (0, 1):
+                selected = order == n
+                for i, column in enumerate(columns):
+                    column_values = np.full(len(cells), np.nan)
+                    column_values[kind_rows[selected]] = values[selected, i]
+                    parts[f"{column}{n}"] = column_values
+        return parts
 
+    @staticmethod
+    def _make_dates(
+        mask: np.ndarray, years: np.ndarray, months: np.ndarray, days: np.ndarray
+    ) -> List[Optional[date]]:
+        """Даты по столбцам год/месяц/день там, где mask; некорректные даты — None"""
+        result: List[Optional[date]] = []
+        for use, y, m, d in zip(mask.tolist(), years.tolist(), months.tolist(), days.tolist()):
+            value = None
+            if use:
+                try:
+                    value = date(int(y), int(m), int(d))
+                except ValueError:
+                    pass
+            result.append(value)
+        return result
+
+    @staticmethod
+    def _cells_to_series(cells: Iterable[Any]) -> pd.Series:
+        return pd.Series([str(cell) if cell is not None else "" for cell in cells], dtype=object)
+
+    def parse_date_columns(self, cells_e: Iterable[Any], cells_f: Iterable[Any]) -> List[ParsedDates]:
+        """
+        Пакетный разбор колонок E и F (значения ячеек по строкам).
+
+        Результат для каждой строки совпадает с _parse_birth_and_name_day
+        и _parse_ordinations, но регулярное выражение применяется к
+        столбцам целиком, а поля ParsedDates вычисляются по столбцам.
+        """
+        e = self._extract_date_parts(self._cells_to_series(cells_e))
+        f = self._extract_date_parts(self._cells_to_series(cells_f))
+
+        # E: первая пара год + день.месяц — рождение, вторая день.месяц — тезоименитство
+        has_birth = (e["years"] > 0) & (e["dms"] > 0)
+        birth_dates = self._make_dates(has_birth, e["year0"], e["month0"], e["day0"])
+        name_days = [
+            f"{int(d):02d}.{int(m):02d}" if use else ""
+            for use, d, m in zip((has_birth & (e["dms"] > 1)).tolist(), e["day1"].tolist(), e["month1"].tolist())
+        ]
+
+        # F: один год на обе даты или по году на каждую
+        one_year = (f["years"] == 1) & (f["dms"] >= 1)
+        two_years = (f["years"] >= 2) & (f["dms"] >= 2)
+        deacon_dates = self._make_dates(one_year | two_years, f["year0"], f["month0"], f["day0"])
+        priest_years = np.where(one_year, f["year0"], f["year1"])
+        has_priest = (one_year & (f["dms"] > 1)) | two_years
+        priest_dates = self._make_dates(has_priest, priest_years, f["month1"], f["day1"])
+
+        return [
+            ParsedDates(
+                birth_date=birth_date,
+                name_day=name_day,
+                deacon_ordination_date=deacon_date,
+                # Как в _parse_ordinations: при некорректной первой дате вторая не разбирается
+                priest_ordination_date=priest_date if deacon_date else None,
+            )
+            for birth_date, name_day, deacon_date, priest_date in zip(
+                birth_dates, name_days, deacon_dates, priest_dates
+            )
+        ]
+
+    # ===== Основной импорт =====
+
+    @staticmethod
+    def read_rows(file_path: str) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        """
+        Потоковое чтение строк данных: (номер строки в Excel, значения A–K).
+
+        Строка-заголовок (в A не число) и строки без номера в A пропускаются.
+        """
         wb = load_workbook(file_path, read_only=True, data_only=True)
-        ws = wb.active
+        try:
+            for row_index, values in enumerate(wb.active.iter_rows(values_only=True), start=1):
+                cell_a = values[0] if values else None
+                # Ожидаем, что первая строка может быть заголовком — пропускаем её,
+                # если в A не число.
+                if row_index == 1:
+                    if not isinstance(cell_a, (int, float)) and not (isinstance(cell_a, str) and cell_a.strip().isdigit()):
+                        continue  # считаем, что это заголовок
+
+                # Если в A ничего нет — строка не содержит данных
+                if cell_a is None:
+                    continue
 
-        row_index = 0
+                yield row_index, values
+        finally:
+            wb.close()
 
-        for row in ws.iter_rows():
-            row_index += 1
+    @classmethod
+    def row_identity(cls, values: Tuple[Any, ...]) -> Tuple[str, str]:
+        """
+        Ключ строки и хэш её содержимого для инкрементального импорта.
 
-            # Ожидаем, что первая строка может быть заголовком — пропускаем её,
-            # если в A не число.
-            cell_a = row[0].value
-            if row_index == 1:
-                if not isinstance(cell_a, (int, float)) and not (isinstance(cell_a, str) and cell_a.strip().isdigit()):
-                    continue  # считаем, что это заголовок
+        Ключ — нормализованное ФИО (как identity_key), хэш — SHA-1 значений
+        B–K без лишних пробелов. Порядковый номер в A не учитывается, чтобы
+        перенумерация листа не делала строки изменёнными.
+        """
+        full_name = str(values[1] or "").strip() if len(values) > 1 else ""
+        name, patronymic, surname = cls._split_fio(full_name)
+        key = FioIdentityIndex.key(surname, name, patronymic) if name and surname else ""
+
+        normalized = []
+        for value in values[1:11]:
+            if value is None:
+                normalized.append("")
+            elif isinstance(value, str):
+                normalized.append(" ".join(value.split()))
+            else:
+                normalized.append(str(value))
+        content_hash = hashlib.sha1("\x1f".join(normalized).encode("utf-8")).hexdigest()
+        return key, content_hash
+
+    def parse_row(
+        self, values: Tuple[Any, ...], dates: Optional[ParsedDates] = None
+    ) -> Tuple[Priest, List[str], Dict]:
+        """
+        Разбор одной строки A–K (без обращения к базе данных).
 
-            # Если в A ничего нет — считаем, что данных дальше нет
-            if cell_a is None:
-                continue
+        dates — результат parse_date_columns для этой строки; если не
+        передан, колонки E и F разбираются здесь же.
+        Возвращает (priest, ошибки проверки, данные для отчёта об ошибке).
+        При неразборчивом ФИО выбрасывает ValueError.
+        """
+        def cell(index: int) -> Any:
+            return values[index] if len(values) > index else None
 
-            excel_row_number = row_index
+        # B – ФИО
+        full_name = str(cell(1) or "").strip()
+        name, patronymic, surname = self._split_fio(full_name)
 
-            try:
-                # B – ФИО
-                full_name = str(row[1].value or "").strip()
-                name, patronymic, surname = self._split_fio(full_name)
-
-                if not name or not surname:
-                    raise ValueError("Не удалось разобрать ФИО")
-
-                # C – сан
-                raw_status = str(row[2].value or "").strip()
-                status = self._map_status(raw_status)
-                normalized_status = utils.validate_status(status) or status
-
-                # D – национальность
-                raw_nat = str(row[3].value or "").strip()
-                nationality = self._map_nationality(raw_nat)
-
-                # E – рождение + тезоименитство
-                raw_birth = row[4].value
-                birth_info = self._parse_birth_and_name_day(str(raw_birth) if raw_birth is not None else "")
-
-                # F – рукоположения
-                raw_ord = row[5].value
-                ord_info = self._parse_ordinations(str(raw_ord) if raw_ord is not None else "")
-
-                # G – место рождения
-                birth_place = str(row[6].value or "").strip()
-
-                # H – духовное образование
-                spiritual_education = str(row[7].value or "").strip()
-
-                # I – светское образование
-                secular_education = str(row[8].value or "").strip()
-
-                # J – место служения
-                service_place = str(row[9].value or "").strip()
-
-                # K – текущая награда
-                last_reward = str(row[10].value or "").strip() if len(row) > 10 else ""
-
-                priest = Priest(
-                    name=name,
-                    patronymic=patronymic,
-                    surname=surname,
-                    birth_date=birth_info.birth_date,
-                    birth_place=birth_place,
-                    nationality=nationality,
-                    status=normalized_status,
-                    name_day=birth_info.name_day,
-                    deacon_ordination_date=ord_info.deacon_ordination_date,
-                    priest_ordination_date=ord_info.priest_ordination_date,
-                    service_place=service_place,
-                    education=spiritual_education,
-                    secular_education=secular_education,
-                    last_reward=last_reward,
-                )
+        if not name or not surname:
+            raise ValueError("Не удалось разобрать ФИО")
 
-                # Проверка обязательных полей
-                validation_errors: List[str] = []
-                if not priest.name:
-                    validation_errors.append("Отсутствует имя")
-                if not priest.surname:
-                    validation_errors.append("Отсутствует фамилия")
-                if not priest.status:
-                    validation_errors.append("Отсутствует статус")
-
-                if validation_errors:
-                    self.errors.append(
-                        {
-                            "row": excel_row_number,
-                            "errors": validation_errors,
-                            "data": {
-                                "full_name": full_name,
-                                "status": raw_status,
-                                "nationality": raw_nat,
-                            },
-                        }
-                    )
-                    continue
+        # C – сан
+        raw_status = str(cell(2) or "").strip()
+        status = self._map_status(raw_status)
+        normalized_status = utils.validate_status(status) or status
 
-                # Дубликаты / обновление
-                existing = self.db.search_priests(f"{priest.name} {priest.surname}")
-                exact_match = None
-                for p in existing:
-                    # сравниваем также отчество, если есть
-                    if (
-                        p.name.lower() == priest.name.lower()
-                        and p.surname.lower() == priest.surname.lower()
-                        and (p.patronymic or "").lower() == (priest.patronymic or "").lower()
-                    ):
-                        exact_match = p
-                        break
-
-                if exact_match and not update_existing:
-                    self.errors.append(
-                        {
-                            "row": excel_row_number,
-                            "errors": [
-                                f"Священник {priest.surname} {priest.name} {priest.patronymic} уже существует"
-                            ],
-                            "data": {"full_name": full_name},
-                        }
-                    )
-                    continue
+        # D – национальность
+        raw_nat = str(cell(3) or "").strip()
+        nationality = self._map_nationality(raw_nat)
 
-                # Сохранение
-                if exact_match and update_existing:
-                    priest.id = exact_match.id
-                    self.db.update_priest(priest)
-                else:
-                    self.db.add_priest(priest)
+        if dates is not None:
+            birth_info = ord_info = dates
+        else:
+            # E – рождение + тезоименитство
+            raw_birth = cell(4)
+            birth_info = self._parse_birth_and_name_day(str(raw_birth) if raw_birth is not None else "")
+
+            # F – рукоположения
+            raw_ord = cell(5)
+            ord_info = self._parse_ordinations(str(raw_ord) if raw_ord is not None else "")
+
+        priest = Priest(
+            name=name,
+            patronymic=patronymic,
+            surname=surname,
+            birth_date=birth_info.birth_date,
+            # G – место рождения
+            birth_place=str(cell(6) or "").strip(),
+            nationality=nationality,
+            status=normalized_status,
+            name_day=birth_info.name_day,
+            deacon_ordination_date=ord_info.deacon_ordination_date,
+            priest_ordination_date=ord_info.priest_ordination_date,
+            # J – место служения
+            service_place=str(cell(9) or "").strip(),
+            # H – духовное образование
+            education=str(cell(7) or "").strip(),
+            # I – светское образование
+            secular_education=str(cell(8) or "").strip(),
+            # K – текущая награда
+            last_reward=str(cell(10) or "").strip(),
+        )
 
-                self.success_count += 1
+        # Проверка обязательных полей
+        validation_errors: List[str] = []
+        if not priest.name:
+            validation_errors.append("Отсутствует имя")
+        if not priest.surname:
+            validation_errors.append("Отсутствует фамилия")
+        if not priest.status:
+            validation_errors.append("Отсутствует статус")
+
+        data = {
+            "full_name": full_name,
+            "status": raw_status,
+            "nationality": raw_nat,
+        }
+        return priest, validation_errors, data
 
+    def parse_rows(
+        self, rows: Iterable[Tuple[int, Tuple[Any, ...]]]
+    ) -> Tuple[List[Tuple[int, Priest, Dict]], List[Dict]]:
+        """
+        Разбор набора строк: (корректные записи, ошибки).
+
+        Не обращается к базе данных, поэтому может выполняться в отдельном
+        процессе (см. import_pipeline).
+        """
+        rows = list(rows)
+        # Даты из E и F разбираются по столбцам, цикл ниже только собирает Priest
+        dates = self.parse_date_columns(
+            (values[4] if len(values) > 4 else None for _, values in rows),
+            (values[5] if len(values) > 5 else None for _, values in rows),
+        )
+
+        parsed: List[Tuple[int, Priest, Dict]] = []
+        errors: List[Dict] = []
+        for (excel_row_number, values), row_dates in zip(rows, dates):
+            try:
+                priest, validation_errors, data = self.parse_row(values, row_dates)
             except Exception as e:
                 logger.error(f"Ошибка при обработке строки {excel_row_number}: {e}")
-                self.errors.append(
+                errors.append(
                     {
                         "row": excel_row_number,
                         "errors": [str(e)],
                         "data": {
-                            "raw_row": [cell.value for cell in row],
+                            "raw_row": list(values),
                         },
                     }
                 )
+                continue
 
-        self.total_count = row_index
+            if validation_errors:
+                errors.append(
+                    {
+                        "row": excel_row_number,
+                        "errors": validation_errors,
+                        "data": data,
+                    }
+                )
+                continue
 
+            parsed.append((excel_row_number, priest, {"full_name": data["full_name"]}))
+        return parsed, errors
+
+    def save_parsed(self, parsed: List[Tuple[int, Priest, Dict]], update_existing: bool = False) -> None:
+        """
+        Запись разобранных строк: проверка дубликатов по индексу ФИО и
+        bulk_upsert одним пакетом. Результаты добавляются в success_count/errors.
+        """
+        # Существующие ФИО загружаются один раз, дальше проверка — поиск в словаре
+        if self.identity_index is None:
+            self.identity_index = FioIdentityIndex.load(self.db)
+        identity_index = self.identity_index
+
+        # При повторе ФИО в файле действует первая строка
+        parsed, duplicates = split_duplicates(parsed)
+        for excel_row_number, priest, data, first_row in duplicates:
+            self.errors.append(duplicate_error(excel_row_number, priest, first_row, data))
+
+        pending: List[Tuple[int, Priest, Dict]] = []
+        for excel_row_number, priest, data in parsed:
+            # Проверка дубликатов по ФИО (имя+фамилия+отчество)
+            match = identity_index.match_priest(priest)
+            if match.kind == MATCH_AMBIGUOUS:
+                # Тёзки: какую из записей обновлять, неизвестно
+                self.errors.append(ambiguous_error(excel_row_number, priest, match, data))
+                continue
+            if match.priest_id and not update_existing:
+                self.errors.append(
+                    {
+                        "row": excel_row_number,
+                        "errors": [
+                            f"Священник {priest.surname} {priest.name} {priest.patronymic} уже существует"
+                        ],
+                        "data": data,
+                    }
+                )
+                continue
+            pending.append((excel_row_number, priest, data))
+
+        # Повторы внутри пакета отсеивает bulk_upsert (по нормализованному ФИО)
+        self._save_pending(pending, update_existing, identity_index)
+
+    def diff_file(self, file_path: str, replace: bool = False) -> ImportDiff:
+        """
+        Пробный прогон: сравнение файла с текущей базой без записи.
+
+        Содержимое базы читается одним запросом; результат описывает
+        состояние после импорта с обновлением существующих записей, а при
+        replace — после очистки таблицы и импорта в пустую базу.
+        """
+        rows = list(self.read_rows(file_path))
+        parsed, errors = self.parse_rows(rows)
+        if not replace:
+            # Неоднозначные совпадения при импорте пропускаются — и в отчёте тоже
+            identity_index = self.identity_index or FioIdentityIndex.load(self.db)
+            unambiguous = []
+            for row_number, priest, data in parsed:
+                match = identity_index.match_priest(priest)
+                if match.kind == MATCH_AMBIGUOUS:
+                    errors.append(ambiguous_error(row_number, priest, match, data))
+                else:
+                    unambiguous.append((row_number, priest, data))
+            parsed = unambiguous
+        return ImportDiff.compute(
+            os.path.basename(file_path), parsed, self.db.get_all_priests(), errors, replace=replace
+        )
+
+    def sync_parsed(
+        self,
+        source: str,
+        parsed: List[Tuple[int, Priest, Dict]],
+        identities: Dict[int, Tuple[str, str]],
+        delete_missing: bool = False,
+    ) -> Dict[str, int]:
+        """
+        Инкрементальная запись разобранных строк файла source.
+
+        identities — номер строки -> (ключ, хэш) из row_identity для всех
+        строк файла, включая строки с ошибками. В базу пишутся только
+        новые строки и строки, хэш которых изменился с прошлого импорта.
+        Записи, чьи строки исчезли из файла, удаляются при delete_missing.
+        Возвращает счётчики unchanged/updated/inserted/removed.
+        """
+        if self.identity_index is None:
+            self.identity_index = FioIdentityIndex.load(self.db)
+        identity_index = self.identity_index
+        state = self.db.get_import_state(source)
+
+        # При повторе ФИО в файле действует первая строка (как в save_parsed)
+        parsed, duplicates = split_duplicates(parsed)
+        for excel_row_number, priest, data, first_row in duplicates:
+            self.errors.append(duplicate_error(excel_row_number, priest, first_row, data))
+
+        # Строки без сохранённого состояния (первый инкрементальный импорт
+        # файла) сравниваются с записями базы: совпадающие не переписываются
+        existing: Optional[Dict[int, Priest]] = None
+        if any(identities[row_number][0] not in state for row_number, _, _ in parsed):
+            existing = {priest.id: priest for priest in self.db.get_all_priests()}
+
+        counts = {"unchanged": 0, "updated": 0, "inserted": 0, "removed": 0}
+        changed: List[Tuple[int, Priest, Dict]] = []
+        entries: List[Tuple[str, str, Optional[int]]] = []
+        for excel_row_number, priest, data in parsed:
+            row_key, content_hash = identities[excel_row_number]
+            match = identity_index.match_priest(priest)
+            if match.kind == MATCH_AMBIGUOUS:
+                self.errors.append(ambiguous_error(excel_row_number, priest, match, data))
+                continue
+            existing_id = match.priest_id
+            previous = state.get(row_key)
+            # Строка не изменилась, и запись, созданная из неё, всё ещё в базе
+            if previous is not None and previous[0] == content_hash and existing_id == previous[1]:
+                counts["unchanged"] += 1
+                continue
+            if previous is None and existing is not None:
+                current = existing.get(existing_id) if existing_id else None
+                if current is not None and not field_changes(current, priest):
+                    counts["unchanged"] += 1
+                    entries.append((row_key, content_hash, existing_id))
+                    continue
+            changed.append((excel_row_number, priest, data))
+
+        outcomes: List[str] = []
+        if changed:
+            try:
+                outcomes = self.db.bulk_upsert([priest for _, priest, _ in changed], update_existing=True)
+            except Exception as e:
+                logger.exception("Ошибка при записи в БД: %s", e)
+                for row_number, _, data in changed:
+                    self.errors.append({"row": row_number, "errors": [f"Ошибка БД: {e}"], "data": data})
+                return counts
+
+        for (excel_row_number, priest, _), outcome in zip(changed, outcomes):
+            identity_index.add(priest)
+            self.success_count += 1
+            counts["inserted" if outcome == Database.UPSERT_INSERTED else "updated"] += 1
+            row_key, content_hash = identities[excel_row_number]
+            entries.append((row_key, content_hash, priest.id))
+
+        # Строки с ошибками разбора не считаются исчезнувшими
+        present_keys = {row_key for row_key, _ in identities.values() if row_key}
+        removed_keys: List[str] = []
+        if delete_missing:
+            removed_keys = [row_key for row_key in state if row_key not in present_keys]
+            removed_ids = [state[row_key][1] for row_key in removed_keys if state[row_key][1]]
+            counts["removed"] = self.db.delete_priests(removed_ids)
+            if removed_ids:
+                # Удалённые ФИО могут снова появиться в следующем файле
+                self.identity_index = None
+        self.db.save_import_state(source, entries, removed_keys)
+        return counts
+
+    def import_from_file(
+        self,
+        file_path: str,
+        update_existing: bool = False,
+        incremental: bool = False,
+        delete_missing: bool = False,
+    ) -> Dict:
+        """
+        Импорт из Excel файла формата A–K.
+
+        Args:
+            file_path: путь к Excel файлу
+            update_existing: обновлять существующие записи (по ФИО)
+            incremental: записывать только новые и изменившиеся с прошлого
+                импорта строки (существующие записи при этом обновляются)
+            delete_missing: при incremental удалять записи, строки которых
+                исчезли из файла
+        """
+        self.errors = []
+        self.success_count = 0
+        self.total_count = 0
+
+        rows = list(self.read_rows(file_path))
+        # Номер последней строки с данными (как и раньше, включая заголовок)
+        self.total_count = rows[-1][0] if rows else 0
+
+        parsed, errors = self.parse_rows(rows)
+        self.errors.extend(errors)
+        counts = None
+        if incremental:
+            identities = {row_number: self.row_identity(values) for row_number, values in rows}
+            counts = self.sync_parsed(os.path.basename(file_path), parsed, identities, delete_missing)
+        else:
+            self.save_parsed(parsed, update_existing)
+
+        self.errors.sort(key=lambda error: error["row"])
         result = {
             "total": self.total_count,
             "success": self.success_count,
             "errors": len(self.errors),
             "error_details": self.errors,
         }
+        if counts is not None:
+            result.update(counts)
 
         logger.info(
             f"Legacy-импорт завершен. Успешно: {self.success_count}, Ошибок: {len(self.errors)}"
         )
         return result
 
+    def _save_pending(
+        self,
+        pending: List[Tuple[int, Priest, Dict]],
+        update_existing: bool,
+        identity_index: FioIdentityIndex,
+    ) -> None:
+        """Запись накопленных строк через Database.bulk_upsert с учётом результатов."""
+        if not pending:
+            return
+        try:
+            outcomes = self.db.bulk_upsert(
+                [priest for _, priest, _ in pending],
+                update_existing=update_existing,
+            )
+        except Exception as e:
+            logger.exception("Ошибка при записи в БД: %s", e)
+            for row_number, _, data in pending:
+                self.errors.append(
+                    {
+                        "row": row_number,
+                        "errors": [f"Ошибка БД: {e}"],
+                        "data": data,
+                    }
+                )
+            return
+
+        for (row_number, priest, data), outcome in zip(pending, outcomes):
+            if outcome == Database.UPSERT_SKIPPED:
+                self.errors.append(
+                    {
+                        "row": row_number,
+                        "errors": [
+                            f"Священник {priest.surname} {priest.name} {priest.patronymic} уже существует"
+                        ],
+                        "data": data,
+                    }
+                )
+            else:
+                identity_index.add(priest)
+                self.success_count += 1
+
     def get_error_report(self) -> str:
         """Формирование текстового отчета об ошибках."""
         if not self.errors:
@@ -3,7 +3,7 @@
 """
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Optional
+from typing import NamedTuple, Optional
 
 
 @dataclass
@@ -30,6 +30,8 @@ class Priest:
     phone: str = ""  # Номер телефона
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    # Растёт при каждом изменении записи (ключ кэша готовых карточек)
+    row_version: int = 0
 
     def to_dict(self) -> dict:
         """Преобразование в словарь"""
@@ -107,3 +109,13 @@ class Priest:
             lines.append(f"<b>📞 Телефон:</b> {self.phone}")
         
         return "\n".join(lines)
+
+
+class PriestSummary(NamedTuple):
+    """Краткая запись о священнике для списков (без дат и остальных полей)"""
+    id: int
+    name: str
+    patronymic: str
+    surname: str
+    status: str
+    service_place: str
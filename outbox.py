@@ -0,0 +1,284 @@
+"""
+Очередь исходящих сообщений с ограничением скорости.
+
+Все многочастные ответы (отчёты «Именинники», /list, /status, ежедневная
+рассылка) отправляются через Outbox, а не циклом из await send_message:
+
+- у каждого чата своя очередь и свой обработчик: части одного ответа
+  уходят строго по порядку, разные чаты обслуживаются параллельно;
+- скорость ограничена двумя «ведрами токенов» — на чат
+  (OUTBOX_CHAT_RATE) и на всего бота (OUTBOX_GLOBAL_RATE), чтобы не
+  упираться во flood control Telegram;
+- при RetryAfter очередь чата и общее ведро бота приостанавливаются на
+  указанное время и сообщение отправляется повторно, сетевые ошибки
+  повторяются с нарастающей паузой; TimedOut не повторяется — запрос мог
+  дойти до Telegram, и повтор продублировал бы часть ответа;
+- части ответа ставятся в очередь одним пакетом; обработчик бота не ждёт
+  их доставки (если не нужен результат) и сразу освобождается.
+
+stats() возвращает глубину очередей и задержку отправки (от постановки в
+очередь до ответа Telegram).
+"""
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence
+
+from telegram import Bot
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+import config
+
+logger = logging.getLogger(__name__)
+
+Request = Callable[[], Awaitable[Any]]
+
+
+class TokenBucket:
+    """Не более rate операций в секунду в среднем, с запасом capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать до следующего токена (0 — можно сейчас)"""
+        self._refill(now)
+        wait = self._paused_until - now
+        if self._tokens < 1:
+            wait = max(wait, (1 - self._tokens) / self.rate)
+        return max(wait, 0.0)
+
+    def consume(self) -> None:
+        self._tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Приостановка (после RetryAfter) и сброс накопленного запаса"""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._refill(now)
+        self._tokens = min(self._tokens, 1)
+
+    @property
+    def idle(self) -> bool:
+        """Запас восстановлен полностью — состояние можно не хранить"""
+        now = time.monotonic()
+        self._refill(now)
+        return self._tokens >= self.capacity and self._paused_until <= now
+
+
+class _Batch:
+    """Запросы одного ответа: результат — список ответов Telegram"""
+
+    def __init__(self, size: int):
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.results: List[Any] = []
+        self.remaining = size
+
+    def done(self, result: Any) -> None:
+        self.results.append(result)
+        self.remaining -= 1
+        if self.remaining == 0 and not self.future.done():
+            self.future.set_result(self.results)
+
+    def fail(self, error: BaseException) -> None:
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class _ChatQueue:
+    def __init__(self):
+        self.items: Deque[tuple] = deque()  # (запрос, пакет, время постановки)
+        self.bucket = TokenBucket(config.OUTBOX_CHAT_RATE, config.OUTBOX_CHAT_BURST)
+        self.worker: Optional[asyncio.Task] = None
+
+
+class Outbox:
+    """Очереди исходящих сообщений по чатам с общим ограничением скорости"""
+
+    # Сколько последних отправок учитывать в статистике задержек
+    LATENCY_WINDOW = 1000
+    # Сколько чатов хранить без очистки простаивающих
+    MAX_IDLE_CHATS = 256
+
+    def __init__(self):
+        self._chats: Dict[int, _ChatQueue] = {}
+        self._global = TokenBucket(config.OUTBOX_GLOBAL_RATE, config.OUTBOX_GLOBAL_BURST)
+        self._depth = 0
+        self.peak_depth = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.flood_waits = 0
+        self._latencies: Deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+
+    def submit(self, chat_id: int, requests: Sequence[Request]) -> asyncio.Future:
+        """
+        Постановка запросов (функций без аргументов, возвращающих корутину
+        вызова Bot API) в очередь чата одним пакетом.
+
+        Возвращает future со списком ответов. При ошибке оставшиеся
+        запросы пакета не выполняются, а future завершается исключением;
+        если его никто не ждёт, ошибка записывается в журнал.
+        """
+        batch = _Batch(len(requests))
+        batch.future.add_done_callback(functools.partial(self._log_failure, chat_id))
+        if not requests:
+            batch.future.set_result([])
+            return batch.future
+
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            if len(self._chats) >= self.MAX_IDLE_CHATS:
+                self._prune()
+            chat = self._chats[chat_id] = _ChatQueue()
+        enqueued_at = time.monotonic()
+        for request in requests:
+            chat.items.append((request, batch, enqueued_at))
+        self._depth += len(requests)
+        self.peak_depth = max(self.peak_depth, self._depth)
+        if chat.worker is None or chat.worker.done():
+            chat.worker = asyncio.create_task(self._run(chat))
+        return batch.future
+
+    def send_parts(
+        self,
+        bot: Bot,
+        chat_id: int,
+        parts: Sequence[str],
+        first: Optional[Callable[..., Awaitable[Any]]] = None,
+        reply_markup: Any = None,
+        parse_mode: Optional[str] = "HTML",
+    ) -> asyncio.Future:
+        """
+        Отправка частей сообщения (после split_message) одним пакетом.
+
+        first — чем отправить первую часть вместо bot.send_message
+        (например, query.edit_message_text или message.reply_text);
+        reply_markup прикрепляется к первой части.
+        """
+        requests: List[Request] = []
+        for index, part in enumerate(parts):
+            markup = {"reply_markup": reply_markup} if index == 0 and reply_markup is not None else {}
+            if index == 0 and first is not None:
+                requests.append(functools.partial(first, part, parse_mode=parse_mode, **markup))
+            else:
+                requests.append(functools.partial(
+                    bot.send_message, chat_id=chat_id, text=part, parse_mode=parse_mode, **markup
+                ))
+        return self.submit(chat_id, requests)
+
+    async def _acquire(self, bucket: TokenBucket) -> None:
+        """Ожидание токена сразу в ведре чата и в общем ведре"""
+        while True:
+            now = time.monotonic()
+            wait = max(bucket.delay(now), self._global.delay(now))
+            if wait <= 0:
+                bucket.consume()
+                self._global.consume()
+                return
+            await asyncio.sleep(wait)
+
+    async def _perform(self, chat: _ChatQueue, request: Request) -> Any:
+        """Один запрос с повторами при flood control и сетевых ошибках"""
+        for attempt in range(config.OUTBOX_MAX_RETRIES + 1):
+            await self._acquire(chat.bucket)
+            try:
+                return await request()
+            except RetryAfter as e:
+                if attempt == config.OUTBOX_MAX_RETRIES:
+                    raise
+                self.flood_waits += 1
+                # Лимит Telegram может быть и общим на бота: паузу выдерживают все чаты
+                chat.bucket.pause(float(e.retry_after))
+                self._global.pause(float(e.retry_after))
+                logger.warning("Flood control: пауза %s с перед повтором", e.retry_after)
+            except BadRequest:
+                # Подкласс NetworkError, но повтор не поможет
+                raise
+            except TimedOut:
+                # Подкласс NetworkError; сообщение могло быть доставлено — повтор дал бы дубль
+                raise
+            except NetworkError as e:
+                if attempt == config.OUTBOX_MAX_RETRIES:
+                    raise
+                delay = config.OUTBOX_RETRY_DELAY * 2 ** attempt
+                logger.warning("Ошибка сети при отправке (%s), повтор через %.1f с", e, delay)
+                await asyncio.sleep(delay)
+            self.retries += 1
+
+    async def _run(self, chat: _ChatQueue) -> None:
+        """Обработчик очереди одного чата: работает, пока очередь не пуста"""
+        while chat.items:
+            request, batch, enqueued_at = chat.items.popleft()
+            self._depth -= 1
+            if batch.future.done():
+                # Предыдущий запрос пакета завершился ошибкой
+                continue
+            try:
+                result = await self._perform(chat, request)
+            except Exception as e:
+                self.failed += 1
+                batch.fail(e)
+            else:
+                self.sent += 1
+                self._latencies.append(time.monotonic() - enqueued_at)
+                batch.done(result)
+
+    def _prune(self) -> None:
+        """Удаление простаивающих чатов с полностью восстановленным запасом"""
+        for chat_id in [
+            chat_id for chat_id, chat in self._chats.items()
+            if not chat.items and (chat.worker is None or chat.worker.done()) and chat.bucket.idle
+        ]:
+            del self._chats[chat_id]
+
+    @staticmethod
+    def _log_failure(chat_id: int, future: asyncio.Future) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error("Не удалось отправить сообщение в чат %s: %s", chat_id, error)
+
+    async def drain(self, timeout: float) -> bool:
+        """Ожидание отправки уже поставленных сообщений (при остановке бота)"""
+        workers = [chat.worker for chat in self._chats.values() if chat.worker and not chat.worker.done()]
+        if not workers:
+            return True
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        return not pending
+
+    def stats(self) -> Dict[str, Any]:
+        """Глубина очередей, число отправок и задержка (от постановки до ответа), мс"""
+        latencies = sorted(self._latencies)
+
+        def percentile(fraction: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 1)
+
+        return {
+            "queue_depth": self._depth,
+            "peak_queue_depth": self.peak_depth,
+            "chats": len(self._chats),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "flood_waits": self.flood_waits,
+            "latency_avg_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+            "latency_max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        }
@@ -0,0 +1,61 @@
+"""
+Сопоставление записей kliriki.xlsx со священниками из базы по ФИО (hash join)
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from identity_index import MATCH_AMBIGUOUS, MATCH_NONE, FioIdentityIndex, IdentityMatch
+from models import Priest
+
+
+class PhoneUpdatePlan(NamedTuple):
+    """Итог сопоставления файла с базой"""
+    new_phones: Dict[int, str]  # id -> новый телефон (только изменившиеся)
+    matched: int
+    ambiguous: List[Tuple[dict, Tuple[int, ...]]]
+    not_matched: List[dict]
+
+
+class PhoneMatcher:
+    """
+    Сопоставление записей kliriki с базой через FioIdentityIndex — тот же
+    индекс и те же правила неоднозначности, что у Excel-импортёров.
+
+    В отличие от импорта строк, совпадение по фамилии и имени принимается
+    и при другом отчестве: в kliriki отчество часто записано иначе
+    («Валериевич»/«Валерьевич»), а телефон не создаёт новых записей.
+    Неоднозначные совпадения (тёзки) не применяются.
+    """
+
+    def __init__(self, priests: Iterable[Priest], index: Optional[FioIdentityIndex] = None):
+        priests = list(priests)
+        self._phones: Dict[int, str] = {priest.id: priest.phone or "" for priest in priests}
+        self._index = index or FioIdentityIndex.from_priests(priests)
+
+    def match(self, surname: str, name: str, patronymic: str) -> IdentityMatch:
+        """Поиск записи для ФИО из файла"""
+        return self._index.match(surname, name, patronymic)
+
+    def plan(self, entries: Iterable[dict]) -> PhoneUpdatePlan:
+        """
+        Сопоставление всех записей kliriki (словари KlirikiParser) с базой.
+
+        В new_phones попадают только однозначные совпадения с непустым
+        телефоном, отличающимся от текущего.
+        """
+        new_phones: Dict[int, str] = {}
+        matched = 0
+        ambiguous = []
+        not_matched = []
+        for entry in entries:
+            match = self.match(entry["surname"], entry["name"], entry["patronymic"])
+            if match.kind == MATCH_NONE:
+                not_matched.append(entry)
+                continue
+            if match.kind == MATCH_AMBIGUOUS:
+                ambiguous.append((entry, match.priest_ids))
+                continue
+
+            matched += 1
+            if entry["phone"] and entry["phone"] != self._phones.get(match.priest_id):
+                new_phones[match.priest_id] = entry["phone"]
+        return PhoneUpdatePlan(new_phones, matched, ambiguous, not_matched)
@@ -0,0 +1,108 @@
+"""
+Кэш результатов частых запросов (карточка по id, поиск по ФИО, выборка по статусу)
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class QueryCache:
+    """
+    Ограниченный LRU-кэш с временем жизни записей и поколением данных.
+
+    Каждая запись помнит поколение — значение счётчика table_versions, при
+    котором она была прочитана. Любая запись в таблицу priests (из бота,
+    скриптов импорта или другого процесса) увеличивает счётчик, и записи
+    старого поколения перестают выдаваться. TTL дополнительно ограничивает
+    срок жизни, а maxsize — число записей (вытесняются давно не
+    использованные).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0  # промахи из-за смены поколения или истёкшего TTL
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get_or_load(self, key: Hashable, generation: int, loader: Callable[[], Any]) -> Any:
+        """
+        Значение из кэша или результат loader() (он и сохраняется).
+
+        Возвращается копия списка вместе с его элементами (поля Priest
+        неизменяемы — строки, даты, числа), чтобы вызывающий код мог менять
+        и список, и сами записи (например, перед update_priest), не портя кэш.
+        """
+        if not self.enabled:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_generation, expires_at, value = entry
+                if entry_generation == generation and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._copy(value)
+                del self._entries[key]
+                self.stale += 1
+            self.misses += 1
+
+        value = loader()
+
+        with self._lock:
+            self._entries[key] = (generation, now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return self._copy(value)
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        if isinstance(value, list):
+            return [copy.copy(item) for item in value]
+        return copy.copy(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер кэша и доля попаданий"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Кэши общие для всего процесса: один кэш на файл базы данных
+_caches: Dict[str, QueryCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_query_cache(db_path: str, maxsize: int, ttl: float) -> QueryCache:
+    """Получение (или создание) кэша для указанной базы данных"""
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = QueryCache(maxsize, ttl)
+            _caches[db_path] = cache
+        return cache
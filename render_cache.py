@@ -0,0 +1,111 @@
+"""
+Кэш готовых HTML-сообщений: карточки священников и страницы списка /list
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import config
+from models import Priest
+
+
+class RenderCache:
+    """
+    LRU-кэш строк с ограничением по занимаемой памяти.
+
+    Значение — строка или кортеж строк (части сообщения после
+    split_message). Размер считается через sys.getsizeof; когда сумма
+    превышает max_bytes, вытесняются давно не использованные записи.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(value: Any) -> int:
+        if isinstance(value, tuple):
+            return sys.getsizeof(value) + sum(sys.getsizeof(part) for part in value)
+        return sys.getsizeof(value)
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Any]) -> Any:
+        """Готовое значение из кэша или результат render() (он и сохраняется)"""
+        if self.max_bytes <= 0:
+            return render()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = render()
+        size = self._size(value)
+        if size > self.max_bytes:
+            return value
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Число записей, занятая память и доля попаданий"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Один кэш на процесс бота: карточки и страницы делят общий лимит памяти
+_cache = RenderCache(config.RENDER_CACHE_MAX_BYTES)
+
+
+def render_card(priest: Priest) -> str:
+    """
+    HTML-карточка священника (Priest.format_message) с кэшированием.
+
+    Ключ — (id, row_version): любое изменение записи через бота или импорт
+    увеличивает row_version, и карточка строится заново (updated_at для
+    этого не годится — он не различает изменения в одну секунду). Записи,
+    прочитанные не из базы (без id или updated_at), не кэшируются.
+    """
+    if priest.id is None or priest.updated_at is None:
+        return priest.format_message()
+    return _cache.get_or_render(("card", priest.id, priest.row_version), priest.format_message)
+
+
+def render_page(key: Hashable, render: Callable[[], Tuple[str, ...]]) -> Tuple[str, ...]:
+    """Части сообщения страницы списка (после split_message) с кэшированием"""
+    return _cache.get_or_render(("page", key), render)
+
+
+def stats() -> Dict[str, Any]:
+    return _cache.stats()
@@ -5,11 +5,18 @@
 Важно: этот скрипт УДАЛЯЕТ все записи из таблицы priests,
 а затем импортирует данные заново.
 
+С флагом --incremental таблица не очищается: в базу записываются только
+новые и изменившиеся с прошлого импорта строки, а записи, строки которых
+исчезли из файла, удаляются.
+
 Запускать ИЗ КОРНЯ проекта:
 
     cd /Users/valentin/Cancellary_Bot
     source venv/bin/activate
     python3 reset_and_import_legacy.py
+    python3 reset_and_import_legacy.py --incremental
+    python3 reset_and_import_legacy.py --dry-run --report diff.xlsx   # только отчёт, без записи
+    python3 reset_and_import_legacy.py --incremental --dry-run       # отчёт для режима --incremental
 
 Ожидаемый файл по умолчанию:
 
@@ -29,8 +36,10 @@
 - K: текущая награда
 """
 
+import argparse
 import os
 from collections import Counter
+from typing import Optional
 
 from database import Database
 from legacy_excel_importer import LegacyExcelImporter
@@ -45,12 +54,14 @@ def reset_priests_table() -> None:
     conn = db.get_connection()
     cur = conn.cursor()
     cur.execute("DELETE FROM priests")
+    # Состояние инкрементального импорта относится к удалённым записям
+    cur.execute("DELETE FROM import_state")
     conn.commit()
     conn.close()
     print("✅ Все записи из таблицы priests удалены.\n")
 
 
-def import_from_excel(file_path: str) -> None:
+def import_from_excel(file_path: str, incremental: bool = False) -> None:
     """Импортирует данные из Excel и выводит статистику."""
     print("=== ИМПОРТ ИЗ EXCEL (формат A–K) ===")
     print(f"Путь к файлу: {os.path.abspath(file_path)}")
@@ -60,11 +71,16 @@ def import_from_excel(file_path: str) -> None:
         return
 
     importer = LegacyExcelImporter()
-    result = importer.import_from_file(file_path)
+    result = importer.import_from_file(file_path, incremental=incremental, delete_missing=incremental)
 
     print("\n--- РЕЗУЛЬТАТ ИМПОРТА ---")
     print(f"Всего строк в файле: {result['total']}")
     print(f"Успешно импортировано: {result['success']}")
+    if incremental:
+        print(f"Без изменений: {result['unchanged']}")
+        print(f"Обновлено: {result['updated']}")
+        print(f"Добавлено: {result['inserted']}")
+        print(f"Удалено: {result['removed']}")
     print(f"Ошибок: {result['errors']}")
 
     if result["errors"] > 0:
@@ -72,6 +88,35 @@ def import_from_excel(file_path: str) -> None:
         print(importer.get_error_report())
 
 
+def dry_run(file_path: str, report_path: Optional[str] = None, incremental: bool = False) -> None:
+    """
+    Печатает, что изменит импорт в выбранном режиме, ничего не записывая в
+    базу. Без incremental таблица очищается: все записи базы будут удалены,
+    все строки файла добавлены заново.
+    """
+    mode = "инкрементальный" if incremental else "с очисткой таблицы"
+    print(f"=== ПРОБНЫЙ ИМПОРТ ({mode}, без записи) ===")
+    print(f"Путь к файлу: {os.path.abspath(file_path)}")
+
+    if not os.path.exists(file_path):
+        print("❌ Файл не найден. Убедитесь, что он существует по указанному пути.")
+        return
+
+    try:
+        db = Database(read_only=True)
+    except (FileNotFoundError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return
+
+    diff = LegacyExcelImporter(db).diff_file(file_path, replace=not incremental)
+    print(diff.format_summary())
+    print(f"Сравнение с базой: {diff.elapsed * 1000:.0f} мс")
+
+    if report_path:
+        diff.save(report_path)
+        print(f"📄 Отчёт сохранён: {report_path}")
+
+
 def analyze_database() -> None:
     """Печатает детализированный отчёт по данным в базе."""
     print("\n=== АНАЛИЗ БАЗЫ ДАННЫХ ===")
@@ -140,13 +185,27 @@ def analyze_database() -> None:
 
 
 def main() -> None:
-    file_path = DEFAULT_PATH
+    parser = argparse.ArgumentParser(description="Переимпорт данных из файла формата A–K")
+    parser.add_argument("file", nargs="?", default=DEFAULT_PATH, help="путь к Excel-файлу")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="не очищать таблицу, применить только изменения с прошлого импорта",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="только показать изменения, ничего не записывая")
+    parser.add_argument("--report", help="вместе с --dry-run: сохранить отчёт (.json или .xlsx)")
+    args = parser.parse_args()
+    file_path = args.file
+
+    if args.dry_run:
+        dry_run(file_path, args.report, incremental=args.incremental)
+        return
 
     # 1. Сброс существующих данных
-    reset_priests_table()
+    if not args.incremental:
+        reset_priests_table()
 
     # 2. Импорт из Excel
-    import_from_excel(file_path)
+    import_from_excel(file_path, incremental=args.incremental)
 
     # 3. Анализ результата
     analyze_database()
@@ -0,0 +1,104 @@
+"""
+Быстрое преобразование строк таблицы priests в объекты Priest
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from models import Priest
+
+
+@lru_cache(maxsize=8192)
+def parse_iso_date(value: str) -> date:
+    """Дата из строки YYYY-MM-DD (повторяющиеся строки берутся из кэша)"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        # Нестандартная запись (например, без ведущих нулей)
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+@lru_cache(maxsize=8192)
+def parse_iso_timestamp(value: str) -> datetime:
+    """Дата и время из строки YYYY-MM-DD HH:MM:SS (формат CURRENT_TIMESTAMP)"""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+
+
+def _as_is(value: Any) -> Any:
+    return value
+
+
+def _text(value: Optional[str]) -> str:
+    return value or ""
+
+
+def _date(value: Optional[str]) -> Optional[date]:
+    return parse_iso_date(value) if value else None
+
+
+def _timestamp(value: Optional[str]) -> Optional[datetime]:
+    return parse_iso_timestamp(value) if value else None
+
+
+# Поле Priest -> функция преобразования значения колонки с тем же именем
+_FIELD_CONVERTERS: Tuple[Tuple[str, Callable[[Any], Any]], ...] = (
+    ("id", _as_is),
+    ("name", _as_is),
+    ("patronymic", _text),
+    ("surname", _as_is),
+    ("birth_date", _date),
+    ("birth_place", _text),
+    ("nationality", _text),
+    ("status", _as_is),
+    ("name_day", _text),
+    ("deacon_ordination_date", _date),
+    ("priest_ordination_date", _date),
+    ("ordination_date", _date),
+    ("service_place", _text),
+    ("education", _text),
+    ("secular_education", _text),
+    ("last_reward", _text),
+    ("phone", _text),
+    ("created_at", _timestamp),
+    ("updated_at", _timestamp),
+    ("row_version", _as_is),
+)
+
+
+@lru_cache(maxsize=64)
+def _layout(column_names: Tuple[str, ...]) -> Tuple[Tuple[str, int, Callable[[Any], Any]], ...]:
+    """(поле, индекс колонки, преобразование) для колонок, присутствующих в выборке"""
+    index = {name: i for i, name in enumerate(column_names)}
+    return tuple(
+        (field, index[field], convert)
+        for field, convert in _FIELD_CONVERTERS
+        if field in index
+    )
+
+
+class PriestRowDecoder:
+    """
+    Декодер строк priests.
+
+    Раскладка колонок определяется один раз по cursor.description, далее
+    значения берутся по индексу (без row.keys() и поиска по имени), а
+    даты разбираются через fromisoformat с кэшированием повторов.
+    """
+
+    def __init__(self, description: Sequence[Sequence[Any]]):
+        self._layout = _layout(tuple(column[0] for column in description))
+
+    def decode(self, row: Sequence[Any]) -> Priest:
+        """Преобразование одной строки"""
+        return Priest(**{field: convert(row[i]) for field, i, convert in self._layout})
+
+    def decode_all(self, rows: Sequence[Sequence[Any]]) -> List[Priest]:
+        """Преобразование списка строк"""
+        layout = self._layout
+        return [
+            Priest(**{field: convert(row[i]) for field, i, convert in layout})
+            for row in rows
+        ]
@@ -0,0 +1,508 @@
+"""
+Версионированная схема базы данных.
+
+Текущая версия схемы хранится в PRAGMA user_version. При запуске
+применяются только те миграции, номер которых больше сохранённого.
+"""
+import logging
+import sqlite3
+import threading
+from datetime import date
+from typing import Callable, ContextManager, List, Set, Tuple
+
+import utils
+
+logger = logging.getLogger(__name__)
+
+
+def _migration_1_priests_table(cursor: sqlite3.Cursor) -> None:
+    """Таблица priests и колонки, добавленные до появления версионирования"""
+    # Базовое создание таблицы (при первом запуске)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS priests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            patronymic TEXT,
+            surname TEXT NOT NULL,
+            birth_date DATE,
+            birth_place TEXT,
+            nationality TEXT,
+            status TEXT NOT NULL,
+            name_day TEXT,
+            deacon_ordination_date DATE,
+            priest_ordination_date DATE,
+            ordination_date DATE,
+            service_place TEXT,
+            education TEXT,
+            secular_education TEXT,
+            last_reward TEXT,
+            phone TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Базы, созданные старыми версиями бота, могут не содержать части колонок
+    cursor.execute("PRAGMA table_info(priests)")
+    existing_columns = {row[1] for row in cursor.fetchall()}
+
+    legacy_columns = [
+        ("patronymic", "TEXT"),
+        ("nationality", "TEXT"),
+        ("name_day", "TEXT"),
+        ("deacon_ordination_date", "DATE"),
+        ("priest_ordination_date", "DATE"),
+        ("secular_education", "TEXT"),
+        ("phone", "TEXT"),
+    ]
+
+    for column_name, column_type in legacy_columns:
+        if column_name not in existing_columns:
+            cursor.execute(
+                f"ALTER TABLE priests ADD COLUMN {column_name} {column_type}"
+            )
+
+
+def _migration_2_calendar_index(cursor: sqlite3.Cursor) -> None:
+    """Колонки месяц/день для памятных дат и индексы по ним"""
+    for column_name in (
+        "birth_month",
+        "birth_day",
+        "name_day_month",
+        "name_day_day",
+        "ord_month",
+        "ord_day",
+    ):
+        cursor.execute(f"ALTER TABLE priests ADD COLUMN {column_name} INTEGER")
+
+    cursor.execute("CREATE INDEX idx_priests_birth_md ON priests(birth_month, birth_day)")
+    cursor.execute("CREATE INDEX idx_priests_name_day_md ON priests(name_day_month, name_day_day)")
+    cursor.execute("CREATE INDEX idx_priests_ord_md ON priests(ord_month, ord_day)")
+
+    # Заполнение для уже существующих записей
+    cursor.execute("""
+        SELECT id, birth_date, name_day, deacon_ordination_date, priest_ordination_date
+        FROM priests
+    """)
+    updates = []
+    for priest_id, birth, name_day, deacon, priest in cursor.fetchall():
+        values = utils.calendar_values(
+            date.fromisoformat(birth) if birth else None,
+            name_day,
+            date.fromisoformat(deacon) if deacon else None,
+            date.fromisoformat(priest) if priest else None,
+        )
+        updates.append({**values, "id": priest_id})
+
+    cursor.executemany("""
+        UPDATE priests
+        SET birth_month = :birth_month,
+            birth_day = :birth_day,
+            name_day_month = :name_day_month,
+            name_day_day = :name_day_day,
+            ord_month = :ord_month,
+            ord_day = :ord_day
+        WHERE id = :id
+    """, updates)
+
+
+def _fts5_supported(cursor: sqlite3.Cursor) -> bool:
+    """Проверка, собран ли SQLite с модулем FTS5"""
+    cursor.execute("PRAGMA compile_options")
+    return any(row[0] == "ENABLE_FTS5" for row in cursor.fetchall())
+
+
+def _migration_3_fulltext_search(cursor: sqlite3.Cursor) -> None:
+    """
+    Полнотекстовый индекс priests_fts (FTS5) и триггеры синхронизации.
+
+    Токенизатор unicode61 приводит кириллицу к нижнему регистру;
+    remove_diacritics 2 «ё», «й», «ї» не сводит (это отдельные буквы),
+    поэтому миграция 12 переводит индекс на нормализованный текст. Если
+    SQLite собран без FTS5, миграция ничего не создаёт и поиск работает
+    через LIKE.
+    """
+    if not _fts5_supported(cursor):
+        logger.warning("SQLite собран без FTS5: полнотекстовый поиск недоступен")
+        return
+
+    cursor.execute("""
+        CREATE VIRTUAL TABLE priests_fts USING fts5(
+            name,
+            patronymic,
+            surname,
+            service_place,
+            status,
+            content='priests',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER priests_fts_ai AFTER INSERT ON priests BEGIN
+            INSERT INTO priests_fts(rowid, name, patronymic, surname, service_place, status)
+            VALUES (new.id, new.name, new.patronymic, new.surname, new.service_place, new.status);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER priests_fts_ad AFTER DELETE ON priests BEGIN
+            INSERT INTO priests_fts(priests_fts, rowid, name, patronymic, surname, service_place, status)
+            VALUES ('delete', old.id, old.name, old.patronymic, old.surname, old.service_place, old.status);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER priests_fts_au
+        AFTER UPDATE OF name, patronymic, surname, service_place, status ON priests BEGIN
+            INSERT INTO priests_fts(priests_fts, rowid, name, patronymic, surname, service_place, status)
+            VALUES ('delete', old.id, old.name, old.patronymic, old.surname, old.service_place, old.status);
+            INSERT INTO priests_fts(rowid, name, patronymic, surname, service_place, status)
+            VALUES (new.id, new.name, new.patronymic, new.surname, new.service_place, new.status);
+        END
+    """)
+    # Индексация уже существующих записей
+    cursor.execute("INSERT INTO priests_fts(priests_fts) VALUES ('rebuild')")
+
+
+def backfill_search_keys(cursor: sqlite3.Cursor) -> int:
+    """Пересчёт нормализованных колонок поиска для всех записей"""
+    cursor.execute("SELECT id, name, patronymic, surname FROM priests")
+    updates = [
+        {
+            "id": priest_id,
+            "surname_norm": utils.normalize_search_key(surname),
+            "name_norm": utils.normalize_search_key(name),
+            "fio_norm": utils.fio_search_key(surname, name, patronymic),
+        }
+        for priest_id, name, patronymic, surname in cursor.fetchall()
+    ]
+    cursor.executemany("""
+        UPDATE priests
+        SET surname_norm = :surname_norm,
+            name_norm = :name_norm,
+            fio_norm = :fio_norm
+        WHERE id = :id
+    """, updates)
+    return len(updates)
+
+
+def _migration_4_search_keys(cursor: sqlite3.Cursor) -> None:
+    """Нормализованные колонки ФИО для индексного префиксного поиска"""
+    for column_name in ("surname_norm", "name_norm", "fio_norm"):
+        cursor.execute(f"ALTER TABLE priests ADD COLUMN {column_name} TEXT")
+        cursor.execute(f"CREATE INDEX idx_priests_{column_name} ON priests({column_name})")
+    backfill_search_keys(cursor)
+
+
+def _migration_5_table_versions(cursor: sqlite3.Cursor) -> None:
+    """
+    Счётчик изменений таблицы priests.
+
+    Триггеры увеличивают version при любой вставке, изменении или удалении
+    (в том числе из сторонних скриптов импорта), поэтому построенные в
+    памяти структуры (например, триграммный индекс) могут дешёво проверить,
+    не устарели ли они.
+    """
+    cursor.execute("""
+        CREATE TABLE table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT INTO table_versions (name, version) VALUES ('priests', 0)")
+    for event, suffix in (("INSERT", "ai"), ("UPDATE", "au"), ("DELETE", "ad")):
+        cursor.execute(f"""
+            CREATE TRIGGER priests_version_{suffix} AFTER {event} ON priests BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE name = 'priests';
+            END
+        """)
+
+
+def _migration_6_list_order_index(cursor: sqlite3.Cursor) -> None:
+    """Составной индекс для постраничного вывода по (фамилия, имя, id)"""
+    cursor.execute("CREATE INDEX idx_priests_surname_name_id ON priests(surname, name, id)")
+
+
+def _migration_7_identity_key(cursor: sqlite3.Cursor) -> None:
+    """
+    Уникальный ключ личности identity_key для массового импорта (UPSERT).
+
+    Ключ совпадает с fio_norm; у однофамильцев-тёзок (одинаковое ФИО)
+    первая запись получает fio_norm, остальные — fio_norm#id. Триггеры
+    заполняют ключ для записей, вставленных без него (add_priest, сторонние
+    скрипты), и пересчитывают его при изменении ФИО.
+    """
+    cursor.execute("ALTER TABLE priests ADD COLUMN identity_key TEXT")
+    cursor.execute("""
+        UPDATE priests
+        SET identity_key = CASE
+            WHEN id = (SELECT MIN(p.id) FROM priests p WHERE p.fio_norm = priests.fio_norm)
+            THEN fio_norm
+            ELSE fio_norm || '#' || id
+        END
+    """)
+    cursor.execute("CREATE UNIQUE INDEX idx_priests_identity_key ON priests(identity_key)")
+    cursor.execute("""
+        CREATE TRIGGER priests_identity_ai AFTER INSERT ON priests
+        WHEN new.identity_key IS NULL BEGIN
+            UPDATE priests SET identity_key = CASE
+                WHEN EXISTS (SELECT 1 FROM priests WHERE identity_key = new.fio_norm)
+                THEN new.fio_norm || '#' || new.id
+                ELSE new.fio_norm
+            END
+            WHERE id = new.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER priests_identity_au AFTER UPDATE OF fio_norm ON priests
+        WHEN old.fio_norm IS NOT new.fio_norm BEGIN
+            UPDATE priests SET identity_key = CASE
+                WHEN EXISTS (SELECT 1 FROM priests WHERE identity_key = new.fio_norm AND id != new.id)
+                THEN new.fio_norm || '#' || new.id
+                ELSE new.fio_norm
+            END
+            WHERE id = new.id;
+        END
+    """)
+
+
+def _migration_8_import_state(cursor: sqlite3.Cursor) -> None:
+    """
+    Состояние инкрементального импорта.
+
+    Для каждой строки исходного файла хранится хэш её нормализованного
+    содержимого. Строка определяется именем файла и ключом личности (ФИО),
+    а не номером строки: вставка строки в середину листа не делает
+    изменёнными все последующие.
+    """
+    cursor.execute("""
+        CREATE TABLE import_state (
+            source TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            priest_id INTEGER,
+            imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, row_key)
+        )
+    """)
+    cursor.execute("CREATE INDEX idx_import_state_priest_id ON import_state(priest_id)")
+
+
+def _migration_9_broadcast_optout(cursor: sqlite3.Cursor) -> None:
+    """Администраторы, отказавшиеся от ежедневной рассылки «Именинники»"""
+    cursor.execute("""
+        CREATE TABLE broadcast_optout (
+            user_id INTEGER PRIMARY KEY,
+            opted_out_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _migration_10_leap_day_name_days(cursor: sqlite3.Cursor) -> None:
+    """
+    Календарный индекс для тезоименитств 29.02.
+
+    parse_day_month разбирал DD.MM без года (1900 — не високосный) и
+    оставлял для «29.02» пустые name_day_month/name_day_day.
+    """
+    cursor.execute("""
+        SELECT id, name_day FROM priests
+        WHERE name_day_month IS NULL AND name_day IS NOT NULL AND name_day != ''
+    """)
+    updates = []
+    for priest_id, name_day in cursor.fetchall():
+        parsed = utils.parse_day_month(name_day)
+        if parsed:
+            updates.append({"id": priest_id, "day": parsed[0], "month": parsed[1]})
+    cursor.executemany(
+        "UPDATE priests SET name_day_month = :month, name_day_day = :day WHERE id = :id",
+        updates,
+    )
+
+
+def _migration_11_row_version(cursor: sqlite3.Cursor) -> None:
+    """
+    Счётчик изменений записи (row_version) — ключ кэша готовых карточек.
+
+    updated_at хранится с точностью до секунды и не различает два изменения
+    записи в одну секунду. Изменения в обход Database учитывает триггер
+    из миграции 13.
+    """
+    cursor.execute("ALTER TABLE priests ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+
+
+# Колонки полнотекстового индекса priests_fts
+FTS_COLUMNS = ("name", "patronymic", "surname", "service_place", "status")
+
+
+def _normalized_sql(expression: str) -> str:
+    """
+    SQL-выражение, заменяющее буквы так же, как utils.normalize_search_key
+    (регистр приводит сам токенизатор unicode61, поэтому заменяются обе
+    формы буквы).
+    """
+    replacements = {}
+    for char, replacement in utils.SEARCH_KEY_REPLACEMENTS.items():
+        replacements[char] = replacement
+        replacements.setdefault(char.upper(), replacement)
+    for char, replacement in replacements.items():
+        quoted_char = char.replace("'", "''")
+        quoted_replacement = replacement.replace("'", "''")
+        expression = f"replace({expression}, '{quoted_char}', '{quoted_replacement}')"
+    return expression
+
+
+def _migration_12_normalized_fts(cursor: sqlite3.Cursor) -> None:
+    """
+    Полнотекстовый индекс по нормализованному тексту.
+
+    Колонки priests_fts хранят текст после тех же замен, что и префиксный
+    поиск по fio_norm (ё→е, і/ї→и, є→е, ґ→г, без апострофов), поэтому
+    «Ёлкин» находит «Елкин». Таблица хранит собственную копию текста
+    (без content='priests'): нормализованные значения в priests нет.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'priests_fts'")
+    if cursor.fetchone() is None:
+        # SQLite без FTS5: индекс не создавался (см. миграцию 3)
+        return
+
+    for trigger in ("priests_fts_ai", "priests_fts_ad", "priests_fts_au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE priests_fts")
+
+    columns = ", ".join(FTS_COLUMNS)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE priests_fts USING fts5(
+            {columns},
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    new_values = ", ".join(_normalized_sql(f"new.{column}") for column in FTS_COLUMNS)
+    cursor.execute(f"""
+        CREATE TRIGGER priests_fts_ai AFTER INSERT ON priests BEGIN
+            INSERT INTO priests_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER priests_fts_ad AFTER DELETE ON priests BEGIN
+            DELETE FROM priests_fts WHERE rowid = old.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER priests_fts_au AFTER UPDATE OF {columns} ON priests BEGIN
+            DELETE FROM priests_fts WHERE rowid = old.id;
+            INSERT INTO priests_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """)
+    # Индексация уже существующих записей
+    values = ", ".join(_normalized_sql(column) for column in FTS_COLUMNS)
+    cursor.execute(f"INSERT INTO priests_fts(rowid, {columns}) SELECT id, {values} FROM priests")
+
+
+def _migration_13_row_version_trigger(cursor: sqlite3.Cursor) -> None:
+    """
+    Триггер row_version для изменений в обход Database.
+
+    Методы Database сами увеличивают row_version в том же UPDATE (тогда
+    условие WHEN не выполняется и лишней записи нет); триггер покрывает
+    сторонние скрипты и прямой SQL, чтобы кэш карточек не отдавал
+    устаревшие данные.
+    """
+    cursor.execute("""
+        CREATE TRIGGER priests_row_version_au AFTER UPDATE ON priests
+        WHEN new.row_version = old.row_version BEGIN
+            UPDATE priests SET row_version = old.row_version + 1 WHERE id = new.id;
+        END
+    """)
+
+
+# Список миграций (номер версии, функция). Новые миграции добавляются в конец.
+MIGRATIONS: List[Tuple[int, Callable[[sqlite3.Cursor], None]]] = [
+    (1, _migration_1_priests_table),
+    (2, _migration_2_calendar_index),
+    (3, _migration_3_fulltext_search),
+    (4, _migration_4_search_keys),
+    (5, _migration_5_table_versions),
+    (6, _migration_6_list_order_index),
+    (7, _migration_7_identity_key),
+    (8, _migration_8_import_state),
+    (9, _migration_9_broadcast_optout),
+    (10, _migration_10_leap_day_name_days),
+    (11, _migration_11_row_version),
+    (12, _migration_12_normalized_fts),
+    (13, _migration_13_row_version_trigger),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы базы данных"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Применение недостающих миграций.
+
+    Каждая миграция выполняется в отдельной транзакции вместе с обновлением
+    user_version, поэтому прерванный запуск не оставляет схему в промежуточном
+    состоянии. Возвращает итоговую версию схемы.
+    """
+    version = get_schema_version(conn)
+    for target_version, migrate in MIGRATIONS:
+        if target_version <= version:
+            continue
+        # BEGIN IMMEDIATE не даёт двум процессам применять миграцию одновременно
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= target_version:
+                conn.rollback()
+                version = get_schema_version(conn)
+                continue
+            migrate(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {target_version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info("Схема базы данных обновлена до версии %s", target_version)
+        version = target_version
+    return version
+
+
+# Базы данных, схема которых уже проверена в этом процессе
+_bootstrapped: Set[str] = set()
+_bootstrap_lock = threading.Lock()
+
+
+def check_schema(db_path: str, conn: sqlite3.Connection) -> None:
+    """
+    Проверка без изменения базы (для открытия только на чтение): схема
+    должна быть не старее SCHEMA_VERSION.
+    """
+    version = get_schema_version(conn)
+    if version < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Схема базы {db_path} устарела (версия {version}, нужна {SCHEMA_VERSION}): "
+            f"запустите бота или импорт, чтобы применить миграции"
+        )
+
+
+def ensure_schema(
+    db_path: str,
+    connect: Callable[[], ContextManager[sqlite3.Connection]],
+) -> None:
+    """
+    Однократная (на процесс) проверка и обновление схемы базы данных.
+
+    connect вызывается только при первой проверке, поэтому повторное
+    создание Database не открывает соединение и не выполняет DDL.
+    """
+    if db_path in _bootstrapped:
+        return
+    with _bootstrap_lock:
+        if db_path in _bootstrapped:
+            return
+        with connect() as conn:
+            apply_migrations(conn)
+        _bootstrapped.add(db_path)
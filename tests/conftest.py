@@ -0,0 +1,20 @@
+"""
+Общие фикстуры тестов: модули бота лежат в корне репозитория
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from db_pool import close_all_pools  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Пустая база во временном файле (миграции применяются при создании)"""
+    database = Database(str(tmp_path / "test.db"))
+    yield database
+    close_all_pools()
@@ -0,0 +1,29 @@
+import asyncio
+import threading
+
+from async_database import AsyncDatabase
+
+
+def test_property_is_read_in_worker_thread(db):
+    threads = []
+    original = type(db).fts_available
+
+    class Probe(type(db)):
+        @property
+        def fts_available(self):
+            threads.append(threading.current_thread())
+            return original.fget(self)
+
+    db.__class__ = Probe
+
+    async def scenario():
+        adb = AsyncDatabase(db)
+        try:
+            assert await adb.fts_available in (True, False)
+            # Обычные атрибуты по-прежнему читаются без await
+            assert adb.db_path == db.db_path
+        finally:
+            adb.close()
+
+    asyncio.run(scenario())
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,65 @@
+from datetime import date
+
+from models import Priest
+
+
+def _priest(**fields) -> Priest:
+    values = dict(name="Иоанн", patronymic="Петрович", surname="Иванов", status="Протоиерей")
+    values.update(fields)
+    return Priest(**values)
+
+
+def test_update_keeps_phone_missing_from_file(db):
+    db.bulk_upsert([_priest(service_place="Храм 1", phone="0671234567")])
+
+    outcomes = db.bulk_upsert([_priest(service_place="Храм 2", phone="")], update_existing=True)
+
+    assert outcomes == [db.UPSERT_UPDATED]
+    (priest,) = db.get_all_priests()
+    assert priest.service_place == "Храм 2"
+    assert priest.phone == "0671234567"
+
+
+def test_update_keeps_dates_missing_from_file(db):
+    db.bulk_upsert([_priest(birth_date=date(1970, 5, 3), ordination_date=date(1995, 1, 7))])
+
+    db.bulk_upsert([_priest(birth_date=None, ordination_date=None)], update_existing=True)
+
+    (priest,) = db.get_all_priests()
+    assert priest.birth_date == date(1970, 5, 3)
+    assert priest.ordination_date == date(1995, 1, 7)
+    assert len(db.get_celebrations_on("bday", 5, 3)) == 1
+
+
+def test_update_overwrites_provided_values(db):
+    db.bulk_upsert([_priest(phone="0671234567", status="Иерей")])
+
+    db.bulk_upsert([_priest(phone="0509876543", status="Протоиерей")], update_existing=True)
+
+    (priest,) = db.get_all_priests()
+    assert priest.phone == "0509876543"
+    assert priest.status == "Протоиерей"
+
+
+def test_empty_cell_does_not_clear_field(db):
+    db.bulk_upsert([_priest(service_place="Храм 1", last_reward="Палица")])
+
+    db.bulk_upsert([_priest(service_place="Храм 1", last_reward="")], update_existing=True)
+
+    assert db.get_all_priests()[0].last_reward == "Палица"
+
+
+def test_noop_update_keeps_row_version(db):
+    db.bulk_upsert([_priest(service_place="Храм 1", phone="0671234567")])
+    (before,) = db.get_all_priests()
+    version = db.data_version()
+
+    db.bulk_upsert([_priest(service_place="Храм 1", phone="")], update_existing=True)
+
+    (after,) = db.get_all_priests()
+    assert after.row_version == before.row_version
+    assert after.updated_at == before.updated_at
+    assert db.data_version() == version
+
+    db.bulk_upsert([_priest(service_place="Храм 2")], update_existing=True)
+    assert db.get_all_priests()[0].row_version == before.row_version + 1
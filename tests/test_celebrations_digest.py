@@ -0,0 +1,45 @@
+import asyncio
+from datetime import date, timedelta
+
+from async_database import AsyncDatabase
+from celebrations_digest import CelebrationsDigest
+from models import Priest
+
+
+def test_write_invalidates_only_affected_reports(db):
+    today = date.today()
+    far = today + timedelta(days=3)
+    priest_id = db.add_priest(
+        Priest(surname="Иванов", name="Иоанн", patronymic="Петрович", birth_date=today.replace(year=1972))
+    )
+
+    async def scenario():
+        adb = AsyncDatabase(db)
+        digest = CelebrationsDigest(days_ahead=3)
+        try:
+            await digest.refresh(adb)
+            assert "Иванов" in "".join(await digest.days_report(adb, "bday", 0))
+
+            # Перенос даты рождения с сегодня на день через три дня
+            priest = db.get_priest_by_id(priest_id)
+            priest.birth_date = far.replace(year=1972)
+            db.update_priest(priest)
+            assert await digest.sync(adb) > 0
+
+            digest.hits = digest.misses = 0
+            assert "Иванов" not in "".join(await digest.days_report(adb, "bday", 0))
+            assert "Иванов" in "".join(await digest.days_report(adb, "bday", 3))
+            assert digest.misses == 2
+
+            # Отчёты за незатронутые дни и другие типы дат не пересчитываются
+            await digest.days_report(adb, "bday", 1)
+            await digest.days_report(adb, "ord", 0)
+            await digest.days_report(adb, "name", 0)
+            assert digest.misses == 2
+            if far.month == today.month:
+                await digest.month_report(adb, "ord", today.month)
+                assert digest.misses == 2
+        finally:
+            adb.close()
+
+    asyncio.run(scenario())
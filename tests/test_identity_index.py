@@ -0,0 +1,76 @@
+from identity_index import MATCH_AMBIGUOUS, MATCH_NAME, FioIdentityIndex
+from legacy_excel_importer import LegacyExcelImporter
+from models import Priest
+from phone_matcher import PhoneMatcher
+
+
+def _index(db) -> FioIdentityIndex:
+    db.bulk_upsert([
+        Priest(surname="Иванов", name="Иоанн", patronymic="Петрович", status="Протоиерей"),
+        Priest(surname="Петров", name="Павел", patronymic="Сергеевич", status="Иерей"),
+    ])
+    return FioIdentityIndex.load(db)
+
+
+def test_full_fio_match(db):
+    index = _index(db)
+    assert index.find("Иванов", "Иоанн", "Петрович") is not None
+    assert index.find("Иванов", "Иоанн", "Павлович") is None
+
+
+def test_row_without_patronymic_matches_by_surname_and_name(db):
+    index = _index(db)
+    expected = index.find("Иванов", "Иоанн", "Петрович")
+
+    assert index.find_priest(Priest(surname="ИВАНОВ", name="Иоанн")) == expected
+    # С другим отчеством это другой человек
+    assert index.find_priest(Priest(surname="Иванов", name="Иоанн", patronymic="Павлович")) is None
+
+
+def test_resolve_updates_existing_record_instead_of_inserting(db):
+    index = _index(db)
+    row = Priest(surname="Иванов", name="Иоанн", status="Протоиерей", service_place="Собор")
+
+    assert index.resolve(row).kind == MATCH_NAME
+    assert row.patronymic == "Петрович"
+    assert db.bulk_upsert([row], update_existing=True) == [db.UPSERT_UPDATED]
+    assert db.get_total_count() == 2
+
+
+def test_added_record_is_found_without_patronymic(db):
+    index = FioIdentityIndex.load(db)
+    priest = Priest(surname="Сидоров", name="Николай", patronymic="Ильич", status="Иерей")
+    priest.id = db.add_priest(priest)
+    index.add(priest)
+
+    assert index.find_priest(Priest(surname="Сидоров", name="Николай")) == priest.id
+
+
+def test_namesakes_without_patronymic_are_ambiguous(db):
+    _index(db)
+    db.add_priest(Priest(surname="Иванов", name="Иоанн", patronymic="Павлович", status="Иерей"))
+    index = FioIdentityIndex.load(db)
+    row = Priest(surname="Иванов", name="Иоанн")
+
+    match = index.resolve(row)
+    assert match.kind == MATCH_AMBIGUOUS and len(match.priest_ids) == 2
+    assert index.find_priest(row) is None
+    assert row.patronymic == ""
+
+
+def test_importer_skips_ambiguous_rows(db):
+    _index(db)
+    db.add_priest(Priest(surname="Иванов", name="Иоанн", patronymic="Павлович", status="Иерей"))
+    importer = LegacyExcelImporter(db)
+
+    importer.save_parsed([(2, Priest(surname="Иванов", name="Иоанн", status="Иерей"), {})], update_existing=True)
+    assert importer.success_count == 0
+    assert "несколькими записями" in importer.errors[0]["errors"][0]
+    assert db.get_total_count() == 3
+
+
+def test_phone_matcher_uses_identity_index(db):
+    index = _index(db)
+    matcher = PhoneMatcher(db.get_all_priests())
+    for fio in (("Иванов", "Иоанн", "Петрович"), ("Иванов", "Иоанн", ""), ("Сидоров", "Павел", "")):
+        assert matcher.match(*fio) == index.match(*fio)
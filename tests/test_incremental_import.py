@@ -0,0 +1,95 @@
+from datetime import date
+
+from identity_index import FioIdentityIndex
+from import_diff import ImportDiff
+from legacy_excel_importer import LegacyExcelImporter
+from models import Priest
+
+
+def _file_row(**fields) -> Priest:
+    """Запись, как её разбирает импорт формата A–K (телефона в файле нет)"""
+    values = dict(
+        name="Иоанн", patronymic="Петрович", surname="Иванов", status="Протоиерей",
+        birth_date=date(1970, 5, 3), service_place="Храм 1",
+    )
+    values.update(fields)
+    return Priest(**values)
+
+
+def _identities(priest: Priest, content_hash: str):
+    return {2: (FioIdentityIndex.key(priest.surname, priest.name, priest.patronymic), content_hash)}
+
+
+def test_first_incremental_run_seeds_state_without_rewriting(db):
+    db.bulk_upsert([_file_row(phone="0671234567")])
+    version = db.data_version()
+    row = _file_row()
+
+    counts = LegacyExcelImporter(db).sync_parsed("file.xlsx", [(2, row, {})], _identities(row, "h1"))
+
+    assert counts == {"unchanged": 1, "updated": 0, "inserted": 0, "removed": 0}
+    assert db.data_version() == version
+    assert list(db.get_import_state("file.xlsx").values())[0][0] == "h1"
+    assert db.get_all_priests()[0].phone == "0671234567"
+
+
+def test_changed_row_keeps_phone(db):
+    db.bulk_upsert([_file_row(phone="0671234567")])
+    importer = LegacyExcelImporter(db)
+    row = _file_row()
+    importer.sync_parsed("file.xlsx", [(2, row, {})], _identities(row, "h1"))
+
+    changed = _file_row(service_place="Храм 2")
+    counts = LegacyExcelImporter(db).sync_parsed("file.xlsx", [(2, changed, {})], _identities(changed, "h2"))
+
+    assert counts["updated"] == 1
+    (priest,) = db.get_all_priests()
+    assert priest.service_place == "Храм 2"
+    assert priest.phone == "0671234567"
+
+
+def _rows_with_duplicate_fio():
+    return [
+        (2, _file_row(service_place="Храм 1"), {}),
+        (3, _file_row(service_place="Храм 2"), {}),
+    ]
+
+
+def test_duplicate_fio_keeps_first_row_in_every_mode(db):
+    full = LegacyExcelImporter(db)
+    full.save_parsed(_rows_with_duplicate_fio(), update_existing=True)
+    assert [p.service_place for p in db.get_all_priests()] == ["Храм 1"]
+    assert [error["row"] for error in full.errors] == [3]
+
+    db.delete_priests([p.id for p in db.get_all_priests()])
+    rows = _rows_with_duplicate_fio()
+    key = FioIdentityIndex.key("Иванов", "Иоанн", "Петрович")
+    incremental = LegacyExcelImporter(db)
+    counts = incremental.sync_parsed("file.xlsx", rows, {2: (key, "h2"), 3: (key, "h3")})
+
+    assert counts["inserted"] == 1
+    assert [p.service_place for p in db.get_all_priests()] == ["Храм 1"]
+    assert [error["row"] for error in incremental.errors] == [3]
+
+
+def test_dry_run_reports_the_same_kept_row():
+    diff = ImportDiff.compute("file.xlsx", _rows_with_duplicate_fio(), [])
+
+    assert [entry["row"] for entry in diff.new] == [2]
+    assert diff.duplicates == [{"row": 3, "fio": "Иванов Иоанн Петрович", "kept_row": 2}]
+
+
+def test_dry_run_for_full_reimport_replaces_everything(db):
+    db.add_priest(Priest(surname="Иванов", name="Иоанн", patronymic="Петрович", service_place="Храм 1"))
+    db.add_priest(Priest(surname="Сидоров", name="Пётр", patronymic="Ильич"))
+    existing = db.get_all_priests()
+
+    update = ImportDiff.compute("file.xlsx", _rows_with_duplicate_fio(), existing)
+    assert [entry["row"] for entry in update.changed] == [2]
+    assert [entry["fio"] for entry in update.missing] == ["Сидоров Пётр Ильич"]
+
+    # Без --incremental таблица очищается: удаляются все записи, строки файла добавляются
+    replace = ImportDiff.compute("file.xlsx", _rows_with_duplicate_fio(), existing, replace=True)
+    assert [entry["row"] for entry in replace.new] == [2]
+    assert not replace.changed and not replace.unchanged
+    assert sorted(entry["id"] for entry in replace.missing) == sorted(p.id for p in existing)
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from telegram.error import NetworkError, RetryAfter, TimedOut
+
+from outbox import Outbox
+
+
+def _run(requests):
+    async def main():
+        outbox = Outbox()
+        result = await outbox.submit(1, requests)
+        return outbox, result
+    return asyncio.run(main())
+
+
+def test_timed_out_is_not_retried():
+    calls = []
+
+    async def request():
+        calls.append(1)
+        raise TimedOut()
+
+    with pytest.raises(TimedOut):
+        _run([request])
+    assert len(calls) == 1
+
+
+def test_network_error_is_retried(monkeypatch):
+    monkeypatch.setattr("config.OUTBOX_RETRY_DELAY", 0)
+    calls = []
+
+    async def request():
+        calls.append(1)
+        if len(calls) == 1:
+            raise NetworkError("connection reset")
+        return "ok"
+
+    outbox, result = _run([request])
+    assert result == ["ok"] and outbox.retries == 1
+
+
+def test_retry_after_pauses_global_bucket():
+    calls = []
+
+    async def request():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RetryAfter(0)
+        return "ok"
+
+    outbox, result = _run([request])
+    assert result == ["ok"] and outbox.flood_waits == 1
+    assert outbox._global._paused_until > 0
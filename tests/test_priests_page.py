@@ -0,0 +1,60 @@
+from models import Priest
+
+LIMIT = 3
+
+
+def _fill(db, count=7):
+    # Одинаковые фамилия и имя у части записей: порядок решает id
+    db.bulk_upsert([
+        Priest(surname=f"Фамилия{i // 2}", name="Иоанн", patronymic=f"Отчество{i}", status="Иерей")
+        for i in range(count)
+    ])
+    return [p.id for p in db.get_all_priests()]
+
+
+def _ids(priests):
+    return [p.id for p in priests]
+
+
+def test_forward_pages(db):
+    order = _fill(db)
+    first, has_more = db.get_priests_page(limit=LIMIT)
+    assert _ids(first) == order[:3] and has_more
+
+    second, has_more = db.get_priests_page(after_id=first[-1].id, limit=LIMIT)
+    assert _ids(second) == order[3:6] and has_more
+
+    last, has_more = db.get_priests_page(after_id=second[-1].id, limit=LIMIT)
+    assert _ids(last) == order[6:] and not has_more
+
+
+def test_backward_pages(db):
+    order = _fill(db)
+    page, has_more = db.get_priests_page(before_id=order[6], limit=LIMIT)
+    assert _ids(page) == order[3:6] and has_more
+
+    page, has_more = db.get_priests_page(before_id=order[3], limit=LIMIT)
+    assert _ids(page) == order[:3] and not has_more
+
+
+def test_exact_page_boundary(db):
+    order = _fill(db, count=6)
+    page, has_more = db.get_priests_page(after_id=order[2], limit=LIMIT)
+    assert _ids(page) == order[3:] and not has_more
+
+
+def test_page_anchor(db):
+    order = _fill(db)
+    assert db.get_page_anchor(0, limit=LIMIT) is None
+    assert db.get_page_anchor(1, limit=LIMIT) == order[2]
+    assert db.get_page_anchor(2, limit=LIMIT) == order[5]
+    assert db.get_page_anchor(3, limit=LIMIT) is None
+
+    page, has_more = db.get_priests_page(after_id=db.get_page_anchor(2, limit=LIMIT), limit=LIMIT)
+    assert _ids(page) == order[6:] and not has_more
+
+
+def test_deleted_anchor_gives_empty_page(db):
+    order = _fill(db)
+    db.delete_priest(order[2])
+    assert db.get_priests_page(after_id=order[2], limit=LIMIT) == ([], False)
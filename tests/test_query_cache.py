@@ -0,0 +1,19 @@
+from models import Priest
+
+
+def test_cached_priest_is_not_shared(db):
+    priest_id = db.add_priest(Priest(surname="Иванов", name="Иоанн", patronymic="Петрович", status="Иерей"))
+
+    priest = db.get_priest_by_id(priest_id)
+    priest.status = "Протоиерей"
+    assert db.get_priest_by_id(priest_id).status == "Иерей"
+
+
+def test_cached_search_results_are_not_shared(db):
+    db.add_priest(Priest(surname="Иванов", name="Иоанн", patronymic="Петрович", status="Иерей"))
+
+    found = db.search_priests("Иванов")
+    found[0].phone = "+380501112233"
+    found.append(Priest())
+    again = db.search_priests("Иванов")
+    assert len(again) == 1 and again[0].phone == ""
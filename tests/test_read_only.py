@@ -0,0 +1,41 @@
+import sqlite3
+
+import pytest
+
+import schema
+from database import Database
+from db_pool import close_all_pools
+from models import Priest
+
+
+def test_read_only_reads_without_writing(db):
+    db.add_priest(Priest(surname="Иванов", name="Иоанн", patronymic="Петрович", status="Иерей"))
+
+    read_only = Database(db.db_path, read_only=True)
+    assert read_only.get_total_count() == 1
+    with pytest.raises(RuntimeError):
+        read_only.add_priest(Priest(surname="Петров", name="Павел"))
+
+
+def test_read_only_skips_migrations(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    schema.apply_migrations(conn)
+    conn.execute(f"PRAGMA user_version = {schema.SCHEMA_VERSION - 1}")
+    conn.commit()
+    conn.close()
+
+    try:
+        with pytest.raises(RuntimeError):
+            Database(path, read_only=True)
+        conn = sqlite3.connect(path)
+        assert schema.get_schema_version(conn) == schema.SCHEMA_VERSION - 1
+        conn.close()
+    finally:
+        close_all_pools()
+
+
+def test_read_only_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Database(str(tmp_path / "missing.db"), read_only=True)
+    assert not (tmp_path / "missing.db").exists()
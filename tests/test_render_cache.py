@@ -0,0 +1,34 @@
+from models import Priest
+from render_cache import render_card
+
+
+def test_card_rerendered_after_same_second_update(db):
+    priest_id = db.add_priest(
+        Priest(surname="Иванов", name="Иоанн", patronymic="Петрович", status="Иерей")
+    )
+    priest = db.get_priest_by_id(priest_id)
+    assert "Иерей" in render_card(priest)
+
+    # Два изменения подряд — updated_at совпадает, row_version нет
+    priest.status = "Протоиерей"
+    db.update_priest(priest)
+    updated = db.get_priest_by_id(priest_id)
+    assert updated.row_version == priest.row_version + 1
+    assert "Протоиерей" in render_card(updated)
+
+    db.update_phones([(priest_id, "+380501112233")])
+    assert db.get_priest_by_id(priest_id).row_version == updated.row_version + 1
+
+
+def test_raw_sql_update_bumps_row_version(db):
+    priest_id = db.add_priest(Priest(surname="Петров", name="Павел", patronymic="Ильич", status="Иерей"))
+    before = db.get_priest_by_id(priest_id)
+    assert "Иерей" in render_card(before)
+
+    # Запись в обход Database (например, сторонний скрипт)
+    with db.get_connection() as conn:
+        conn.execute("UPDATE priests SET status = 'Протоиерей' WHERE id = ?", (priest_id,))
+
+    after = db.get_priest_by_id(priest_id)
+    assert after.row_version == before.row_version + 1
+    assert "Протоиерей" in render_card(after)
@@ -0,0 +1,44 @@
+from handlers import _format_fuzzy_suggestions
+from models import Priest, PriestSummary
+
+
+def _add(db, surname, name, patronymic=""):
+    return db.add_priest(Priest(surname=surname, name=name, patronymic=patronymic, status="Иерей"))
+
+
+def test_fts_folds_yo_and_ukrainian_letters(db):
+    assert db.fts_available
+    elkin = _add(db, "Елкин", "Петр")
+    ivan = _add(db, "Іванов", "Їжак", "Мар'янович")
+
+    assert [p.id for p in db.search_priests("Ёлкин")] == [elkin]
+    assert [p.id for p in db.search_priests("иванов ижак")] == [ivan]
+    assert [p.id for p in db.search_priests("марян")] == [ivan]
+
+
+def test_fts_follows_updates_and_deletes(db):
+    priest_id = _add(db, "Петров", "Павел")
+    priest = db.get_priest_by_id(priest_id)
+    priest.surname = "Сёмин"
+    db.update_priest(priest)
+
+    assert db.search_priests("Петров") == []
+    assert [p.id for p in db.search_priests("семин")] == [priest_id]
+
+    db.delete_priest(priest_id)
+    assert db.search_priests("семин") == []
+
+
+def test_search_finds_name_before_surname(db):
+    priest_id = _add(db, "Иванов", "Иоанн", "Петрович")
+    assert [p.id for p in db.search_priests("иоанн иванов")] == [priest_id]
+
+
+def test_fuzzy_suggestions_escape_record_fields():
+    message = _format_fuzzy_suggestions(
+        "<b>", [PriestSummary(1, "Иоанн", "", "Иванов <i>", "Иерей & Ко", "")]
+    )
+
+    assert "Иванов &lt;i&gt;" in message
+    assert "Иерей &amp; Ко" in message
+    assert "<i>" not in message
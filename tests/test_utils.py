@@ -0,0 +1,17 @@
+from utils import calendar_values, parse_day_month
+
+
+def test_parse_day_month():
+    assert parse_day_month("05.09") == (5, 9)
+    assert parse_day_month(" 1.3. ") == (1, 3)
+
+
+def test_parse_leap_day():
+    assert parse_day_month("29.02") == (29, 2)
+    assert calendar_values(None, "29.02", None, None)["name_day_month"] == 2
+
+
+def test_parse_invalid_day_month():
+    assert parse_day_month("31.02") is None
+    assert parse_day_month("весной") is None
+    assert parse_day_month("") is None
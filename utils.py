@@ -2,7 +2,7 @@
 Вспомогательные функции
 """
 from datetime import date, datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Set, Tuple
 import config
 
 
@@ -28,6 +28,91 @@ def parse_date(date_string: str) -> Optional[date]:
     return None
 
 
+def parse_day_month(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Парсинг дня и месяца из строки формата DD.MM (возвращает (день, месяц))"""
+    if not value:
+        return None
+    try:
+        # Год високосный, иначе strptime (год 1900) отвергает «29.02»
+        d = datetime.strptime(value.strip().strip(".") + ".2000", "%d.%m.%Y")
+    except ValueError:
+        return None
+    return d.day, d.month
+
+
+def calendar_values(
+    birth_date: Optional[date],
+    name_day: Optional[str],
+    deacon_ordination_date: Optional[date],
+    priest_ordination_date: Optional[date],
+) -> Dict[str, Optional[int]]:
+    """
+    Месяц и день памятных дат для календарного индекса в таблице priests.
+
+    Для хиротонии берётся дата рукоположения в священника, а при её
+    отсутствии — в диакона (так же, как в отчётах «Именинники»).
+    """
+    name_dm = parse_day_month(name_day)
+    ord_date = priest_ordination_date or deacon_ordination_date
+    return {
+        "birth_month": birth_date.month if birth_date else None,
+        "birth_day": birth_date.day if birth_date else None,
+        "name_day_month": name_dm[1] if name_dm else None,
+        "name_day_day": name_dm[0] if name_dm else None,
+        "ord_month": ord_date.month if ord_date else None,
+        "ord_day": ord_date.day if ord_date else None,
+    }
+
+
+# Сведение украинских/русских вариантов букв и удаление апострофов
+# (та же замена выполняется в SQL для полнотекстового индекса, см. schema.py)
+SEARCH_KEY_REPLACEMENTS: Dict[str, str] = {
+    "ё": "е",
+    "є": "е",
+    "і": "и",
+    "ї": "и",
+    "i": "и",  # латинская «i», которую часто набирают вместо украинской «і»
+    "ґ": "г",
+    "'": "",
+    "’": "",
+    "ʼ": "",
+    "‘": "",
+    "`": "",
+}
+_SEARCH_KEY_TRANSLATION = str.maketrans(SEARCH_KEY_REPLACEMENTS)
+
+
+def normalize_search_key(text: Optional[str]) -> str:
+    """
+    Нормализация строки для поиска: нижний регистр (включая кириллицу),
+    ё→е, і/ї→и, є→е, ґ→г, без апострофов и лишних пробелов.
+    """
+    if not text:
+        return ""
+    text = text.casefold().translate(_SEARCH_KEY_TRANSLATION)
+    return " ".join(text.split())
+
+
+def fio_search_key(surname: Optional[str], name: Optional[str], patronymic: Optional[str]) -> str:
+    """Нормализованный ключ полного ФИО в порядке «фамилия имя отчество»"""
+    return normalize_search_key(" ".join(part for part in (surname, name, patronymic) if part))
+
+
+def search_trigrams(key: str) -> Set[str]:
+    """
+    Множество триграмм нормализованной строки для нечёткого поиска.
+
+    Каждое слово дополняется пробелами (два в начале, один в конце), чтобы
+    начало слова имело больший вес — как в pg_trgm.
+    """
+    trigrams: Set[str] = set()
+    for word in key.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            trigrams.add(padded[i:i + 3])
+    return trigrams
+
+
 def format_date(d: Optional[date]) -> str:
     """Форматирование даты в строку DD.MM.YYYY"""
     if not d: